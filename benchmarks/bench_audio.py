@@ -0,0 +1,126 @@
+"""
+Audio Datagram Benchmark.
+Streams a synthetic tone from a QuicClient to a local HampterProtocol server
+as QUIC datagrams, with a VoiceManager on both ends and no speaker. Traffic
+goes through a UDP relay that adds a fixed delay, random jitter and random
+loss, so datagrams also arrive out of order.
+
+Reports, per jitter level, the receiver's end-to-end latency (send to
+playout), loss after concealment, late frames, the jitter estimate and the
+playout buffer it settled on.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_audio [--seconds 5] [--delay-ms 10] [--loss 0.02]
+"""
+import argparse
+import asyncio
+import logging
+import random
+
+from aioquic.asyncio import serve
+
+from config import cfg
+from src.networking.voice import VoiceManager
+from src.protocol.certificates import CertificateManager
+from src.protocol.quic_client import QuicClient
+from src.protocol.quic_server import HampterProtocol, build_quic_config
+
+SERVER_PORT = 15640
+RELAY_PORT = 15641
+PEER = "127.0.0.1"
+
+
+class JitterRelay(asyncio.DatagramProtocol):
+    """Delays every datagram by delay + uniform(0, jitter) and drops some."""
+
+    def __init__(self, server_addr, delay, jitter, loss, rng):
+        self.server_addr = server_addr
+        self.delay = delay
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = rng
+        self.client_addr = None
+        self.transport = None
+        self.dropped = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if addr == self.server_addr:
+            target = self.client_addr
+        else:
+            self.client_addr = addr
+            target = self.server_addr
+        if target is None:
+            return
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        wait = self.delay + self.rng.uniform(0, self.jitter)
+        asyncio.get_running_loop().call_later(wait, self.transport.sendto, data, target)
+
+
+async def run(args, jitter, port, rng):
+    loop = asyncio.get_running_loop()
+    ended = loop.create_future()
+    receiver = VoiceManager(lambda ip, data: False, one_way_delay=lambda ip: args.delay_ms / 1000)
+    receiver.on_stream_end = lambda ip, summary: ended.done() or ended.set_result(summary)
+    HampterProtocol._on_datagram_callback = lambda data, peer, proto: receiver.on_datagram(PEER, data)
+
+    relay = JitterRelay(("127.0.0.1", SERVER_PORT), args.delay_ms / 1000, jitter, args.loss, rng)
+    transport, _ = await loop.create_datagram_endpoint(lambda: relay, local_addr=("127.0.0.1", port))
+    client = QuicClient(cfg.CERT_PATH)
+    connected = asyncio.Event()
+    task = asyncio.create_task(client.connect_to("127.0.0.1", port, lambda data, _: None, connected.set))
+    try:
+        await asyncio.wait_for(connected.wait(), 10)
+        sender = VoiceManager(lambda ip, data: client.send_datagram(data))
+        frames = sender.start(PEER, seconds=args.seconds)
+        summary = await asyncio.wait_for(ended, args.seconds + 10)
+    finally:
+        client.close()
+        await asyncio.wait_for(task, 5)
+        transport.close()
+    return summary, frames.sent, relay.dropped
+
+
+async def main_async(args):
+    CertificateManager.ensure_certs()
+    HampterProtocol._on_connect_callback = lambda peer, protocol: None
+    HampterProtocol._on_disconnect_callback = lambda peer, protocol: None
+    server = await serve(
+        "127.0.0.1", SERVER_PORT,
+        configuration=build_quic_config(cfg.CERT_PATH, cfg.KEY_PATH),
+        create_protocol=HampterProtocol,
+    )
+    rng = random.Random(args.seed)
+    print(f"[*] {args.seconds:g} s of {cfg.AUDIO_FRAME_MS} ms {cfg.AUDIO_CODEC} frames, "
+          f"{args.delay_ms:g} ms one-way, {args.loss * 100:g}% loss")
+    print(f"    {'jitter':>6} {'p50 ms':>7} {'p95 ms':>7} {'loss %':>7} {'late':>5} "
+          f"{'concealed':>9} {'est jitter':>10} {'buffer ms':>9}")
+    try:
+        for i, jitter_ms in enumerate(args.jitter_ms):
+            s, sent, dropped = await run(args, jitter_ms / 1000, RELAY_PORT + i, rng)
+            print(f"    {jitter_ms:>6g} {s.get('latency_p50_ms', 0):>7.1f} {s.get('latency_p95_ms', 0):>7.1f} "
+                  f"{s['loss'] * 100:>7.1f} {s['late']:>5} {s['concealed']:>9} "
+                  f"{s['jitter_ms']:>10.1f} {s['target_ms']:>9.0f}")
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audio over QUIC datagrams through a jittery link")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--delay-ms", type=float, default=10)
+    parser.add_argument("--jitter-ms", type=float, nargs="+", default=[0, 10, 30, 60])
+    parser.add_argument("--loss", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    # Every close logs a warning from the client protocol
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Discovery Beacon Benchmark.
+Per-beacon cost of the receive path in DiscoveryProtocol.datagram_received
+for binary beacons, legacy JSON beacons, our own echoed beacons and garbage,
+plus the cost of building a beacon on the send side.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_beacons [--count 200000]
+"""
+import argparse
+import json
+import os
+import time
+
+from config import cfg
+from src.networking.discovery import DiscoveryProtocol, encode_beacon
+
+
+def timed(fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Beacon encode/parse cost")
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args()
+
+    found = []
+    proto = DiscoveryProtocol(lambda info, ip: found.append(ip) if len(found) < 1 else None)
+    addr = ("10.0.0.2", cfg.DISCOVERY_PORT)
+    other_id = cfg.node_id ^ 0xFFFF
+
+    packets = {
+        "binary": encode_beacon(other_id, cfg.DEFAULT_PORT, 0x3, 7, "hampter-node-b"),
+        "json": cfg.BEACON_MAGIC + json.dumps({"hostname": "hampter-node-b", "status": "READY"}).encode(),
+        "own binary": encode_beacon(cfg.node_id, cfg.DEFAULT_PORT, 0x3, 7, proto.hostname),
+        "garbage": os.urandom(40),
+        "bad json": cfg.BEACON_MAGIC + b"{not json",
+    }
+    print(f"[*] {args.count} beacons per case")
+    print(f"    {'case':<11} {'bytes':>6} {'us/beacon':>10} {'beacons/s':>12}")
+    for name, pkt in packets.items():
+        us = timed(lambda: proto.datagram_received(pkt, addr), args.count)
+        print(f"    {name:<11} {len(pkt):>6} {us:>10.3f} {1e6 / us:>12,.0f}")
+
+    print("\n    send side, per interval:")
+    json_build = lambda: cfg.BEACON_MAGIC + json.dumps({"hostname": cfg.get_hostname(), "status": "READY"}).encode()
+    print(f"    {'json rebuild':<14} {timed(json_build, args.count // 10):8.3f} us")
+    print(f"    {'binary cached':<14} {'0.000':>8} us (built once, rebuilt only on state change)")
+    print(f"    {'binary build':<14} {timed(lambda: encode_beacon(1, 2, 3, 4, 'hampter'), args.count // 10):8.3f} us")
+
+
+if __name__ == "__main__":
+    main()
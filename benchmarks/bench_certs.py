@@ -0,0 +1,84 @@
+"""
+Node Identity Benchmark.
+Compares the key algorithms CERT_KEY_TYPE can pick:
+  keygen ms     time to generate the private key (first launch cost)
+  hs/s          full QUIC handshakes per second against a loopback server
+                using a certificate of that type (no session resumption)
+
+Certificates are written to a temporary directory, src/certs is untouched.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_certs [--keygen 20] [--handshakes 50]
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import statistics
+import tempfile
+import time
+
+from aioquic.asyncio import connect, serve
+from aioquic.quic.configuration import QuicConfiguration
+
+from src.protocol.certificates import KEY_TYPES, CertificateManager, generate_private_key
+from src.protocol.quic_server import HampterProtocol, build_quic_config
+
+PORT = 15610
+
+
+def keygen_ms(key_type, rounds):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        generate_private_key(key_type)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), max(times)
+
+
+async def handshakes_per_sec(cert_path, key_path, count, port):
+    server = await serve(
+        "127.0.0.1", port,
+        configuration=build_quic_config(cert_path, key_path),
+        create_protocol=HampterProtocol,
+    )
+    try:
+        busy = 0.0
+        for _ in range(count):
+            config = QuicConfiguration(is_client=True)
+            config.verify_mode = ssl.CERT_NONE
+            start = time.perf_counter()
+            async with connect("127.0.0.1", port, configuration=config):
+                # Only the handshake counts, not the close/drain afterwards
+                busy += time.perf_counter() - start
+        return count / busy
+    finally:
+        server.close()
+
+
+async def main_async(args):
+    HampterProtocol._on_connect_callback = lambda peer, protocol: None
+    HampterProtocol._on_disconnect_callback = lambda peer, protocol: None
+
+    print(f"    {'key':<8} {'keygen ms (med/max)':>20} {'hs/s':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        # One port per run, a closed server socket isn't released straight away
+        for i, key_type in enumerate(KEY_TYPES):
+            med, worst = keygen_ms(key_type, args.keygen)
+            cert_path = os.path.join(tmp, f"{key_type}_cert.pem")
+            key_path = os.path.join(tmp, f"{key_type}_key.pem")
+            CertificateManager.ensure_certs(key_type, cert_path, key_path)
+            rate = await handshakes_per_sec(cert_path, key_path, args.handshakes, PORT + i)
+            print(f"    {key_type:<8} {med:>10.2f} / {worst:>7.2f} {rate:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Key algorithm keygen and handshake benchmark")
+    parser.add_argument("--keygen", type=int, default=20, help="keys generated per algorithm")
+    parser.add_argument("--handshakes", type=int, default=50, help="handshakes per algorithm")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Dashboard Render Benchmark.
+Layouts per second and memory allocated per frame for Dashboard.generate_layout,
+with the per-panel cache ("cached") and with every panel rebuilt each frame
+("full", how the dashboard used to work).
+
+Two workloads: typing (only the input line changes) and chat (a new message
+every frame). Each frame is also rendered to an off-screen console, since
+that is what the Live display does with the layout.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_dashboard [--frames 2000]
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+from rich.console import Console
+
+from src.ui.dashboard import Dashboard
+
+
+def make_dashboard():
+    dash = Dashboard()
+    dash.console = Console(file=io.StringIO(), width=120, height=40)
+    dash.update_info("wlan0", "10.0.0.1")
+    dash.update_peer("MESH", "10.0.0.2", name="node-b", count=3)
+    for i in range(20):
+        dash.add_log("PEER(10.0.0.2)", f"warm-up message {i}")
+        dash.add_debug(f"debug line {i}")
+    return dash
+
+
+def step(dash, workload, i):
+    if workload == "typing":
+        dash.update_input("hello hampter"[: i % 13 + 1])
+    else:
+        dash.add_log("PEER(10.0.0.2)", f"message number {i}")
+
+
+def run(workload, full, frames, render):
+    dash = make_dashboard()
+    console = dash.console
+    dash.generate_layout()
+
+    def frame(i):
+        step(dash, workload, i)
+        if full:
+            dash.invalidate()
+        layout = dash.generate_layout()
+        if render:
+            console.file.seek(0)
+            console.file.truncate()
+            console.print(layout)
+
+    start = time.perf_counter()
+    for i in range(frames):
+        frame(i)
+    elapsed = time.perf_counter() - start
+
+    # Allocation pass, separate so tracing overhead doesn't skew the timing
+    sample = min(frames, 200)
+    tracemalloc.start()
+    total_peak = 0
+    for i in range(sample):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        frame(i)
+        total_peak += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return frames / elapsed, total_peak / sample / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard layout throughput")
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"[*] {args.frames} frames per run")
+    print(f"    {'workload':<8} {'render':<7} {'mode':<7} {'layouts/s':>11} {'KiB/frame':>10}")
+    for render in (False, True):
+        frames = args.frames if not render else max(args.frames // 10, 50)
+        for workload in ("typing", "chat"):
+            for full in (True, False):
+                rate, kib = run(workload, full, frames, render)
+                print(f"    {workload:<8} {'yes' if render else 'no':<7} {'full' if full else 'cached':<7} "
+                      f"{rate:>11,.0f} {kib:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Framing Micro-Benchmark.
+Measures how many frames per second the stream FrameDecoder parses.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_framing [--frames N] [--size BYTES]
+"""
+import argparse
+import time
+
+from src.protocol.framing import FrameDecoder, encode_frame
+
+
+def build_stream(frames, size):
+    payload = ("hampter " * (size // 8 + 1))[:size].encode('utf-8')
+    return b"".join(encode_frame(payload) for _ in range(frames))
+
+
+def run(stream, chunk_size, frames):
+    received = 0
+
+    def on_frame(frame):
+        nonlocal received
+        received += 1
+
+    decoder = FrameDecoder(on_frame)
+    view = memoryview(stream)
+    start = time.perf_counter()
+    if chunk_size:
+        for off in range(0, len(view), chunk_size):
+            decoder.feed(view[off:off + chunk_size])
+    else:
+        decoder.feed(view)
+    elapsed = time.perf_counter() - start
+    assert received == frames, f"expected {frames} frames, got {received}"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FrameDecoder throughput")
+    parser.add_argument("--frames", type=int, default=200_000)
+    parser.add_argument("--size", type=int, default=64, help="payload bytes per frame")
+    args = parser.parse_args()
+
+    stream = build_stream(args.frames, args.size)
+    print(f"[*] {args.frames} frames x {args.size} B payload ({len(stream) / 1e6:.1f} MB)")
+    # 0 = one big chunk, then typical QUIC packet sizes, then pathological splits
+    for chunk in (0, 1350, 4096, 7, 1):
+        if chunk == 1 and args.frames * args.size > 5_000_000:
+            continue
+        elapsed = run(stream, chunk, args.frames)
+        label = "whole" if chunk == 0 else f"{chunk} B"
+        print(f"    chunk={label:>7}: {args.frames / elapsed:>12,.0f} frames/s  "
+              f"{len(stream) / elapsed / 1e6:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
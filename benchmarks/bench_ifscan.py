@@ -0,0 +1,121 @@
+"""
+Interface Scan Benchmark.
+Builds a fake /sys/class/net tree and checks what InterfaceManager finds in
+it, then times a scan three ways:
+
+"subprocess" replays the old scan: `ip link show`, then `ethtool -i` for
+every wl* interface (on this machine's real interfaces, the fake tree has
+no kernel behind it). "sysfs" is a fresh scan of the fake tree, "cached" a
+repeat scan with no link change in between.
+
+The fake tree:
+  wlan0          iwlwifi, PCI 8086:2725   -> AX210
+  wlp2s0         iwlwifi, PCI 8086:2723   -> AX200, not an AX210
+  wlx00c0ca0001  rtl8xxxu over USB, phy80211 link, no PCI IDs
+  eth0, lo       not wireless
+
+A scan that doesn't match that exits 1 before any timing.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_ifscan [--iterations 200]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.networking.interface_mgr import InterfaceManager
+
+FAKE_IFACES = {
+    # name: (wireless dir, phy80211 link, driver, vendor, device, mac)
+    "wlan0": (True, True, "iwlwifi", "0x8086", "0x2725", "a0:b1:c2:00:00:01"),
+    "wlp2s0": (True, True, "iwlwifi", "0x8086", "0x2723", "a0:b1:c2:00:00:02"),
+    "wlx00c0ca0001": (False, True, "rtl8xxxu", None, None, "00:c0:ca:00:00:01"),
+    "eth0": (False, False, "bcmgenet", None, None, "dc:a6:32:00:00:01"),
+    "lo": (False, False, None, None, None, "00:00:00:00:00:00"),
+}
+EXPECTED = {
+    "wlan0": ("iwlwifi", "8086:2725", True),
+    "wlp2s0": ("iwlwifi", "8086:2723", False),
+    "wlx00c0ca0001": ("rtl8xxxu", None, False),
+}
+
+
+def make_fake_sysfs(root):
+    """Lay out enough of /sys for the scanner: class/net/<iface> and the drivers they link to."""
+    net = os.path.join(root, "class", "net")
+    for name, (wireless, phy, driver, vendor, device, mac) in FAKE_IFACES.items():
+        base = os.path.join(net, name)
+        os.makedirs(os.path.join(base, "device"))
+        with open(os.path.join(base, "address"), "w") as f:
+            f.write(mac + "\n")
+        if wireless:
+            os.makedirs(os.path.join(base, "wireless"))
+        if phy:
+            os.makedirs(os.path.join(root, "class", "ieee80211", f"phy-{name}"))
+            os.symlink(os.path.join(root, "class", "ieee80211", f"phy-{name}"), os.path.join(base, "phy80211"))
+        if driver:
+            target = os.path.join(root, "bus", "drivers", driver)
+            os.makedirs(target, exist_ok=True)
+            os.symlink(target, os.path.join(base, "device", "driver"))
+        for attr, value in (("vendor", vendor), ("device", device)):
+            if value:
+                with open(os.path.join(base, "device", attr), "w") as f:
+                    f.write(value + "\n")
+    return net
+
+
+def legacy_scan():
+    found = []
+    result = subprocess.run(['ip', 'link', 'show'], capture_output=True, text=True)
+    for line in result.stdout.split('\n'):
+        match = re.search(r'\d+: ([\w\d]+):', line)
+        if match and match.group(1).startswith('wl'):
+            try:
+                ethtool = subprocess.run(['ethtool', '-i', match.group(1)], capture_output=True, text=True)
+                found.append((match.group(1), "driver: iwlwifi" in ethtool.stdout))
+            except FileNotFoundError:
+                found.append((match.group(1), False))
+    return found
+
+
+def timed(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interface scan: subprocess vs sysfs")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        net = make_fake_sysfs(tmp)
+        found = {i['name']: (i['driver'], i['pci_id'], i['is_ax210'])
+                 for i in InterfaceManager.scan_interfaces(net, refresh=True)}
+        ok = found == EXPECTED
+        print(f"[*] fake sysfs: {'OK' if ok else 'MISMATCH'}")
+        for name, details in sorted(found.items()):
+            print(f"    {name:<14} driver {details[0]:<9} pci {details[1] or '-':<9} ax210 {details[2]}")
+        if not ok:
+            print(f"    expected {EXPECTED}")
+            sys.exit(1)
+
+        caching = InterfaceManager._watcher.sock is not None
+        n = args.iterations
+        legacy = timed(legacy_scan, max(1, n // 10))
+        fresh = timed(lambda: InterfaceManager.scan_interfaces(net, refresh=True), n)
+        cached = timed(lambda: InterfaceManager.scan_interfaces(net), n)
+        print(f"    {'subprocess':<11} {legacy * 1e6:>9,.0f} us/scan")
+        print(f"    {'sysfs':<11} {fresh * 1e6:>9,.0f} us/scan")
+        print(f"    {'cached':<11} {cached * 1e6:>9,.1f} us/scan"
+              f"{'' if caching else '  (no netlink here, not cached)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+LCD Writer Benchmark.
+Sends a burst of messages to the display through the fake SerLCD backend
+(simulated I2C delays) and reports how long the caller is blocked and how
+much bus traffic reaches the panel.
+
+"sync" replays the old behaviour: clearScreen + two full prints inline.
+"worker" is LCDDisplay with its coalescing, diffing writer thread.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_lcd [--burst 50] [--gap-ms 5]
+"""
+import argparse
+import time
+
+from src.hw.display import LCDDisplay
+from src.hw.fake_serlcd import FakeSerLCD
+
+
+def sync_show(lcd, sender, message):
+    lcd.clearScreen()
+    lcd.print(f"FR: {sender[:12]}")
+    lcd.setCursor(0, 1)
+    lcd.print(message[:16])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LCD writer burst benchmark")
+    parser.add_argument("--burst", type=int, default=50, help="messages in the burst")
+    parser.add_argument("--gap-ms", type=float, default=5, help="time between messages")
+    args = parser.parse_args()
+
+    msgs = [("10.0.0.2", f"message #{i:03d}") for i in range(args.burst)]
+
+    fake = FakeSerLCD()
+    start = time.perf_counter()
+    worst = 0.0
+    for sender, text in msgs:
+        t = time.perf_counter()
+        sync_show(fake, sender, text)
+        worst = max(worst, time.perf_counter() - t)
+        time.sleep(args.gap_ms / 1000)
+    sync_total = time.perf_counter() - start
+    print(f"[*] burst of {args.burst} messages, {args.gap_ms} ms apart")
+    print(f"    sync:   caller blocked {sync_total - args.burst * args.gap_ms / 1000:6.2f} s total, "
+          f"worst call {worst * 1000:6.1f} ms, {fake.chars_written} chars, {fake.clears} clears, "
+          f"bus busy {fake.busy_time:5.2f} s")
+
+    fake = FakeSerLCD()
+    display = LCDDisplay(backend=fake)
+    display.flush()
+    base_chars, base_busy = fake.chars_written, fake.busy_time
+    blocked = 0.0
+    worst = 0.0
+    start = time.perf_counter()
+    for sender, text in msgs:
+        t = time.perf_counter()
+        display.show_msg(sender, text)
+        dt = time.perf_counter() - t
+        blocked += dt
+        worst = max(worst, dt)
+        time.sleep(args.gap_ms / 1000)
+    display.flush()
+    drained = time.perf_counter() - start
+    display.close()
+    assert fake.lines()[1].rstrip() == msgs[-1][1], fake.lines()
+    print(f"    worker: caller blocked {blocked:6.4f} s total, worst call {worst * 1000:6.3f} ms, "
+          f"{fake.chars_written - base_chars} chars, {fake.clears - 1} clears, "
+          f"bus busy {fake.busy_time - base_busy:5.2f} s, {display.stats['written']} panel updates "
+          f"({display.stats['coalesced']} coalesced), last frame on screen after {drained:5.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Logging Hot Path Benchmark.
+Times a logger.info call as the event loop sees it, one call at a time:
+
+"sync file" is the old basicConfig(filename=...) setup, the caller formats
+and writes the line itself. "queue" is src/ui/logs.setup_logging, the
+caller only queues the record and a writer thread does file, rotation
+and ring buffer. "filtered" is a logger below its level (LOG_LEVELS),
+e.g. aioquic's per-packet debug lines.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_logging [--calls 50000]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from config import cfg
+from src.ui import logs
+
+
+def measure(logger, calls, level=logging.INFO):
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter_ns()
+        logger.log(level, f"SRV: RX Data from 10.0.0.{i % 250} seq {i}")
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    return sum(samples) / calls, samples[int(calls * 0.99)], samples[-1]
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call cost of logging on the loop thread")
+    parser.add_argument("--calls", type=int, default=50000)
+    args = parser.parse_args()
+    n = args.calls
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = []
+
+        reset_root()
+        logging.basicConfig(filename=os.path.join(tmp, "sync.log"), level=logging.DEBUG, format=logs.FILE_FORMAT)
+        results.append(("sync file", measure(logging.getLogger("QuicServer"), n)))
+        reset_root()
+
+        cfg.LOG_MAX_BYTES = 1024 * 1024
+        ring = logs.setup_logging(os.path.join(tmp, "queue.log"))
+        results.append(("queue", measure(logging.getLogger("QuicServer"), n)))
+        results.append(("filtered", measure(logging.getLogger("quic"), n, logging.DEBUG)))
+        drain = time.perf_counter()
+        logs.shutdown()
+        drain = time.perf_counter() - drain
+
+        files = sorted(f for f in os.listdir(tmp) if f.startswith("queue.log"))
+        on_disk = sum(os.path.getsize(os.path.join(tmp, f)) for f in files)
+
+    print(f"[*] {n} logger.info calls, caller-side cost per call")
+    print(f"    {'mode':<10} {'mean':>8} {'p99':>8} {'worst':>9}")
+    for name, (mean, p99, worst) in results:
+        print(f"    {name:<10} {mean / 1000:>6.2f}us {p99 / 1000:>6.2f}us {worst / 1000:>7.0f}us")
+    print(f"    queue: writer drained the rest in {drain * 1000:.0f} ms, {len(files)} file(s) "
+          f"{on_disk / 1e6:.1f} MB (rotating at {cfg.LOG_MAX_BYTES / 1e6:.1f} MB, {cfg.LOG_BACKUPS} kept), "
+          f"{len(ring.records)} records in the ring")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Loopback Mesh Benchmark.
+Brings up N nodes on 127.0.0.x with the real QUIC stack (HampterProtocol
+servers from build_quic_config, QuicClient links) and measures the data
+path. There's no discovery: node 0 is given the static peer list and dials
+everyone at once, the way it would after a burst of beacons.
+
+Nodes 1..N-1 are echo nodes. Every chat message carries a sequence number
+and its send time; when asked, the receiver answers on the same link with
+the time it got it. Loopback shares one clock, so that is one-way latency.
+
+  handshake   every link's handshake (QuicClient.handshake_time), all sizes
+  latency     --messages paced messages node 0 -> node 1, one-way
+  throughput  --burst messages sent back to back node 0 -> node 1; only the
+              last asks for an answer (the stream is ordered), so this is
+              send of the first to arrival of the last
+  fanout      --rounds times, one message to every peer (as send_chat does);
+              time until the last peer has it, for each N in --nodes
+
+Echo nodes run in this process by default, one loop for everything, which
+is what a single node's CPU has to cover anyway. --processes puts each
+echo node in its own process, so node 0 is measured on its own.
+
+Results go to --json (default benchmarks/results/mesh-<rev>.json) to keep
+per release. --baseline old.json compares against an earlier run and exits
+non-zero if anything got worse by more than --tolerance.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_mesh [--nodes 2,4,8] [--processes] [--json out.json] [--baseline old.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import struct
+import subprocess
+import sys
+import time
+
+from aioquic.asyncio import serve
+
+from config import cfg
+from src.protocol.certificates import CertificateManager
+from src.protocol.quic_client import QuicClient
+from src.protocol.quic_server import HampterProtocol, build_quic_config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_PORT = 15700
+# seq, flags, send time (monotonic ns), then padding up to --size
+MESSAGE = struct.Struct(">IBQ")
+# seq, send time, receive time
+ANSWER = struct.Struct(">IQQ")
+WANT_ANSWER = 0x01
+
+
+def node_addr(index):
+    return f"127.0.0.{index + 10}"
+
+
+def summarize(samples_ns):
+    """ms percentiles of a list of ns durations."""
+    if not samples_ns:
+        return None
+    ordered = sorted(samples_ns)
+
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] / 1e6, 3)
+
+    return {"count": len(ordered), "mean_ms": round(sum(ordered) / len(ordered) / 1e6, 3),
+            "p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": round(ordered[-1] / 1e6, 3)}
+
+
+def install_echo():
+    """Server callbacks for echo nodes. They are class-wide, so one set serves every node in a process."""
+    links = {}
+
+    def on_connect(peer, protocol):
+        links[tuple(peer[:2])] = protocol
+
+    def on_disconnect(peer, protocol):
+        if links.get(tuple(peer[:2])) is protocol:
+            del links[tuple(peer[:2])]
+
+    def on_message(data, peer):
+        received = time.monotonic_ns()
+        seq, flags, sent = MESSAGE.unpack_from(data)
+        if flags & WANT_ANSWER:
+            protocol = links.get(tuple(peer[:2]))
+            if protocol:
+                protocol.send_message(ANSWER.pack(seq, sent, received))
+
+    HampterProtocol._on_connect_callback = on_connect
+    HampterProtocol._on_disconnect_callback = on_disconnect
+    HampterProtocol._on_message_callback = on_message
+
+
+async def start_echo_nodes(indexes, port):
+    install_echo()
+    config = build_quic_config(cfg.CERT_PATH, cfg.KEY_PATH)
+    return [await serve(node_addr(i), port, configuration=config, create_protocol=HampterProtocol)
+            for i in indexes]
+
+
+def echo_process(index, port, ready):
+    logging.basicConfig(level=logging.ERROR)
+
+    async def run():
+        await start_echo_nodes([index], port)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+class Link:
+    """Node 0's side of one link: a QuicClient and the answers that come back on it."""
+
+    def __init__(self, index, port):
+        self.index = index
+        self.port = port
+        self.client = QuicClient(cfg.CERT_PATH)
+        self.answers = {}  # seq -> (sent, received)
+        self.waiting = {}  # seq -> future
+        self.up = None
+        self.task = None
+
+    def on_message(self, data, _):
+        seq, sent, received = ANSWER.unpack_from(data)
+        self.answers[seq] = (sent, received)
+        waiter = self.waiting.pop(seq, None)
+        if waiter and not waiter.done():
+            waiter.set_result(received)
+
+    def connect(self):
+        self.up = asyncio.get_running_loop().create_future()
+        self.task = asyncio.ensure_future(self.client.connect_to(
+            node_addr(self.index), self.port, self.on_message,
+            lambda: self.up.done() or self.up.set_result(self.client.handshake_time)))
+        return self.up
+
+    def send(self, seq, size, answer=True):
+        payload = MESSAGE.pack(seq, WANT_ANSWER if answer else 0, time.monotonic_ns())
+        self.client.send_message(payload.ljust(size, b"."))
+
+    def expect(self, seq):
+        future = self.waiting[seq] = asyncio.get_running_loop().create_future()
+        return future
+
+    async def close(self):
+        self.client.close()
+        if self.task:
+            await asyncio.wait([self.task], timeout=5)
+
+
+async def measure(n, args, pair=None):
+    """Bring up links from node 0 to nodes 1..n-1 and run the measurements. Fills pair with latency/throughput if given."""
+    servers = []
+    if not args.processes:
+        servers = await start_echo_nodes(range(1, n), args.port)
+    links = [Link(i, args.port) for i in range(1, n)]
+    result = {"nodes": n}
+    try:
+        start = time.monotonic_ns()
+        handshakes = await asyncio.wait_for(asyncio.gather(*(link.connect() for link in links)), 30)
+        result["all_linked_ms"] = round((time.monotonic_ns() - start) / 1e6, 3)
+        result["handshake"] = summarize([int(h * 1e9) for h in handshakes])
+        result["handshake_ns"] = [int(h * 1e9) for h in handshakes]
+        seq = 0
+
+        if pair is not None:
+            link = links[0]
+            # Paced: one message at a time, on an otherwise idle link
+            one_way = []
+            for _ in range(args.messages):
+                seq += 1
+                waiter = link.expect(seq)
+                link.send(seq, args.size)
+                await asyncio.wait_for(waiter, 5)
+                sent, received = link.answers[seq]
+                one_way.append(received - sent)
+                await asyncio.sleep(args.gap_ms / 1000)
+            pair["latency"] = summarize(one_way)
+
+            # Back to back, answer on the last one only
+            first = seq + 1
+            seq += args.burst
+            waiter = link.expect(seq)
+            started = time.monotonic_ns()
+            for s in range(first, seq):
+                link.send(s, args.size, answer=False)
+            link.send(seq, args.size)
+            queued = time.monotonic_ns() - started
+            received = await asyncio.wait_for(waiter, 60)
+            elapsed = received - started
+            pair["throughput"] = {
+                "messages": args.burst, "size": args.size,
+                "msgs_per_s": round(args.burst / (elapsed / 1e9)),
+                "mbit_per_s": round(args.burst * args.size * 8 / (elapsed / 1e9) / 1e6, 2),
+                "send_loop_ms": round(queued / 1e6, 3),
+            }
+
+        # Fan-out: one message to every peer, time to the last arrival
+        fanout = []
+        for _ in range(args.rounds):
+            seq += 1
+            waiters = [link.expect(seq) for link in links]
+            started = time.monotonic_ns()
+            for link in links:
+                link.send(seq, args.size)
+            arrivals = await asyncio.wait_for(asyncio.gather(*waiters), 10)
+            fanout.append(max(arrivals) - started)
+            await asyncio.sleep(args.gap_ms / 1000)
+        result["fanout"] = summarize(fanout)
+    finally:
+        for link in links:
+            await link.close()
+        for server in servers:
+            server.close()
+    return result
+
+
+def run_size(n, args, pair=None):
+    procs = []
+    if args.processes:
+        ctx = multiprocessing.get_context("fork")
+        for i in range(1, n):
+            ready = ctx.Event()
+            proc = ctx.Process(target=echo_process, args=(i, args.port, ready), daemon=True)
+            proc.start()
+            procs.append((proc, ready))
+        for proc, ready in procs:
+            if not ready.wait(30):
+                raise RuntimeError(f"echo node {proc.pid} didn't come up")
+    try:
+        return asyncio.run(measure(n, args, pair))
+    finally:
+        for proc, _ in procs:
+            proc.terminate()
+            proc.join(5)
+
+
+def revision():
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+# (path into the results, True if higher is better)
+COMPARED = [
+    (("handshake", "p50_ms"), False),
+    (("handshake", "p95_ms"), False),
+    (("latency", "p50_ms"), False),
+    (("latency", "p99_ms"), False),
+    (("throughput", "msgs_per_s"), True),
+]
+
+
+def flatten(report):
+    """Comparable numbers by name, fan-out per size."""
+    values = {}
+    for path, higher in COMPARED:
+        node = report["results"]
+        for key in path:
+            node = node.get(key) if isinstance(node, dict) else None
+        if node is not None:
+            values[".".join(path)] = (node, higher)
+    for size in report["results"].get("fanout", []):
+        values[f"fanout.{size['nodes']}.p95_ms"] = (size["fanout"]["p95_ms"], False)
+    return values
+
+
+def compare(report, baseline, tolerance):
+    """Print each number against the baseline, return the ones that regressed."""
+    now, before = flatten(report), flatten(baseline)
+    regressions = []
+    print(f"\n[*] vs {baseline.get('revision') or 'baseline'} (tolerance {tolerance:.0%})")
+    if baseline.get("params") != report["params"]:
+        print(f"    (run with different parameters: {baseline.get('params')})")
+    for name, (value, higher) in now.items():
+        if name not in before:
+            continue
+        old = before[name][0]
+        if not old:
+            continue
+        change = (value - old) / old
+        worse = change < -tolerance if higher else change > tolerance
+        print(f"    {name:<24} {old:>10g} -> {value:<10g} {change:+.0%}{'  REGRESSION' if worse else ''}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-node QUIC data path on loopback")
+    parser.add_argument("--nodes", default="2,4,8", help="mesh sizes to run, including node 0")
+    parser.add_argument("--processes", action="store_true", help="one process per echo node")
+    parser.add_argument("--messages", type=int, default=500, help="paced messages for latency")
+    parser.add_argument("--burst", type=int, default=20000, help="back to back messages for throughput")
+    parser.add_argument("--rounds", type=int, default=100, help="fan-out rounds per size")
+    parser.add_argument("--size", type=int, default=64, help="message bytes")
+    parser.add_argument("--gap-ms", type=float, default=2.0, help="pause between paced sends")
+    parser.add_argument("--port", type=int, default=BASE_PORT)
+    parser.add_argument("--json", help="where to write results (- for stdout)")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed change before it's a regression")
+    args = parser.parse_args()
+    args.size = max(args.size, MESSAGE.size)
+    sizes = sorted({int(n) for n in args.nodes.split(",") if int(n) >= 2})
+    # Every close logs a warning from the client protocol
+    logging.basicConfig(level=logging.ERROR)
+    CertificateManager.ensure_certs()
+
+    pair = {}
+    fanout = []
+    handshakes = []
+    for n in sizes:
+        # Latency and throughput once, on the smallest mesh
+        result = run_size(n, args, pair if n == sizes[0] else None)
+        handshakes.extend(result.pop("handshake_ns"))
+        fanout.append(result)
+        print(f"[*] {n} nodes: linked in {result['all_linked_ms']:.0f} ms, handshake p50 "
+              f"{result['handshake']['p50_ms']:.1f} ms, fan-out p50 {result['fanout']['p50_ms']:.2f} ms "
+              f"p95 {result['fanout']['p95_ms']:.2f} ms")
+    if pair:
+        lat, tput = pair["latency"], pair["throughput"]
+        print(f"    latency  p50 {lat['p50_ms']:.3f} ms  p95 {lat['p95_ms']:.3f} ms  p99 {lat['p99_ms']:.3f} ms")
+        print(f"    throughput {tput['msgs_per_s']:,} msgs/s ({tput['mbit_per_s']} Mbit/s at {args.size} B)")
+
+    rev = revision()
+    report = {
+        "benchmark": "mesh",
+        "revision": rev,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": {"nodes": sizes, "processes": args.processes, "messages": args.messages,
+                   "burst": args.burst, "rounds": args.rounds, "size": args.size, "gap_ms": args.gap_ms},
+        "results": {"handshake": summarize(handshakes), **pair, "fanout": fanout},
+    }
+    text = json.dumps(report, indent=2)
+    path = args.json or os.path.join(ROOT, "benchmarks", "results", f"mesh-{rev or 'unknown'}.json")
+    if path == "-":
+        print(text)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text + "\n")
+        print(f"[*] results in {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"[!] {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
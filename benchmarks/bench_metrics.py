@@ -0,0 +1,77 @@
+"""
+Metrics Benchmark.
+What the instrumentation costs on the loop, per call:
+
+"dict +=" is the per-module stats dicts the metrics sit next to, the floor.
+"counter" is FRAMES.inc with three labels, as on every frame sent or
+received. "histogram" is one observe, "call_timed" wraps a no-op callback
+the way the protocols wrap the app's. Then a full render of the Prometheus
+text with --peers linked peers worth of series, as one scrape or file write.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_metrics [--calls 200000] [--peers 20]
+"""
+import argparse
+import time
+
+from src.ui.metrics import Registry, CALLBACK_BUCKETS, call_timed, CALLBACKS
+
+
+def per_call(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of counters, histograms and export")
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--peers", type=int, default=20)
+    args = parser.parse_args()
+    n = args.calls
+
+    registry = Registry()
+    frames = registry.counter("hampter_frames_total", "Frames", ("peer", "stream", "direction"))
+    latency = registry.histogram("hampter_callback_seconds", "Callbacks", CALLBACK_BUCKETS, ("callback",))
+    stats = {"rx": 0}
+
+    def bump(i):
+        stats["rx"] += 1
+
+    def noop(data):
+        pass
+
+    results = [
+        ("dict +=", per_call(bump, n)),
+        ("counter", per_call(lambda i: frames.inc("10.0.0.2", "chat", "rx"), n)),
+        ("histogram", per_call(lambda i: latency.observe(0.0001, "message"), n)),
+        ("call_timed", per_call(lambda i: call_timed("bench", noop, i), n)),
+        ("bare call", per_call(noop, n)),
+    ]
+    del CALLBACKS.series[("bench",)]
+
+    print(f"[*] {n} calls each, per call")
+    for name, seconds in results:
+        print(f"    {name:<11} {seconds * 1e9:>6.0f} ns")
+
+    # A node's worth of series: every peer x stream x direction, plus the histograms
+    for p in range(args.peers):
+        ip = f"10.0.0.{p + 2}"
+        for stream in ("control", "chat", "bulk", "datagram"):
+            for direction in ("rx", "tx"):
+                frames.inc(ip, stream, direction, by=p + 1)
+    for callback in ("message", "control", "bulk", "datagram", "peer_found"):
+        latency.observe(0.0002, callback)
+    start = time.perf_counter()
+    rounds = 200
+    for _ in range(rounds):
+        text = registry.render()
+    render = (time.perf_counter() - start) / rounds
+    series = sum(1 for line in text.splitlines() if not line.startswith("#"))
+    print(f"    render     {render * 1e6:>6.0f} us for {series} lines ({len(text) / 1024:.1f} KB), "
+          f"{args.peers} peers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Broadcast Airtime Benchmark.
+Compares bytes and airtime on the wire for one chat line sent to N peers:
+today's unicast QUIC fan-out versus the encrypted multicast channel.
+
+The QUIC cost is measured on a real aioquic connection pair (data packets
+plus the ACKs they trigger). Airtime uses a simple 802.11 model: every frame
+pays DIFS + mean backoff + PHY preamble, unicast frames also pay SIFS + ACK.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_multicast [--size 80] [--msgs-per-sync 5]
+"""
+import argparse
+
+from config import cfg
+from src.networking.multicast import HEADER, SYNC_MSG
+from src.protocol.control import CHAT_STREAM_ID, CONTROL_STREAM_ID, CTRL_GROUP_SYNC, encode_control
+from src.protocol.framing import encode_frame
+from benchmarks.quic_pair import QuicPair
+
+IP_UDP_OVERHEAD = 28
+MAC_OVERHEAD = 36  # 802.11 header + LLC/SNAP + FCS
+DIFS_US = 34
+BACKOFF_US = 67.5  # CWmin 15, 9 us slots
+PREAMBLE_US = 20
+SIFS_US = 16
+ACK_BYTES = 14
+AEAD_TAG = 16
+
+
+def frame_airtime_us(payload, rate_mbps, unicast, basic_mbps):
+    bits = (payload + IP_UDP_OVERHEAD + MAC_OVERHEAD) * 8
+    t = DIFS_US + BACKOFF_US + PREAMBLE_US + bits / rate_mbps
+    if unicast:
+        t += SIFS_US + PREAMBLE_US + ACK_BYTES * 8 / basic_mbps
+    return t
+
+
+def measure_unicast(pair, stream_id, data):
+    """Returns [(size, direction)] of every datagram caused by sending data once."""
+    sizes = []
+    before = {k: list(v) for k, v in pair.sent.items()}
+    pair.client.send_stream_data(stream_id, data, end_stream=False)
+    pair.pump(settle=0.2)
+    pair.events("server")
+    for side in ("client", "server"):
+        count = pair.sent[side][0] - before[side][0]
+        nbytes = pair.sent[side][1] - before[side][1]
+        if count:
+            sizes += [nbytes / count] * count
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unicast fan-out vs multicast airtime")
+    parser.add_argument("--size", type=int, default=80, help="chat line length in bytes")
+    parser.add_argument("--msgs-per-sync", type=float, default=5,
+                        help="broadcasts per MULTICAST_SYNC_INTERVAL (sync cost is amortized over these)")
+    parser.add_argument("--rate-mbps", type=float, default=54, help="unicast PHY rate")
+    parser.add_argument("--mcast-mbps", type=float, default=6, help="multicast PHY rate (basic rate)")
+    parser.add_argument("--basic-mbps", type=float, default=6, help="rate used for 802.11 ACKs")
+    args = parser.parse_args()
+
+    pair = QuicPair()
+    pair.handshake()
+    msg = ("x" * args.size).encode('utf-8')
+
+    # Warm up so the congestion controller and ACK pattern are steady
+    for _ in range(5):
+        measure_unicast(pair, CHAT_STREAM_ID, encode_frame(msg))
+    chat = measure_unicast(pair, CHAT_STREAM_ID, encode_frame(msg))
+    sync = measure_unicast(pair, CONTROL_STREAM_ID,
+                           encode_control(CTRL_GROUP_SYNC, SYNC_MSG.pack(1, 1)))
+
+    def airtime(sizes, rate):
+        return sum(frame_airtime_us(s, rate, True, args.basic_mbps) for s in sizes)
+
+    chat_bytes = sum(s + IP_UDP_OVERHEAD for s in chat)
+    chat_air = airtime(chat, args.rate_mbps)
+    sync_bytes = sum(s + IP_UDP_OVERHEAD for s in sync)
+    sync_air = airtime(sync, args.rate_mbps)
+    mcast_payload = HEADER.size + len(msg) + AEAD_TAG
+    mcast_bytes = mcast_payload + IP_UDP_OVERHEAD
+    mcast_air = frame_airtime_us(mcast_payload, args.mcast_mbps, False, args.basic_mbps)
+
+    print(f"[*] {args.size} B chat line, unicast @ {args.rate_mbps} Mbps, "
+          f"multicast @ {args.mcast_mbps} Mbps, sync every {args.msgs_per_sync} msgs "
+          f"({cfg.MULTICAST_SYNC_INTERVAL}s)")
+    print(f"    per peer QUIC: {len(chat)} datagrams incl. ACKs, {chat_bytes:.0f} B, {chat_air:.0f} us")
+    print(f"    multicast:     1 datagram, {mcast_bytes} B, {mcast_air:.0f} us "
+          f"(+ sync {sync_bytes:.0f} B / {sync_air:.0f} us per peer per interval)")
+    print(f"\n    {'peers':>5} {'fanout B':>10} {'mcast B':>10} {'fanout us':>10} {'mcast us':>10} {'airtime x':>10}")
+    for n in (1, 2, 5, 10, 20, 50):
+        fan_b = n * chat_bytes
+        fan_us = n * chat_air
+        mc_b = mcast_bytes + n * sync_bytes / args.msgs_per_sync
+        mc_us = mcast_air + n * sync_air / args.msgs_per_sync
+        print(f"    {n:>5} {fan_b:>10.0f} {mc_b:>10.0f} {fan_us:>10.0f} {mc_us:>10.0f} {fan_us / mc_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
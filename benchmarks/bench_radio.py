@@ -0,0 +1,94 @@
+"""
+Radio Sampler Benchmark.
+Runs the link-quality parsers over the captured outputs in
+benchmarks/samples/ and checks the fields that matter, then feeds a
+RadioSampler a few synthetic rounds to show retry rates per interval and
+which stations rank_peers would push to the back.
+
+Timing is for the parse + join work done on the loop per round; the
+`iw` call itself runs as a subprocess and only its output is handled here. A parser that disagrees with the samples exits 1.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_radio [--iterations 2000]
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+
+from config import cfg
+from src.networking.radio import RadioSampler, is_poor, parse_arp, parse_proc_wireless, parse_station_dump
+
+SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+
+EXPECTED = {
+    "3c:22:fb:12:34:56": {"signal_dbm": -52, "tx_bitrate_mbps": 866.7, "tx_packets": 4321, "tx_retries": 87},
+    "a4:cf:12:ab:cd:ef": {"signal_dbm": -83, "tx_bitrate_mbps": 68.8, "tx_packets": 1810, "tx_retries": 912},
+    "5c:e9:1e:00:77:01": {"tx_packets": 0, "plink": "LISTEN"},
+}
+
+
+def load(name):
+    with open(os.path.join(SAMPLES, name)) as f:
+        return f.read()
+
+
+def check(dump, wireless, arp):
+    problems = []
+    stations = parse_station_dump(dump)
+    for mac, fields in EXPECTED.items():
+        for key, value in fields.items():
+            got = stations.get(mac, {}).get(key)
+            if got != value:
+                problems.append(f"{mac} {key}: {got!r} != {value!r}")
+    iface = parse_proc_wireless(wireless).get("wlan0") or {}
+    if (iface.get("level_dbm"), iface.get("missed_beacon")) != (-52.0, 4):
+        problems.append(f"/proc/net/wireless: {iface}")
+    macs = parse_arp(arp, "wlan0")
+    if macs != {"3c:22:fb:12:34:56": "10.0.0.2", "a4:cf:12:ab:cd:ef": "10.0.0.3"}:
+        problems.append(f"arp: {macs}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link quality parsers and sampler rounds")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    dump, wireless, arp = load("iw_station_dump.txt"), load("proc_net_wireless.txt"), load("proc_net_arp.txt")
+    problems = check(dump, wireless, arp)
+    print(f"[*] captured samples: {'OK' if not problems else 'MISMATCH'}")
+    for line in problems:
+        print(f"    {line}")
+    if problems:
+        sys.exit(1)
+
+    sampler = RadioSampler("wlan0")
+    n = args.iterations
+    start = time.perf_counter()
+    for _ in range(n):
+        sampler.update(parse_station_dump(dump), wireless, arp)
+    per_round = (time.perf_counter() - start) / n
+    print(f"    parse + join: {per_round * 1e6:.0f} us per round (3 stations)")
+
+    # Rounds where 10.0.0.2 stays clean and 10.0.0.3 degrades
+    sampler = RadioSampler("wlan0")
+    stations = parse_station_dump(dump)
+    print(f"    {'round':<6} {'10.0.0.2':<28} {'10.0.0.3':<28} poor")
+    for round_no in range(4):
+        sampler.update(copy.deepcopy(stations), wireless, arp)
+        cells = [RadioSampler.format(sampler.quality(ip)) for ip in ("10.0.0.2", "10.0.0.3")]
+        poor = [ip for ip in sorted(sampler.by_ip) if is_poor(sampler.quality(ip))]
+        print(f"    {round_no:<6} {cells[0]:<28} {cells[1]:<28} {', '.join(poor) or '-'}")
+        good = stations["3c:22:fb:12:34:56"]
+        good["tx_packets"] += 1000
+        good["tx_retries"] += 20
+        weak = stations["a4:cf:12:ab:cd:ef"]
+        weak["tx_packets"] += 500
+        weak["tx_retries"] += 100 * (round_no + 1)
+    print(f"    (poor = signal < {cfg.RADIO_WEAK_DBM} dBm or retry rate > {cfg.RADIO_MAX_RETRY_RATE:.0%})")
+
+
+if __name__ == "__main__":
+    main()
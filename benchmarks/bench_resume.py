@@ -0,0 +1,128 @@
+"""
+Reconnect Benchmark.
+Connects a QuicClient to a local HampterProtocol server over and over,
+through a UDP relay that adds a fixed one-way delay (the ad-hoc link).
+
+"full" runs without a ticket store, every connection does a full TLS
+handshake. "resumed" shares a ClientTicketStore, so after the first
+connection each one resumes and sends its stream opens and first PING as
+0-RTT. Reports the handshake histograms and the time until the first PONG.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_resume [--count 30] [--delay-ms 20]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+
+from aioquic.asyncio import serve
+
+from config import cfg
+from src.protocol.certificates import CertificateManager
+from src.protocol.quic_client import QuicClient
+from src.protocol.quic_server import HampterProtocol, build_quic_config
+from src.protocol.session import ClientTicketStore, ServerTicketStore, HandshakeStats
+
+SERVER_PORT = 15600
+RELAY_PORT = 15601
+
+
+class DelayRelay(asyncio.DatagramProtocol):
+    """Forwards datagrams between one client and the server, delayed each way."""
+
+    def __init__(self, server_addr, delay):
+        self.server_addr = server_addr
+        self.delay = delay
+        self.client_addr = None
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if addr == self.server_addr:
+            target = self.client_addr
+        else:
+            # A new connection comes from a new client port
+            self.client_addr = addr
+            target = self.server_addr
+        if target is not None:
+            asyncio.get_running_loop().call_later(self.delay, self.transport.sendto, data, target)
+
+
+async def connect_once(tickets, stats, delay):
+    loop = asyncio.get_running_loop()
+    client = QuicClient(cfg.CERT_PATH, tickets=tickets, handshake_stats=stats)
+    started = loop.time()
+    first_pong = loop.create_future()
+
+    def on_sample(monitor):
+        if not first_pong.done():
+            first_pong.set_result(loop.time() - started)
+
+    client.on_rtt_sample = on_sample
+    task = asyncio.create_task(
+        client.connect_to("127.0.0.1", RELAY_PORT, lambda data, _: None, lambda: None)
+    )
+    pong = await asyncio.wait_for(first_pong, 10)
+    # Give the server a round trip to deliver the new session ticket
+    await asyncio.sleep(2 * delay + 0.05)
+    client.close()
+    await asyncio.wait_for(task, 5)
+    return pong
+
+
+async def run(mode, count, delay):
+    stats = HandshakeStats()
+    tickets = ClientTicketStore() if mode == "resumed" else None
+    pongs = []
+    for _ in range(count):
+        pongs.append(await connect_once(tickets, stats, delay))
+    return stats, pongs
+
+
+async def main_async(args):
+    CertificateManager.ensure_certs()
+    HampterProtocol._on_message_callback = lambda data, peer: None
+    HampterProtocol._on_connect_callback = lambda peer, protocol: None
+    HampterProtocol._on_disconnect_callback = lambda peer, protocol: None
+    server_tickets = ServerTicketStore()
+    server = await serve(
+        "127.0.0.1", SERVER_PORT,
+        configuration=build_quic_config(cfg.CERT_PATH, cfg.KEY_PATH),
+        create_protocol=HampterProtocol,
+        session_ticket_fetcher=server_tickets.pop,
+        session_ticket_handler=server_tickets.add,
+    )
+    loop = asyncio.get_running_loop()
+    delay = args.delay_ms / 1000
+    relay, _ = await loop.create_datagram_endpoint(
+        lambda: DelayRelay(("127.0.0.1", SERVER_PORT), delay), local_addr=("127.0.0.1", RELAY_PORT)
+    )
+
+    print(f"[*] {args.count} connections per mode, one-way delay {args.delay_ms:g} ms")
+    try:
+        for mode in ("full", "resumed"):
+            stats, pongs = await run(mode, args.count, delay)
+            print(f"\n[{mode}] first PONG after: median {statistics.median(pongs) * 1000:.1f} ms, "
+                  f"max {max(pongs) * 1000:.1f} ms")
+            for line in stats.format():
+                print(f"    {line}")
+    finally:
+        relay.close()
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full vs resumed QUIC reconnect benchmark")
+    parser.add_argument("--count", type=int, default=30, help="connections per mode")
+    parser.add_argument("--delay-ms", type=float, default=20, help="one-way link delay")
+    args = parser.parse_args()
+    # Every close logs a warning from the client protocol
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Cold Start Benchmark.
+Spawns `main.py --headless` on loopback (fake LCD, no interface setup) and
+times it from spawn until the control socket is up, several runs in a row.
+
+The node logs a "Startup:" line once QUIC is listening, with the start and
+end of every phase since the interpreter reached main.py; those are split
+out here (median over the runs). Phases that overlap ran in parallel.
+"ready" is spawn to the "Daemon up" line and works against older trees too.
+
+--fresh-certs points the node at an empty cert directory, so key generation
+is part of every start (try it with --key-type rsa).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_startup [--runs 5] [--fresh-certs] [--key-type p256]
+"""
+import argparse
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASE = re.compile(r"([\w ]+?) (?:@(\d+)|(\d+)-(\d+))ms")
+
+
+def write_config(tmp, args):
+    lines = [
+        "[daemon]",
+        "interface = lo",
+        "ip = 127.0.0.5",
+        "configure = false",
+        f"socket = {os.path.join(tmp, 'hampter.sock')}",
+        "[config]",
+        "LCD_BACKEND = 'fake'",
+        f"CERT_KEY_TYPE = '{args.key_type}'",
+    ]
+    if args.fresh_certs:
+        lines += [f"CERT_PATH = '{os.path.join(tmp, 'certs', 'cert.pem')}'",
+                  f"KEY_PATH = '{os.path.join(tmp, 'certs', 'key.pem')}'"]
+    path = os.path.join(tmp, "node.conf")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def run_once(conf, timeout=30):
+    """(ready seconds, {phase: (start ms, end ms)}) for one cold start."""
+    spawned = time.monotonic()
+    proc = subprocess.Popen(
+        [sys.executable, "main.py", "--headless", "--config", conf],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    phases, ready = {}, None
+    try:
+        for line in proc.stderr:
+            if "Startup:" in line:
+                for name, at, start, end in PHASE.findall(line.split("Startup:", 1)[1]):
+                    phases[name.strip()] = (int(at), int(at)) if at else (int(start), int(end))
+            if "Daemon up" in line:
+                ready = time.monotonic() - spawned
+                break
+            if time.monotonic() - spawned > timeout:
+                break
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    if ready is None:
+        raise RuntimeError("node never came up, see LOG_FILE in config.py")
+    return ready, phases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start time to listening, by phase")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--fresh-certs", action="store_true", help="generate keys on every start")
+    parser.add_argument("--key-type", default="p256", choices=("p256", "ed25519", "rsa"))
+    args = parser.parse_args()
+
+    readies, runs = [], []
+    for i in range(args.runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            ready, phases = run_once(write_config(tmp, args))
+        readies.append(ready)
+        runs.append(phases)
+        print(f"    run {i + 1}: ready {ready * 1000:.0f} ms")
+
+    print(f"[*] spawn -> control socket up: median {statistics.median(readies) * 1000:.0f} ms, "
+          f"min {min(readies) * 1000:.0f} ms over {args.runs} runs")
+    names = sorted({n for p in runs for n in p}, key=lambda n: statistics.median(p[n][1] for p in runs if n in p))
+    if not names:
+        print("    (no Startup line, this tree doesn't report phases)")
+        return
+    print(f"    {'phase':<12} {'start':>7} {'end':>7} {'took':>7}   (ms since main.py began)")
+    for name in names:
+        spans = [p[name] for p in runs if name in p]
+        start = statistics.median(s for s, _ in spans)
+        end = statistics.median(e for _, e in spans)
+        took = statistics.median(e - s for s, e in spans)
+        print(f"    {name:<12} {start:>7.0f} {end:>7.0f} {took:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Stream Scheduler Benchmark.
+A QuicClient pushes a bulk payload to a local HampterProtocol server while
+sending a small chat message every 50 ms. Traffic goes through a UDP relay
+that models the radio link: limited rate, fixed one-way delay and a
+drop-tail queue.
+
+"single" is the old layout, where the bulk payload is written to the chat
+stream, so chat queues behind it. "typed" sends bulk on the bulk stream and
+lets the scheduler interleave. Reports chat latency while bulk is running
+and the bulk goodput.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_streams [--bulk-mb 2] [--rate-mbit 8] [--delay-ms 10]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import struct
+
+from aioquic.asyncio import serve
+
+from config import cfg
+from src.protocol.certificates import CertificateManager
+from src.protocol.quic_client import QuicClient
+from src.protocol.quic_server import HampterProtocol, build_quic_config
+
+SERVER_PORT = 15620
+RELAY_PORT = 15621
+CHUNK = 64 * 1024
+CHAT = struct.Struct(">4sd")  # marker, send time
+CHAT_MARK = b"CHAT"
+
+
+class LinkRelay(asyncio.DatagramProtocol):
+    """Rate-limited, delayed, drop-tail relay between one client and the server."""
+
+    def __init__(self, server_addr, rate, delay, queue_bytes):
+        self.server_addr = server_addr
+        self.rate = rate  # bytes per second
+        self.delay = delay
+        self.queue_bytes = queue_bytes
+        self.client_addr = None
+        self.transport = None
+        self.busy_until = {"up": 0.0, "down": 0.0}
+        self.dropped = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        loop = asyncio.get_running_loop()
+        if addr == self.server_addr:
+            target, direction = self.client_addr, "down"
+        else:
+            self.client_addr = addr
+            target, direction = self.server_addr, "up"
+        if target is None:
+            return
+        now = loop.time()
+        start = max(now, self.busy_until[direction])
+        if (start - now) * self.rate > self.queue_bytes:
+            self.dropped += 1
+            return
+        self.busy_until[direction] = start + len(data) / self.rate
+        loop.call_at(self.busy_until[direction] + self.delay, self.transport.sendto, data, target)
+
+
+async def run(mode, args, relay_port):
+    loop = asyncio.get_running_loop()
+    chats = []  # (send time, latency)
+    bulk = {"bytes": 0, "done": None}
+    total = int(args.bulk_mb * 1024 * 1024)
+
+    def on_data(data):
+        if data[:4] == CHAT_MARK:
+            _, sent = CHAT.unpack(data[:CHAT.size])
+            chats.append((sent, loop.time() - sent))
+            return
+        bulk["bytes"] += len(data)
+        if bulk["bytes"] >= total and bulk["done"] is None:
+            bulk["done"] = loop.time()
+
+    HampterProtocol._on_message_callback = lambda data, peer: on_data(data)
+    HampterProtocol._on_bulk_callback = lambda data, peer, protocol: on_data(data)
+
+    client = QuicClient(cfg.CERT_PATH)
+    connected = asyncio.Event()
+    task = asyncio.create_task(
+        client.connect_to("127.0.0.1", relay_port, lambda data, _: None, connected.set)
+    )
+    await asyncio.wait_for(connected.wait(), 10)
+    await asyncio.sleep(0.2)
+
+    started = loop.time()
+    payload = bytes(CHUNK)
+    for _ in range(total // CHUNK):
+        if mode == "typed":
+            client.send_bulk(payload)
+        else:
+            client.send_message(payload)
+    while bulk["done"] is None and loop.time() - started < args.timeout:
+        client.send_message(CHAT.pack(CHAT_MARK, loop.time()))
+        await asyncio.sleep(0.05)
+    # Let chat that queued behind the bulk data arrive
+    await asyncio.sleep(1.0)
+
+    client.close()
+    await asyncio.wait_for(task, 5)
+    done = bulk["done"] or loop.time()
+    # Only chat sent while bulk was still running counts
+    latencies = [lat for sent, lat in chats if sent < done]
+    return latencies, bulk["bytes"] / (done - started), bulk["done"] is not None
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def main_async(args):
+    CertificateManager.ensure_certs()
+    HampterProtocol._on_connect_callback = lambda peer, protocol: None
+    HampterProtocol._on_disconnect_callback = lambda peer, protocol: None
+    server = await serve(
+        "127.0.0.1", SERVER_PORT,
+        configuration=build_quic_config(cfg.CERT_PATH, cfg.KEY_PATH),
+        create_protocol=HampterProtocol,
+    )
+    loop = asyncio.get_running_loop()
+    print(f"[*] bulk {args.bulk_mb:g} MB, link {args.rate_mbit:g} Mbit/s, "
+          f"{args.delay_ms:g} ms one-way, {args.queue_kb:g} KB queue")
+    print(f"    {'mode':<7} {'chat p50 ms':>11} {'p95 ms':>8} {'max ms':>8} {'bulk MB/s':>10} {'drops':>6}")
+    try:
+        # Fresh relay (and port) per mode so the link state starts clean
+        for i, mode in enumerate(("single", "typed")):
+            relay = LinkRelay(("127.0.0.1", SERVER_PORT), args.rate_mbit * 1e6 / 8,
+                              args.delay_ms / 1000, args.queue_kb * 1024)
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: relay, local_addr=("127.0.0.1", RELAY_PORT + i)
+            )
+            try:
+                lat, goodput, finished = await run(mode, args, RELAY_PORT + i)
+            finally:
+                transport.close()
+            if not lat:
+                print(f"    {mode:<7} no chat samples")
+                continue
+            note = "" if finished else " (timed out)"
+            print(f"    {mode:<7} {statistics.median(lat) * 1000:>11.1f} {pct(lat, 0.95) * 1000:>8.1f} "
+                  f"{max(lat) * 1000:>8.1f} {goodput / 1e6:>10.2f} {relay.dropped:>6}{note}")
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat latency under bulk load, single vs typed streams")
+    parser.add_argument("--bulk-mb", type=float, default=2)
+    parser.add_argument("--rate-mbit", type=float, default=8)
+    parser.add_argument("--delay-ms", type=float, default=10)
+    parser.add_argument("--queue-kb", type=float, default=64)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+    # Every close logs a warning from the client protocol
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
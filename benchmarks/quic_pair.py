@@ -0,0 +1,82 @@
+"""
+In-memory QUIC connection pair for benchmarks.
+Drives two sans-IO aioquic QuicConnection objects against each other on a
+simulated clock and counts every datagram that would go on the wire.
+"""
+import ssl
+
+from aioquic.quic.configuration import QuicConfiguration
+from aioquic.quic.connection import QuicConnection
+
+from config import cfg
+
+CLIENT_ADDR = ("10.0.0.1", 40000)
+SERVER_ADDR = ("10.0.0.2", cfg.DEFAULT_PORT)
+
+
+class QuicPair:
+    def __init__(self, client_config=None, server_config=None, **client_kwargs):
+        if client_config is None:
+            client_config = QuicConfiguration(is_client=True)
+            client_config.verify_mode = ssl.CERT_NONE
+        if server_config is None:
+            server_config = QuicConfiguration(is_client=False)
+            server_config.load_cert_chain(cfg.CERT_PATH, cfg.KEY_PATH)
+
+        self.now = 0.0
+        self.client = QuicConnection(configuration=client_config, **client_kwargs)
+        self.client.connect(SERVER_ADDR, now=self.now)
+        self.server = QuicConnection(
+            configuration=server_config,
+            original_destination_connection_id=self.client.original_destination_connection_id,
+        )
+        self.reset_counters()
+
+    def reset_counters(self):
+        # datagrams / bytes sent by each side
+        self.sent = {"client": [0, 0], "server": [0, 0]}
+
+    def _exchange(self):
+        moved = False
+        for data, _ in self.client.datagrams_to_send(now=self.now):
+            self.sent["client"][0] += 1
+            self.sent["client"][1] += len(data)
+            self.server.receive_datagram(data, CLIENT_ADDR, now=self.now)
+            moved = True
+        for data, _ in self.server.datagrams_to_send(now=self.now):
+            self.sent["server"][0] += 1
+            self.sent["server"][1] += len(data)
+            self.client.receive_datagram(data, SERVER_ADDR, now=self.now)
+            moved = True
+        return moved
+
+    def pump(self, settle=0.1):
+        """Exchange datagrams and fire timers until the pair is quiet for settle seconds."""
+        deadline = self.now + settle
+        while True:
+            while self._exchange():
+                pass
+            timers = [t for t in (self.client.get_timer(), self.server.get_timer()) if t is not None]
+            if not timers or min(timers) > deadline:
+                break
+            self.now = max(self.now, min(timers))
+            for conn in (self.client, self.server):
+                timer = conn.get_timer()
+                if timer is not None and timer <= self.now:
+                    conn.handle_timer(now=self.now)
+        self.now = max(self.now, deadline)
+
+    def events(self, side="server"):
+        conn = self.server if side == "server" else self.client
+        out = []
+        event = conn.next_event()
+        while event is not None:
+            out.append(event)
+            event = conn.next_event()
+        return out
+
+    def handshake(self):
+        self.pump()
+        self.events("client")
+        self.events("server")
+        self.reset_counters()
@@ -0,0 +1,330 @@
+"""
+Discovery Scale Simulation.
+Runs N complete discovery stacks in one process against a virtual radio:
+the production DiscoveryService (Trickle-paced broadcast loop),
+DiscoveryProtocol (beacon parsing) and PeerRegistry, and the app's own
+on_peer_found / redial / dial_finished / expiry_loop from main.py. Only
+the sockets and the QUIC handshake itself are simulated.
+
+The medium places nodes at random in an --area x --area square. A beacon
+reaches every node within --range, each copy lost with --loss and delayed
+by --delay-ms plus up to --jitter-ms. A handshake is three one-way trips
+plus --handshake-cpu-ms of CPU on each end; a node does one handshake's
+crypto at a time, so simultaneous dials queue up (the storm). Lost flights
+cost a retransmission timeout.
+
+Everything runs on an event loop with a virtual clock (the selector skips
+ahead to the next timer instead of sleeping), so minutes of mesh time take
+seconds, and the asyncio code under test is unchanged.
+
+Reports per node count:
+  disc s      until every node has heard every neighbour in range
+  link s      until every pair in range is linked
+  bcn/n/min   beacons sent per node per minute over the whole run
+  rx us       CPU per received beacon, parse + registry + on_peer_found
+  cpu ms/n/m  process CPU per node per simulated minute, all of the above
+  dup         dials for a pair that already had a link or a dial in flight
+  storm       most handshakes queued or running at one node at once
+  hs p95      handshake time including the queue, 95th percentile
+  redials     dials after a backoff
+
+Usage (from the repo root):
+    python -m benchmarks.sim_discovery [--nodes 25,50,100,200] [--loss 0.05] [--range 0]
+"""
+import argparse
+import asyncio
+import logging
+import math
+import random
+import selectors
+import time
+
+from config import cfg
+from main import HamperLinkApp
+from src.networking.discovery import DiscoveryService
+from src.networking.peer_registry import PeerRegistry, LINKED
+from src.ui.headless import HeadlessDashboard
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """Never waits: a select() with a timeout moves the clock forward by it instead."""
+
+    def __init__(self):
+        super().__init__()
+        self.now = 0.0
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if not events and timeout:
+            self.now += timeout
+        return events
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    def __init__(self):
+        self._virtual = VirtualSelector()
+        super().__init__(self._virtual)
+
+    def time(self):
+        return self._virtual.now
+
+
+class VirtualTransport(asyncio.DatagramTransport):
+    def __init__(self, medium, node):
+        super().__init__()
+        self.medium = medium
+        self.node = node
+
+    def sendto(self, data, addr=None):
+        self.medium.broadcast(self.node, data)
+
+    def get_extra_info(self, name, default=None):
+        return default
+
+    def close(self):
+        pass
+
+
+class Medium:
+    def __init__(self, args, rng):
+        self.args = args
+        self.rng = rng
+        self.nodes = []
+        self.rx_cpu = 0.0
+        self.rx_count = 0
+
+    def place(self, nodes):
+        self.nodes = nodes
+        for node in nodes:
+            node.pos = (self.rng.uniform(0, self.args.area), self.rng.uniform(0, self.args.area))
+        for node in nodes:
+            node.neighbours = [other for other in nodes if other is not node and self.in_range(node, other)]
+
+    def in_range(self, a, b):
+        return not self.args.range or math.dist(a.pos, b.pos) <= self.args.range
+
+    def delay(self):
+        return (self.args.delay_ms + self.rng.uniform(0, self.args.jitter_ms)) / 1000
+
+    def endpoint(self, node):
+        async def create(factory):
+            protocol = factory()
+            transport = VirtualTransport(self, node)
+            protocol.connection_made(transport)
+            return transport, protocol
+        return create
+
+    def broadcast(self, sender, data):
+        sender.tx += 1
+        loop = asyncio.get_running_loop()
+        addr = (sender.ip, cfg.DISCOVERY_PORT)
+        for node in sender.neighbours:
+            if node.discovery.protocol and self.rng.random() >= self.args.loss:
+                loop.call_later(self.delay(), self.deliver, node, data, addr)
+
+    def deliver(self, node, data, addr):
+        start = time.perf_counter()
+        node.discovery.protocol.datagram_received(data, addr)
+        self.rx_cpu += time.perf_counter() - start
+        self.rx_count += 1
+
+    def flight(self):
+        """One handshake flight: delay, plus a retransmission timeout for every loss."""
+        t = self.delay()
+        while self.rng.random() < self.args.loss:
+            t += max(0.2, 6 * self.args.delay_ms / 1000) + self.delay()
+        return t
+
+
+class SimNode:
+    """Just enough of HamperLinkApp for its discovery and dial methods to run unchanged."""
+
+    on_peer_found = HamperLinkApp.on_peer_found
+    redial = HamperLinkApp.redial
+    dial_finished = HamperLinkApp.dial_finished
+    expiry_loop = HamperLinkApp.expiry_loop
+
+    def __init__(self, sim, index):
+        self.sim = sim
+        self.index = index
+        self.ip = f"10.{index // 65536}.{index // 256 % 256}.{index % 256 + 1}"
+        self.loop = asyncio.get_running_loop()
+        self.dashboard = HeadlessDashboard()
+        self.peers = PeerRegistry(self.ip, rng=random.Random(sim.rng.random()))
+        self.discovery = DiscoveryService(self.on_peer_found, node_id=index + 1)
+        self.discovery.update_state(hostname=f"node{index}")
+        self.running = True
+        self.tx = 0
+        self.pos = None
+        self.neighbours = []
+        # Handshake crypto runs one at a time
+        self.busy_until = 0.0
+        self.queued = 0
+
+    async def start(self, delay):
+        await asyncio.sleep(delay)
+        await self.discovery.start(self.sim.medium.endpoint(self))
+        asyncio.ensure_future(self.expiry_loop())
+
+    async def connect_quic(self, ip, info):
+        # Stand-in for the QuicClient dial, the bookkeeping around it is the app's
+        try:
+            if await self.sim.handshake(self, self.sim.by_ip[ip]):
+                self.peers.mark_linked(ip, None, "client", info.get("hostname"), now=self.loop.time())
+        finally:
+            self.dial_finished(ip)
+
+    def crypto(self):
+        """Reserve this node's CPU for one handshake. Returns when it's done."""
+        start = max(self.busy_until, self.loop.time())
+        self.busy_until = start + self.sim.args.handshake_cpu_ms / 1000
+        return self.busy_until
+
+
+class Sim:
+    def __init__(self, args, n, seed):
+        self.args = args
+        self.n = n
+        self.rng = random.Random(seed)
+        self.medium = Medium(args, self.rng)
+        self.nodes = []
+        self.by_ip = {}
+        self.in_flight = set()  # (low ip, high ip) with a dial under way
+        self.stats = {"handshakes": 0, "failed": 0, "dup": 0, "storm": 0, "dials": 0}
+        self.handshake_times = []
+
+    def pair(self, a, b):
+        return (a.ip, b.ip) if a.index < b.index else (b.ip, a.ip)
+
+    async def handshake(self, client, server):
+        """Simulated QUIC handshake from client to server. True if it came up."""
+        loop = asyncio.get_running_loop()
+        key = self.pair(client, server)
+        self.stats["dials"] += 1
+        if key in self.in_flight or client.peers.is_linked(server.ip) or server.peers.is_linked(client.ip):
+            self.stats["dup"] += 1
+        self.in_flight.add(key)
+        started = loop.time()
+        server.queued += 1
+        client.queued += 1
+        self.stats["storm"] = max(self.stats["storm"], server.queued, client.queued)
+        try:
+            if not self.medium.in_range(client, server):
+                await asyncio.sleep(self.args.handshake_timeout)
+                self.stats["failed"] += 1
+                return False
+            # Initial -> server crypto -> reply -> client crypto -> finished
+            await asyncio.sleep(self.medium.flight())
+            await asyncio.sleep(max(0.0, server.crypto() - loop.time()))
+            await asyncio.sleep(self.medium.flight())
+            await asyncio.sleep(max(0.0, client.crypto() - loop.time()))
+            await asyncio.sleep(self.medium.flight())
+        finally:
+            server.queued -= 1
+            client.queued -= 1
+            self.in_flight.discard(key)
+        self.handshake_times.append(loop.time() - started)
+        self.stats["handshakes"] += 1
+        # on_server_connect: the first link for a peer wins
+        if not server.peers.is_linked(client.ip):
+            server.peers.mark_linked(client.ip, None, "server", now=loop.time())
+        return True
+
+    def discovered(self):
+        return all(node.peers.get(other.ip) for node in self.nodes for other in node.neighbours)
+
+    def linked(self):
+        return all(node.peers.get(other.ip) and node.peers.get(other.ip).state == LINKED
+                   for node in self.nodes for other in node.neighbours)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.nodes = [SimNode(self, i) for i in range(self.n)]
+        self.by_ip = {node.ip: node for node in self.nodes}
+        self.medium.place(self.nodes)
+        for node in self.nodes:
+            asyncio.ensure_future(node.start(self.rng.uniform(0, self.args.spread)))
+        disc = link = None
+        while loop.time() < self.args.duration:
+            await asyncio.sleep(0.05)
+            if disc is None and self.discovered():
+                disc = loop.time()
+            if link is None and self.linked():
+                link = loop.time()
+        for node in self.nodes:
+            node.running = False
+            node.discovery.broadcasting = False
+        return disc, link
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(args, n):
+    loop = VirtualClockLoop()
+    asyncio.set_event_loop(loop)
+    sim = Sim(args, n, args.seed)
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    try:
+        disc, link = loop.run_until_complete(sim.run())
+    finally:
+        for task in asyncio.all_tasks(loop):
+            task.cancel()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    minutes = args.duration / 60
+    neighbours = sum(len(node.neighbours) for node in sim.nodes) / n
+    return {
+        "disc": disc, "link": link,
+        "bcn": sum(node.tx for node in sim.nodes) / n / minutes,
+        "rx_us": sim.medium.rx_cpu / max(1, sim.medium.rx_count) * 1e6,
+        "cpu": cpu * 1000 / n / minutes,
+        "hs_p95": percentile(sim.handshake_times, 0.95),
+        "neighbours": neighbours, "wall": wall, **sim.stats,
+        "redials": sum(node.peers.stats["backoffs"] for node in sim.nodes),
+    }
+
+
+def fmt(value, spec="8.2f"):
+    return format(value, spec) if value is not None else "   never"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discovery and dialling at scale on a virtual radio")
+    parser.add_argument("--nodes", default="25,50,100,200")
+    parser.add_argument("--loss", type=float, default=0.05, help="per-receiver loss, beacons and handshake flights")
+    parser.add_argument("--delay-ms", type=float, default=2.0, help="one-way delay")
+    parser.add_argument("--jitter-ms", type=float, default=3.0, help="extra random delay, up to")
+    parser.add_argument("--area", type=float, default=100.0, help="side of the square nodes are placed in")
+    parser.add_argument("--range", type=float, default=0.0, help="radio range, 0 means everyone hears everyone")
+    parser.add_argument("--handshake-cpu-ms", type=float, default=8.0, help="crypto per side (P-256 on a Pi 4)")
+    parser.add_argument("--handshake-timeout", type=float, default=10.0, help="dial to a node out of range")
+    parser.add_argument("--spread", type=float, default=1.0, help="nodes boot within this many seconds")
+    parser.add_argument("--duration", type=float, default=120.0, help="simulated seconds per run")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    # The app code logs every dial at debug level
+    logging.basicConfig(level=logging.ERROR)
+
+    print(f"[*] loss {args.loss:.0%}, delay {args.delay_ms:g}+{args.jitter_ms:g} ms, "
+          f"range {args.range or 'unlimited'} in {args.area:g}x{args.area:g}, "
+          f"handshake crypto {args.handshake_cpu_ms:g} ms, {args.duration:g} s simulated")
+    print(f"    {'nodes':>5} {'nbrs':>5} {'disc s':>8} {'link s':>8} {'bcn/n/min':>9} {'rx us':>6} "
+          f"{'cpu ms/n/m':>10} {'dup':>4} {'storm':>5} {'hs p95':>7} {'redials':>7} {'wall s':>6}")
+    for n in (int(x) for x in args.nodes.split(",")):
+        r = run(args, n)
+        hs = f"{r['hs_p95'] * 1000:5.0f}ms" if r["hs_p95"] is not None else "      -"
+        print(f"    {n:>5} {r['neighbours']:>5.0f} {fmt(r['disc'])} {fmt(r['link'])} {r['bcn']:>9.1f} "
+              f"{r['rx_us']:>6.1f} {r['cpu']:>10.1f} {r['dup']:>4} {r['storm']:>5} {hs:>7} "
+              f"{r['redials']:>7} {r['wall']:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Flooding Simulation.
+Runs the production FloodRouter on simulated chain and grid topologies and
+reports relay overhead, duplicate rate and delivery ratio.
+
+Links are either unicast (one QUIC send per neighbour, like the default
+path) or broadcast (one transmission heard by all neighbours, like the
+multicast channel).
+
+Usage (from the repo root):
+    python -m benchmarks.sim_flood [--ttl 4] [--medium unicast|broadcast]
+"""
+import argparse
+import time
+from collections import deque
+
+from src.networking.flood import FloodRouter
+
+
+def chain(n):
+    return {i: [j for j in (i - 1, i + 1) if 0 <= j < n] for i in range(n)}
+
+
+def grid(w, h):
+    adj = {}
+    for y in range(h):
+        for x in range(w):
+            i = y * w + x
+            adj[i] = [ny * w + nx for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1))
+                      if 0 <= nx < w and 0 <= ny < h]
+    return adj
+
+
+def simulate(adj, ttl, medium):
+    queue = deque()
+    tx = 0
+    hops_seen = []
+    delivered = {}
+
+    def make_router(node):
+        def deliver(origin, hops, text, from_ip):
+            delivered[node] = delivered.get(node, 0) + 1
+            hops_seen.append(hops)
+
+        def forward(payload, exclude):
+            nonlocal tx
+            if medium == "broadcast":
+                tx += 1
+                targets = adj[node]
+            else:
+                targets = [n for n in adj[node] if n != exclude]
+                tx += len(targets)
+            for n in targets:
+                queue.append((n, payload, node))
+
+        return FloodRouter(node_id=node + 1, deliver=deliver, forward=forward, ttl=ttl, cache_size=4096)
+
+    routers = {node: make_router(node) for node in adj}
+
+    start = time.perf_counter()
+    for node, router in routers.items():
+        payload = router.originate(f"hello from {node}")
+        router.forward(payload, None)
+        while queue:
+            dst, data, src = queue.popleft()
+            routers[dst].receive(data, src)
+    elapsed = time.perf_counter() - start
+
+    n = len(adj)
+    received = sum(r.stats["received"] for r in routers.values())
+    duplicates = sum(r.stats["duplicates"] for r in routers.values())
+    total_delivered = sum(delivered.values())
+    return {
+        "nodes": n,
+        "tx_per_msg": tx / n,
+        "tx_per_delivery": tx / max(total_delivered, 1),
+        "dup_rate": duplicates / max(received, 1),
+        "delivery": total_delivered / (n * (n - 1)) if n > 1 else 1.0,
+        "max_hops": max(hops_seen) + 1 if hops_seen else 0,
+        "us_per_rx": elapsed / max(received, 1) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-hop flooding simulation")
+    parser.add_argument("--ttl", type=int, default=4)
+    parser.add_argument("--medium", choices=("unicast", "broadcast"), default="unicast")
+    args = parser.parse_args()
+
+    topologies = [
+        ("chain 5", chain(5)), ("chain 10", chain(10)), ("chain 20", chain(20)),
+        ("grid 3x3", grid(3, 3)), ("grid 5x5", grid(5, 5)), ("grid 8x8", grid(8, 8)),
+    ]
+    print(f"[*] TTL={args.ttl}, medium={args.medium}, every node originates one message")
+    print(f"    {'topology':<10} {'nodes':>5} {'tx/msg':>8} {'tx/deliv':>9} {'dup %':>7} "
+          f"{'delivery':>9} {'max hops':>9} {'us/rx':>7}")
+    for name, adj in topologies:
+        r = simulate(adj, args.ttl, args.medium)
+        print(f"    {name:<10} {r['nodes']:>5} {r['tx_per_msg']:>8.1f} {r['tx_per_delivery']:>9.2f} "
+              f"{r['dup_rate'] * 100:>6.1f}% {r['delivery'] * 100:>8.1f}% {r['max_hops']:>9} {r['us_per_rx']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
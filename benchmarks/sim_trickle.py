@@ -0,0 +1,158 @@
+"""
+Beacon Scheduling Simulation.
+Runs the production TrickleTimer and DiscoveryProtocol on a virtual clock for
+N nodes sharing one radio cell, against the old fixed 2 s beacon.
+
+Reports per node count:
+  conv s      time from startup until every node has discovered every other
+  bcn/node/min steady-state beacons per node per minute (after warm-up)
+  join s      latency until a node joining later is known by all and knows all
+
+Usage (from the repo root):
+    python -m benchmarks.sim_trickle [--nodes 5,10,20,50,100] [--loss 0.05]
+"""
+import argparse
+import heapq
+import random
+
+from config import cfg
+from src.networking.discovery import DiscoveryProtocol, encode_beacon
+from src.networking.trickle import TrickleTimer
+
+WARMUP = 240.0
+STEADY = 120.0
+
+
+class SimNode:
+    def __init__(self, sim, index, start):
+        self.sim = sim
+        self.ip = f"10.0.{index // 250}.{index % 250 + 1}"
+        self.node_id = index + 1
+        self.start_time = start
+        self.payload = encode_beacon(self.node_id, cfg.DEFAULT_PORT, 0, 0, f"node{index}")
+        self.proto = DiscoveryProtocol(self.on_found, node_id=self.node_id)
+        self.proto.on_heard = self.on_heard
+        self.found = {}
+        self.tx = 0
+        self.gen = 0
+        self.trickle = TrickleTimer(cfg.BEACON_IMIN, cfg.BEACON_IMAX, cfg.BEACON_K,
+                                    max_silent=cfg.BEACON_MAX_SILENT, rng=sim.rng)
+
+    def on_found(self, info, ip):
+        self.found.setdefault(ip, self.sim.now)
+
+    def on_heard(self, consistent):
+        if self.sim.mode == "trickle" and self.trickle.heard(consistent, self.sim.now):
+            self.schedule()
+
+    def boot(self):
+        if self.sim.mode == "trickle":
+            self.trickle.start(self.sim.now)
+            self.schedule()
+        else:
+            self.sim.at(self.sim.now + self.sim.rng.uniform(0, cfg.BEACON_INTERVAL), self.fixed_tick)
+
+    def fixed_tick(self):
+        self.sim.transmit(self)
+        self.sim.at(self.sim.now + cfg.BEACON_INTERVAL, self.fixed_tick)
+
+    def schedule(self):
+        self.gen += 1
+        gen = self.gen
+        self.sim.at(self.trickle.t_fire, lambda: self.fire(gen))
+        self.sim.at(self.trickle.t_end, lambda: self.end(gen))
+
+    def fire(self, gen):
+        if gen == self.gen and self.trickle.should_transmit(self.sim.now):
+            self.trickle.transmitted(self.sim.now)
+            self.sim.transmit(self)
+
+    def end(self, gen):
+        if gen == self.gen:
+            self.trickle.interval_expired(self.sim.now)
+            self.schedule()
+
+
+class Sim:
+    def __init__(self, mode, loss, seed):
+        self.mode = mode
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.now = 0.0
+        self.nodes = []
+        self._queue = []
+        self._seq = 0
+
+    def at(self, when, fn):
+        self._seq += 1
+        heapq.heappush(self._queue, (when, self._seq, fn))
+
+    def transmit(self, sender):
+        sender.tx += 1
+        addr = (sender.ip, cfg.DISCOVERY_PORT)
+        for node in self.nodes:
+            if node is not sender and self.rng.random() >= self.loss:
+                node.proto.datagram_received(sender.payload, addr)
+
+    def add_node(self, start):
+        node = SimNode(self, len(self.nodes), start)
+        self.nodes.append(node)
+        self.at(start, node.boot)
+        return node
+
+    def run_until(self, end):
+        while self._queue and self._queue[0][0] <= end:
+            self.now, _, fn = heapq.heappop(self._queue)
+            fn()
+        self.now = end
+
+
+def converged_at(nodes):
+    times = [n.found.get(m.ip) for n in nodes for m in nodes if m is not n]
+    if any(t is None for t in times):
+        return None
+    return max(times)
+
+
+def run(mode, n, loss, seed):
+    sim = Sim(mode, loss, seed)
+    for _ in range(n):
+        sim.add_node(sim.rng.uniform(0, 1.0))
+    sim.run_until(WARMUP)
+    conv = converged_at(sim.nodes)
+
+    before = sum(node.tx for node in sim.nodes)
+    sim.run_until(WARMUP + STEADY)
+    steady = (sum(node.tx for node in sim.nodes) - before) / n / (STEADY / 60)
+
+    join_time = sim.now
+    newcomer = sim.add_node(join_time)
+    sim.run_until(join_time + 60)
+    times = [newcomer.found.get(m.ip) for m in sim.nodes if m is not newcomer]
+    times += [m.found.get(newcomer.ip) for m in sim.nodes if m is not newcomer]
+    join = None if any(t is None for t in times) else max(times) - join_time
+    return conv, steady, join
+
+
+def fmt(value):
+    return f"{value:8.2f}" if value is not None else "   never"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trickle vs fixed beacon simulation")
+    parser.add_argument("--nodes", default="5,10,20,50,100")
+    parser.add_argument("--loss", type=float, default=0.05, help="per-receiver beacon loss")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"[*] single cell, loss {args.loss:.0%}, Imin {cfg.BEACON_IMIN}s Imax {cfg.BEACON_IMAX}s "
+          f"k {cfg.BEACON_K}, fixed interval {cfg.BEACON_INTERVAL}s")
+    print(f"    {'nodes':>5} {'mode':<8} {'conv s':>8} {'bcn/node/min':>13} {'join s':>8}")
+    for n in (int(x) for x in args.nodes.split(",")):
+        for mode in ("fixed", "trickle"):
+            conv, steady, join = run(mode, n, args.loss, args.seed)
+            print(f"    {n:>5} {mode:<8} {fmt(conv)} {steady:>13.1f} {fmt(join)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,14 +9,100 @@ class Config:
     # Network Defaults
     DEFAULT_PORT = 5567  # QUIC Port
     DISCOVERY_PORT = 5566  # UDP Beacon Port
-    BEACON_INTERVAL = 2  # Seconds
-    BEACON_MAGIC = b'HAMPTER:'
+    BEACON_INTERVAL = 2  # Seconds, only used when BEACON_TRICKLE is off
+    BEACON_TRICKLE = True  # Adaptive beacon pacing (RFC 6206 style)
+    BEACON_IMIN = 0.25  # Seconds, fastest interval (startup, changes)
+    BEACON_IMAX = 32.0  # Seconds, slowest interval while stable
+    BEACON_K = 3  # Skip our beacon after hearing this many consistent ones
+    BEACON_MAX_SILENT = 30.0  # Always beacon at least this often
+    BEACON_MAGIC = b'HAMPTER:'  # Legacy JSON beacons
+    BEACON_FORMAT = 'binary'  # 'binary', 'json', or 'both' while old nodes remain
+
+    # Peer registry
+    PEER_EXPIRY = 120.0  # Seconds without a beacon before an unlinked peer is dropped
+    PEER_WHEEL_TICK = 1.0  # Expiry timer wheel resolution (seconds)
+    PEER_WHEEL_SLOTS = 128  # Wheel span is TICK * SLOTS, longer deadlines just go round again
+
+    # Reconnects (exponential backoff with jitter, session resumption)
+    RECONNECT_BASE = 0.5  # Seconds, first retry after a lost link
+    RECONNECT_MAX = 30.0  # Seconds, backoff cap
+
+    # Keepalive (PING/PONG on the control stream)
+    KEEPALIVE_INTERVAL = 2  # Seconds, starting interval
+    KEEPALIVE_MIN = 0.5  # Used right after a loss or RTT spike
+    KEEPALIVE_MAX = 10  # Reached while the link stays stable
+
+    # Multicast broadcast channel (optional fast path for mesh-wide chat)
+    MULTICAST_ENABLED = False
+    MULTICAST_GROUP = '239.255.72.76'
+    MULTICAST_PORT = 5568
+    MULTICAST_HISTORY = 256  # Recent broadcasts kept for unicast repair
+    MULTICAST_SYNC_INTERVAL = 1.0  # Seconds between seq syncs over QUIC
+
+    # Multi-hop flooding
+    FLOOD_TTL = 4  # Max radio hops a message travels
+    FLOOD_CACHE_SIZE = 4096  # (origin, seq) pairs remembered for dedupe
 
     # Paths
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     CERT_DIR = os.path.join(BASE_DIR, 'src', 'certs')
     CERT_PATH = os.path.join(CERT_DIR, 'cert.pem')
     KEY_PATH = os.path.join(CERT_DIR, 'key.pem')
+    CERT_KEY_TYPE = 'p256'  # 'p256' (ECDSA), 'ed25519' or 'rsa' (2048 bit, slow on a Pi)
+    FILE_INBOX = os.path.join(BASE_DIR, 'received')  # Where /send transfers land
+    CONTROL_SOCKET = os.path.join(BASE_DIR, 'hampter.sock')  # Daemon mode (--headless)
+
+    OUTBOX_DIR = os.path.join(BASE_DIR, 'outbox')  # Messages queued for peers that are down
+
+    # Store-and-forward outbox (see src/networking/outbox.py)
+    OUTBOX_SEGMENT_BYTES = 1024 * 1024  # Segment file size before a new one starts
+    OUTBOX_MAX_BYTES = 16 * 1024 * 1024  # Per destination, oldest segments are dropped beyond this
+    OUTBOX_BATCH_BYTES = 256 * 1024  # Bytes per write when flushing after a reconnect
+
+    # File transfer
+    FILE_MAX_SIZE = 4 * 1024 ** 3  # Bytes, larger offers are refused
+
+    # Audio (QUIC datagrams, see src/protocol/audio.py)
+    AUDIO_RATE = 16000  # Hz, mono
+    AUDIO_FRAME_MS = 20  # One datagram per frame
+    AUDIO_CODEC = 'ulaw'  # 'ulaw' (G.711, 8 bit) or 'pcm' (16 bit, twice the bytes)
+    AUDIO_JITTER_MIN_MS = 40  # Playout delay floor
+    AUDIO_JITTER_MAX_MS = 200  # Playout delay ceiling, however bad the jitter gets
+    AUDIO_IDLE_TIMEOUT = 1.0  # Seconds without frames before a stream counts as ended
+    AUDIO_BACKEND = 'aplay'  # 'aplay' (ALSA, the speaker) or 'null' (headless)
+
+    # Radio metrics (src/networking/radio.py)
+    RADIO_SAMPLE_INTERVAL = 5.0  # Seconds between station dumps, 0 turns sampling off
+    RADIO_WEAK_DBM = -80  # Peers below this signal are ranked last
+    RADIO_MAX_RETRY_RATE = 0.3  # Or with more tx retries per packet than this
+
+    # LCD
+    LCD_BACKEND = 'qwiic'  # 'qwiic' for the SerLCD, 'fake' for a simulated panel
+    LCD_MIN_INTERVAL = 0.25  # Seconds between panel updates
+
+    # Logging (src/ui/logs.py)
+    # Outside the source tree (XDG state dir), rotated copies are .1 to .LOG_BACKUPS
+    LOG_FILE = os.path.join(os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state'),
+                            'hampter-link', 'hampter_debug.log')
+    LOG_MAX_BYTES = 2 * 1024 * 1024  # Rotate the file at this size
+    LOG_BACKUPS = 3  # Rotated files kept, so at most (1 + 3) * 2 MB on the SD card
+    LOG_RING_SIZE = 500  # Recent records kept in memory for the debug panel
+    LOG_LEVEL = 'DEBUG'  # Default for every logger
+    LOG_LEVELS = {'quic': 'INFO', 'asyncio': 'WARNING'}  # Per logger name, e.g. 'Flood': 'INFO'
+
+    # Metrics (src/ui/metrics.py, /stats)
+    METRICS_FILE = None  # Prometheus text file, e.g. for node_exporter's textfile collector
+    METRICS_SOCKET = None  # Unix socket answering scrapes, e.g. os.path.join(BASE_DIR, 'hampter-metrics.sock')
+    METRICS_INTERVAL = 15  # Seconds between METRICS_FILE writes
+
+    # Loop monitoring (src/ui/profiling.py, /loop and /profile)
+    LOOP_MONITOR = True  # Lag sampler, slow-callback detector and stall watchdog
+    LOOP_LAG_INTERVAL = 0.25  # Seconds between lag samples
+    LOOP_SLOW_CALLBACK = 0.05  # Seconds, callbacks at least this long are logged with a name
+    PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')  # /profile output (.prof files for pstats/snakeviz)
+
+    # UI
+    UI_MAX_FPS = 15  # Upper bound on dashboard redraws per second
 
     # UI Theme
     THEME = {
@@ -29,6 +115,8 @@ class Config:
     # Runtime State (Set during init)
     interface = None
     ip_address = None
+    # Random per run, so (node_id, seq) never repeats across restarts
+    node_id = int.from_bytes(os.urandom(8), 'big')
 
     @staticmethod
     def get_hostname():
@@ -1,16 +1,21 @@
 """
 Certificate Generator for Hampter Link.
 Creates self-signed CA and node certificates for mutual TLS authentication.
+
+Usage:
+    python gen_certs.py [p256|ed25519|rsa]   (default: CERT_KEY_TYPE from config.py)
 """
 import os
+import sys
 from datetime import datetime, timezone, timedelta
 from cryptography import x509
 from cryptography.x509.oid import NameOID
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives import serialization
 import ipaddress
 
+from config import cfg
+from src.protocol.certificates import KEY_TYPES, generate_private_key, signing_hash, private_key_bytes
+
 CERTS_DIR = "certs"
 
 
@@ -20,12 +25,9 @@ def ensure_certs_dir():
         os.makedirs(CERTS_DIR)
 
 
-def generate_key():
-    """Generate a new RSA private key."""
-    return rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048,
-    )
+def generate_key(key_type=None):
+    """Generate a new private key (P-256, Ed25519 or RSA-2048)."""
+    return generate_private_key(key_type)
 
 
 def generate_self_signed_ca(key):
@@ -54,7 +56,7 @@ def generate_self_signed_ca(key):
         now + timedelta(days=3650)  # Valid for 10 years
     ).add_extension(
         x509.BasicConstraints(ca=True, path_length=None), critical=True,
-    ).sign(key, hashes.SHA256())
+    ).sign(key, signing_hash(key))
     
     return cert
 
@@ -87,7 +89,7 @@ def generate_node_cert(ca_cert, ca_key, node_key, common_name, ip_addr):
         now + timedelta(days=3650)
     ).add_extension(
         x509.SubjectAlternativeName(alt_names), critical=False,
-    ).sign(ca_key, hashes.SHA256())
+    ).sign(ca_key, signing_hash(ca_key))
     
     return cert
 
@@ -96,11 +98,7 @@ def serialize_key(key, filename):
     """Save a private key to PEM file."""
     filepath = os.path.join(CERTS_DIR, filename)
     with open(filepath, "wb") as f:
-        f.write(key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.TraditionalOpenSSL,
-            encryption_algorithm=serialization.NoEncryption(),
-        ))
+        f.write(private_key_bytes(key))
     print(f"    Saved: {filepath}")
 
 
@@ -114,19 +112,24 @@ def serialize_cert(cert, filename):
 
 def main():
     """Generate all required certificates."""
-    print("[*] Generating Hampter Link Certificates...")
+    key_type = sys.argv[1] if len(sys.argv) > 1 else cfg.CERT_KEY_TYPE
+    if key_type not in KEY_TYPES:
+        print(f"[-] Unknown key type {key_type}, use one of: {', '.join(KEY_TYPES)}")
+        sys.exit(1)
+
+    print(f"[*] Generating Hampter Link Certificates ({key_type})...")
     ensure_certs_dir()
 
     # 1. Generate CA
     print("    - Generating CA Key and Certificate...")
-    ca_key = generate_key()
+    ca_key = generate_key(key_type)
     ca_cert = generate_self_signed_ca(ca_key)
     serialize_key(ca_key, "ca_key.pem")
     serialize_cert(ca_cert, "ca_cert.pem")
 
     # 2. Generate Node Key
     print("    - Generating Node Key...")
-    node_key = generate_key()
+    node_key = generate_key(key_type)
     serialize_key(node_key, "key.pem")
 
     # 3. Generate Cert for Node A (192.168.100.1)
@@ -2,74 +2,215 @@
 Hampter Link Orchestrator.
 Combines Networking, Protocol, and UI.
 Now implements a custom Raw Input Loop for artifact-free TUI.
+With --headless it runs as a daemon instead: no prompts, no TUI, and a Unix
+control socket for local programs (see src/ui/control_socket.py).
+
+Heavy modules (aioquic, rich, cryptography, the LCD driver) are imported where
+they're first needed. start() runs the LCD probe, cert check, interface scan
+and the QUIC stack import side by side, and logs how long each phase took.
 """
+import time
+STARTED = time.monotonic()  # Before any of our imports, for the startup report
+
+import argparse
+import ast
 import asyncio
+import codecs
+import concurrent.futures
+import configparser
 import logging
+import os
+import signal
 import sys
 import tty
 import termios
-import select
 import traceback
-import ipaddress
-from aioquic.asyncio import serve
 
 # Core Modules
 from config import cfg
 from src.networking.interface_mgr import InterfaceManager
-from src.networking.discovery import DiscoveryService
-from src.protocol.certificates import CertificateManager
-from src.protocol.quic_server import HampterProtocol, build_quic_config
-from src.protocol.quic_client import QuicClient
-from src.ui.dashboard import Dashboard
+from src.networking.discovery import DiscoveryService, CAP_MULTICAST
+from src.networking.flood import FloodRouter, message_id
+from src.networking.outbox import Outbox
+from src.networking.transfer import FileTransferManager
+from src.networking.voice import VoiceManager
+from src.networking.radio import RadioSampler, is_poor
+from src.networking.peer_registry import PeerRegistry, CONNECTING, LINKED
+from src.protocol.session import ClientTicketStore, ServerTicketStore, HandshakeStats
+from src.ui.headless import HeadlessDashboard
+from src.ui.control_socket import ControlServer
+from src.ui.logs import setup_logging
+from src.ui.metrics import REGISTRY, CALLBACK_BUCKETS, MetricsExporter
+from src.ui.profiling import LoopMonitor, Profiler
 from src.hw.display import LCDDisplay
+from src.hw.speaker import Speaker
 
-# Logging: Redirect all logs to a file to keep TUI clean
-logging.basicConfig(
-    filename='hampter_debug.log',
-    level=logging.DEBUG,
-    format='%(asctime)s %(name)s %(levelname)s: %(message)s'
-)
+# Logging goes to a file (and the debug panel) via a background writer, see setup_logging in __main__
 logger = logging.getLogger("Main")
 
-class HamperLinkApp:
+# Slash commands, anything else typed at the prompt is counted as "unknown"
+COMMANDS = ("clear", "help", "send", "transfers", "audio", "outbox", "handshakes", "mesh", "radio", "stats",
+            "loop", "profile")
+INPUTS = REGISTRY.counter("hampter_input_total", "Lines handled at the prompt or control socket", ("command",))
+INPUT_SECONDS = REGISTRY.histogram("hampter_input_seconds", "Time to handle one input line",
+                                   CALLBACK_BUCKETS, ("command",))
+
+
+def ensure_certs():
+    # cryptography is only needed here and by aioquic
+    from src.protocol.certificates import CertificateManager
+    CertificateManager.ensure_certs()
+
+
+def import_quic():
+    """Load the QUIC stack (~150 ms of imports on a Pi 4) off the main thread."""
+    import aioquic.asyncio  # noqa: F401
+    import src.protocol.quic_server  # noqa: F401
+    import src.protocol.quic_client  # noqa: F401
+
+
+class StartupTimer:
+    """Wall time of each startup phase, relative to process start."""
+
     def __init__(self):
-        self.dashboard = Dashboard()
-        self.lcd = LCDDisplay()
+        self.phases = {}  # name -> (start, end), seconds since STARTED
+
+    def run(self, name, fn, *args):
+        start = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            self.phases[name] = (start - STARTED, time.monotonic() - STARTED)
+
+    def mark(self, name):
+        now = time.monotonic() - STARTED
+        self.phases[name] = (now, now)
+
+    def report(self):
+        parts = []
+        for name, (start, end) in sorted(self.phases.items(), key=lambda p: p[1][1]):
+            if end > start:
+                parts.append(f"{name} {start * 1000:.0f}-{end * 1000:.0f}ms")
+            else:
+                parts.append(f"{name} @{end * 1000:.0f}ms")
+        return "Startup: " + ", ".join(parts)
+
+
+class HamperLinkApp:
+    def __init__(self, options=None, log_ring=None):
+        self.options = options or argparse.Namespace(headless=False)
+        self.startup = StartupTimer()
+        self.startup.mark("imports")
+        if self.options.headless:
+            self.dashboard = HeadlessDashboard()
+        else:
+            from src.ui.dashboard import Dashboard
+            self.dashboard = Dashboard()
+            self.dashboard.log_ring = log_ring
+        # Probed in start(), next to the other startup work
+        self.lcd = LCDDisplay(lazy=True)
         self.loop = asyncio.new_event_loop()
         
-        # Peer Registry: { "ip": { "type": "client|server", "protocol": protocol_obj, "name": "hostname" } }
-        self.peers = {} 
-        self.connecting_ips = set() 
+        # Every known node, discovered, connecting or linked (see peer_registry.py)
+        self.peers = PeerRegistry()
+        # Session tickets so reconnects resume (and send 0-RTT) instead of a full handshake
+        self.client_tickets = ClientTicketStore()
+        self.server_tickets = ServerTicketStore()
+        self.handshake_stats = HandshakeStats()
+        self.mcast = None
+        self.discovery = None
+        # Signal/bitrate/retries per peer, from the radio (see radio.py)
+        self.radio = None
+        self.router = FloodRouter(cfg.node_id, self.on_flood_deliver, self.flood_send)
+        self.transfers = FileTransferManager(
+            self.send_control, self.send_bulk, self.bulk_backlog, dashboard=self.dashboard
+        )
+        self.voice = VoiceManager(
+            self.send_datagram, self.one_way_delay, new_speaker=Speaker, dashboard=self.dashboard
+        )
+        # Chat for peers that are down, flushed when they link again
+        self.outbox = Outbox(dashboard=self.dashboard)
+        # Origin node ID -> IP, learned from messages that arrive directly
+        self.node_names = {}
+        # Daemon mode only
+        self.control = None
+        # Prometheus text export (METRICS_FILE / METRICS_SOCKET), /stats works without it
+        self.metrics = None
+        # What's blocking the loop (see profiling.py)
+        self.loop_monitor = None
+        self.profiler = Profiler(dashboard=self.dashboard)
+        REGISTRY.gauge("hampter_peers_linked", "Peers with a live QUIC link", lambda: self.peers.linked_count)
+        REGISTRY.gauge("hampter_peers_known", "Peers in the registry, linked or not", lambda: len(self.peers))
+        REGISTRY.gauge("hampter_outbox_pending", "Messages queued for peers that are down", self.outbox.pending_total)
         
         self.running = True
         self.input_buffer = ""
         
+    def _ask_network(self, ifaces):
+        """Interactive interface, IP and channel selection."""
+        ifaces = ifaces.result()
+        print("\n[+] Available Interfaces:")
+        for idx, i in enumerate(ifaces):
+            print(f" {idx}. {i['name']} ({i['driver']}) {'[AX210]' if i['is_ax210'] else ''}")
+        
+        sel = input("\nSelect Interface ID (default 0): ") or "0"
+        selected_iface = ifaces[int(sel)]
+        
+        # 2. Network Config
+        ip = input(f"Enter IP for {selected_iface['name']} (e.g. 10.0.0.1): ")
+        channel = input("Enter Channel (default 1): ") or "1"
+        return selected_iface['name'], ip, int(channel), True
+
+    def _network_from_options(self, ifaces):
+        """Daemon mode: everything comes from flags or the config file."""
+        opts = self.options
+        if not opts.ip:
+            raise ValueError("--ip (or ip = in the config file) is required with --headless")
+        iface = opts.interface
+        if not iface:
+            ifaces = ifaces.result()
+            if not ifaces:
+                raise ValueError("no wireless interface found, pass --interface")
+            # Prefer the AX210 if there is one
+            iface = next((i for i in ifaces if i['is_ax210']), ifaces[0])['name']
+        return iface, opts.ip, opts.channel, opts.configure
+
     def start(self):
+        # None of these depend on each other: the LCD probe and the scan wait on
+        # hardware and subprocesses, certs on disk (or key generation), and the
+        # QUIC import is CPU. The prompts run meanwhile.
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="startup")
+        self.startup.mark("start")
+        pool.submit(self.startup.run, "lcd", self.lcd.connect)
+        certs = pool.submit(self.startup.run, "certs", ensure_certs)
+        quic = pool.submit(self.startup.run, "quic import", import_quic)
+        if self.options.headless and self.options.interface:
+            ifaces = None
+        else:
+            ifaces = pool.submit(self.startup.run, "scan", InterfaceManager.scan_interfaces)
+        pool.shutdown(wait=False)
+
         # 1. Interface Selection
         try:
-            ifaces = InterfaceManager.scan_interfaces()
-            print("\n[+] Available Interfaces:")
-            for idx, i in enumerate(ifaces):
-                print(f" {idx}. {i['name']} ({i['driver']}) {'[AX210]' if i['is_ax210'] else ''}")
-            
-            sel = input("\nSelect Interface ID (default 0): ") or "0"
-            selected_iface = ifaces[int(sel)]
-            
-            # 2. Network Config
-            ip = input(f"Enter IP for {selected_iface['name']} (e.g. 10.0.0.1): ")
-            channel = input("Enter Channel (default 1): ") or "1"
+            if self.options.headless:
+                iface, ip, channel, configure = self._network_from_options(ifaces)
+            else:
+                iface, ip, channel, configure = self._ask_network(ifaces)
             
-            print(f"[+] Configuring {selected_iface['name']}...")
-            if not InterfaceManager.configure_adhoc(selected_iface['name'], ip, int(channel)):
-                print("[-] Configuration Failed. Check sudo?")
-                return
+            if configure:
+                print(f"[+] Configuring {iface}...")
+                if not self.startup.run("configure", InterfaceManager.configure_adhoc, iface, ip, channel):
+                    print("[-] Configuration Failed. Check sudo?")
+                    return
 
-            cfg.interface = selected_iface['name']
+            cfg.interface = iface
             cfg.ip_address = ip
+            self.peers.set_local_ip(ip)
             self.dashboard.update_info(cfg.interface, cfg.ip_address)
 
-            # 3. Certs
-            CertificateManager.ensure_certs()
+            # 3. Certs and QUIC stack (normally done by now)
+            certs.result()
+            quic.result()
             
             # 4. Asyncio Loop
             asyncio.set_event_loop(self.loop)
@@ -82,9 +223,12 @@ class HamperLinkApp:
             print(f"Fatal Error: {e}")
         finally:
             self.running = False
+            self.lcd.close()
             print("Shutting down...")
 
     async def async_main(self):
+        from aioquic.asyncio import serve
+        from src.protocol.quic_server import HampterProtocol, build_quic_config
         self.dashboard.add_debug("SYSTEM: Starting Core...")
         
         # Start QUIC Server
@@ -93,31 +237,75 @@ class HamperLinkApp:
         def on_server_msg(data, peer):
             try:
                 ip = peer[0] if (peer and len(peer) > 0) else "Peer"
-                self.dashboard.add_log(f"PEER({ip})", data)
                 self.dashboard.add_debug(f"SRV: RX Data from {ip}")
-                self.lcd.show_msg(ip, data)
+                self.router.receive(data, ip)
             except Exception as e:
                 logger.error(f"on_server_msg Error: {e}")
+
+        def on_server_bulk(data, peer, protocol):
+            try:
+                self.transfers.on_bulk(peer[0], data)
+            except Exception as e:
+                logger.error(f"on_server_bulk Error: {e}")
+
+        def on_server_datagram(data, peer, protocol):
+            try:
+                self.voice.on_datagram(peer[0], data)
+            except Exception as e:
+                logger.error(f"on_server_datagram Error: {e}")
+
+        def on_server_control(peer, protocol, msg_type, payload):
+            try:
+                ip = peer[0] if (peer and len(peer) > 0) else "Unknown"
+                self.on_control(ip, msg_type, payload)
+            except Exception as e:
+                logger.error(f"on_server_control Error: {e}")
         
+        def server_link_down(ip):
+            self.peers.mark_down(ip)
+            if self.mcast:
+                self.mcast.peer_lost(ip)
+            self.transfers.peer_lost(ip)
+            self.voice.peer_lost(ip)
+            self.dashboard.update_link(ip, None)
+            self.dashboard.update_peer("MESH", "N/A", count=self.peers.linked_count)
+            if self.discovery:
+                self.discovery.topology_changed()
+
         def on_server_connect(peer, protocol):
             try:
                 ip = peer[0] if (peer and len(peer) > 0) else "Unknown"
                 self.dashboard.add_debug(f"SRV: New Conn from {ip}")
-                
-                if ip not in self.peers:
-                    self.peers[ip] = {"type": "server", "protocol": protocol, "name": "Unknown"}
-                    self.dashboard.update_peer("MESH", ip, count=len(self.peers))
+
+                rec = self.peers.get_linked(ip)
+                if rec is not None and rec.link_type == "server" and rec.protocol is not protocol:
+                    # Peer restarted and came back before its old connection timed out, the new one wins
+                    old = rec.protocol
+                    server_link_down(ip)
+                    old.close()
+                    self.dashboard.add_debug(f"SRV: {ip} reconnected, old connection closed")
+
+                if not self.peers.is_linked(ip):
+                    self.peers.mark_linked(ip, protocol, "server", now=self.loop.time())
+                    protocol.monitor.on_sample = lambda monitor: self.on_rtt_sample(ip, monitor)
+                    self.dashboard.update_peer("MESH", ip, count=self.peers.linked_count)
                     self.dashboard.add_log("SYSTEM", f"Node {ip} joined mesh.")
+                    if self.mcast:
+                        self.mcast.peer_linked(ip)
+                    self.transfers.peer_linked(ip)
+                    self.peer_up(ip)
             except Exception as e:
                 logger.error(f"on_server_connect Error: {e}")
         
-        def on_server_disconnect(peer):
+        def on_server_disconnect(peer, protocol):
             try:
                 ip = peer[0] if (peer and len(peer) > 0) else "Unknown"
-                if ip in self.peers:
-                    del self.peers[ip]
-                    self.dashboard.update_peer("MESH", "N/A", count=len(self.peers))
-                    self.dashboard.add_log("SYSTEM", f"Node {ip} left mesh.")
+                rec = self.peers.get_linked(ip)
+                # A replaced connection or a duplicate next to our client link, not the live one
+                if rec is None or rec.protocol is not protocol:
+                    return
+                server_link_down(ip)
+                self.dashboard.add_log("SYSTEM", f"Node {ip} left mesh.")
             except Exception as e:
                 logger.error(f"on_server_disconnect Error: {e}")
 
@@ -125,151 +313,652 @@ class HamperLinkApp:
         HampterProtocol._on_message_callback = on_server_msg
         HampterProtocol._on_connect_callback = on_server_connect
         HampterProtocol._on_disconnect_callback = on_server_disconnect
+        HampterProtocol._on_control_callback = on_server_control
+        HampterProtocol._on_bulk_callback = on_server_bulk
+        HampterProtocol._on_datagram_callback = on_server_datagram
 
         try:
             server = await serve(
                 "0.0.0.0", cfg.DEFAULT_PORT,
                 configuration=quic_config,
                 create_protocol=HampterProtocol,
+                session_ticket_fetcher=self.server_tickets.pop,
+                session_ticket_handler=self.server_tickets.add,
             )
+            self.startup.mark("listening")
             self.dashboard.add_debug(f"SRV: Listening on {cfg.DEFAULT_PORT}")
+            logger.info(self.startup.report())
         except Exception as e:
             self.dashboard.add_debug(f"SRV Error: {e}")
 
+        # Optional multicast fast path for broadcasts
+        if cfg.MULTICAST_ENABLED:
+            try:
+                from src.networking.multicast import MulticastChannel
+                self.mcast = MulticastChannel(
+                    self.on_mcast_msg, self.send_control, self.send_unicast, dashboard=self.dashboard
+                )
+                await self.mcast.start()
+            except Exception as e:
+                self.mcast = None
+                self.dashboard.add_debug(f"MCAST Error: {e}")
+
         # Start Discovery
-        discovery = DiscoveryService(self.on_peer_found, dashboard=self.dashboard)
-        await discovery.start()
+        self.discovery = DiscoveryService(self.on_peer_found, dashboard=self.dashboard)
+        await self.discovery.start()
+        asyncio.create_task(self.expiry_loop())
+
+        if cfg.RADIO_SAMPLE_INTERVAL and cfg.interface:
+            self.radio = RadioSampler(cfg.interface, self.on_radio_sample, dashboard=self.dashboard)
+            self.radio.start()
+
+        if cfg.LOOP_MONITOR:
+            self.loop_monitor = LoopMonitor(dashboard=self.dashboard)
+            self.loop_monitor.start()
+
+        if cfg.METRICS_FILE or cfg.METRICS_SOCKET:
+            self.metrics = MetricsExporter(path=cfg.METRICS_FILE, socket_path=cfg.METRICS_SOCKET)
+            try:
+                await self.metrics.start()
+            except OSError as e:
+                self.dashboard.add_debug(f"METRICS Error: {e}")
         
-        # Start TUI Loop
-        await self.tui_loop()
+        try:
+            if self.options.headless:
+                await self.daemon_loop()
+            else:
+                # Start TUI Loop
+                await self.tui_loop()
+        finally:
+            if self.metrics:
+                self.metrics.close()
+            if self.loop_monitor:
+                self.loop_monitor.stop()
 
-    def on_peer_found(self, info, ip):
-        # Tie-breaking rule: Only connect if my IP is "smaller"
+    async def daemon_loop(self):
+        """Headless main loop: serve the control socket until SIGTERM/SIGINT."""
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        self.control = ControlServer(
+            self.options.socket or cfg.CONTROL_SOCKET, self.send_chat, self.peer_list, self.run_command
+        )
+        await self.control.start()
+        self.dashboard.listeners.append(self.control.on_log)
+        logger.info(f"Daemon up on {cfg.interface} ({cfg.ip_address}), control socket {self.control.path}")
         try:
-            my_val = int(ipaddress.ip_address(cfg.ip_address))
-            peer_val = int(ipaddress.ip_address(ip))
-            if my_val > peer_val:
-                return
-        except:
-            if cfg.ip_address > ip: return
+            await stop.wait()
+        finally:
+            self.running = False
+            self.control.close()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(sig)
 
-        # Check if already connected or connecting
-        if ip in self.peers or ip in self.connecting_ips:
+    def on_peer_found(self, info, ip):
+        # The registry applies the tie-break and skips peers already linked or connecting
+        if not self.peers.on_beacon(info, ip, self.loop.time()):
             return
+        self.peers.mark_connecting(ip)
             
         self.dashboard.add_debug(f"DISC: Discovered {ip}")
         # Initiate QUIC Connection
         asyncio.create_task(self.connect_quic(ip, info))
 
+    async def expiry_loop(self):
+        """Drop peers whose beacons stopped without a link ever coming up."""
+        while self.running:
+            await asyncio.sleep(cfg.PEER_WHEEL_TICK)
+            for rec in self.peers.expire(self.loop.time()):
+                self.dashboard.add_debug(f"DISC: {rec.ip} expired")
+
     async def connect_quic(self, ip, info):
+        from src.protocol.quic_client import QuicClient
         self.dashboard.add_debug(f"CLI: Connecting to {ip}")
-        self.connecting_ips.add(ip)
         try:
-            client = QuicClient(cfg.CERT_PATH, dashboard=self.dashboard)
+            client = QuicClient(
+                cfg.CERT_PATH, dashboard=self.dashboard,
+                tickets=self.client_tickets, handshake_stats=self.handshake_stats
+            )
+            client.on_rtt_sample = lambda monitor: self.on_rtt_sample(ip, monitor)
             
             def on_client_msg(data, _):
                 # Wrapped in try as a precaution
                 try:
-                    self.dashboard.add_log(f"PEER({ip})", data)
-                    self.lcd.show_msg(ip, data)
+                    self.router.receive(data, ip)
                 except: pass
             
             def on_connected():
                 try:
-                    self.peers[ip] = {"type": "client", "protocol": client, "name": info.get('hostname')}
-                    self.dashboard.update_peer("MESH", ip, name=info.get('hostname'), count=len(self.peers))
+                    self.peers.mark_linked(ip, client, "client", info.get('hostname'), now=self.loop.time())
+                    self.dashboard.update_peer("MESH", ip, name=info.get('hostname'), count=self.peers.linked_count)
                     self.dashboard.add_log("SYSTEM", f"Mesh Link to {ip} Up!")
                     self.dashboard.add_debug(f"CLI: Linked with {ip}")
                     
                     # Also register disconnect for client
                     if client.protocol:
                         client.protocol._on_disconnect_callback = lambda: self.on_client_disconnect(ip)
+                    if self.mcast:
+                        self.mcast.peer_linked(ip)
+                    self.transfers.peer_linked(ip)
+                    self.peer_up(ip)
                 except Exception as e:
                     logger.error(f"on_connected Error: {e}")
                 
             self.dashboard.add_debug(f"CLI: Handshaking {ip}...")
-            await client.connect_to(ip, cfg.DEFAULT_PORT, on_client_msg, on_connected)
+            await client.connect_to(
+                ip, info.get('port', cfg.DEFAULT_PORT), on_client_msg, on_connected,
+                control_callback=lambda msg_type, payload: self.on_control(ip, msg_type, payload),
+                bulk_callback=lambda data: self.transfers.on_bulk(ip, data),
+                datagram_callback=lambda data: self.voice.on_datagram(ip, data)
+            )
             
         except Exception as e:
             self.dashboard.add_debug(f"CLI Fail {ip}: {e}")
         finally:
-            self.connecting_ips.discard(ip)
+            self.dial_finished(ip)
+
+    def dial_finished(self, ip):
+        """Dial failed or the link dropped, retry after a backoff."""
+        rec = self.peers.get(ip)
+        if rec and rec.state == CONNECTING:
+            self.peers.mark_down(ip)
+        if self.running and rec and rec.state != LINKED:
+            delay = self.peers.dial_failed(ip, self.loop.time())
+            if delay is not None:
+                self.dashboard.add_debug(f"CLI: Retry {ip} in {delay:.1f}s")
+                self.loop.call_later(delay, self.redial, ip)
+
+    def redial(self, ip):
+        if not self.running or not self.peers.dial_due(ip, self.loop.time()):
+            # Expired, linked again, or a beacon already triggered the dial
+            return
+        rec = self.peers.mark_connecting(ip)
+        asyncio.create_task(self.connect_quic(ip, {"port": rec.port, "hostname": rec.name}))
             
     def on_client_disconnect(self, ip):
-        if ip in self.peers:
-            del self.peers[ip]
-            self.dashboard.update_peer("MESH", "N/A", count=len(self.peers))
+        if self.peers.mark_down(ip):
+            if self.mcast:
+                self.mcast.peer_lost(ip)
+            self.transfers.peer_lost(ip)
+            self.voice.peer_lost(ip)
+            self.dashboard.update_link(ip, None)
+            self.dashboard.update_peer("MESH", "N/A", count=self.peers.linked_count)
             self.dashboard.add_log("SYSTEM", f"Active link to {ip} lost.")
+            if self.discovery:
+                self.discovery.topology_changed()
+
+    def peer_up(self, ip):
+        """A link came up, send whatever was queued for the peer while it was away."""
+        self.outbox.add_peer(ip)
+        if self.outbox.pending(ip):
+            asyncio.ensure_future(self.flush_outbox(ip))
+
+    async def flush_outbox(self, ip):
+        rec = self.peers.get_linked(ip)
+        if not rec:
+            return
+        # The server side protocol outlives its connection, so ask the registry if the link is still up
+        unacked = lambda: rec.protocol.chat_unacked() if self.peers.get_linked(ip) is rec else None
+        try:
+            await self.outbox.flush(ip, rec.protocol.send_batch, unacked)
+        except Exception as e:
+            logger.error(f"Outbox flush to {ip} failed: {e}")
+
+    def on_rtt_sample(self, ip, monitor):
+        if self.peers.is_linked(ip):
+            self.dashboard.update_link(ip, self.link_view(ip, monitor.stats()))
+
+    def on_radio_sample(self, by_ip):
+        for ip in by_ip:
+            if self.peers.is_linked(ip):
+                self.dashboard.update_link(ip, self.link_view(ip))
+
+    def link_view(self, ip, stats=None):
+        """RTT stats of a linked peer with the latest radio metrics folded in."""
+        if stats is None:
+            stats = self.peers.get_linked(ip).protocol.link_stats()
+        view = dict(stats or {})
+        quality = self.radio.quality(ip) if self.radio else None
+        if quality:
+            for key in ("signal_dbm", "tx_bitrate_mbps", "retry_rate"):
+                if quality.get(key) is not None:
+                    view[key] = quality[key]
+        return view
+
+    def rank_peers(self):
+        """
+        Linked peer IPs, lowest smoothed RTT first. Peers on a poor radio link
+        (weak signal, many retries) come after all the others, and peers
+        without RTT samples go last within their group.
+        """
+        def key(ip):
+            stats = self.peers.get_linked(ip).protocol.link_stats()
+            srtt = stats.get("srtt") if stats else None
+            quality = self.radio.quality(ip) if self.radio else None
+            return is_poor(quality), srtt if srtt is not None else float("inf")
+        return sorted(self.peers.linked_ips(), key=key)
+
+    def on_control(self, ip, msg_type, payload):
+        if self.mcast and self.mcast.on_control(ip, msg_type, payload):
+            return
+        if self.transfers.on_control(ip, msg_type, payload):
+            return
+
+    def on_mcast_msg(self, ip, data):
+        try:
+            self.router.receive(data, ip)
+        except Exception as e:
+            logger.error(f"on_mcast_msg Error: {e}")
+
+    def on_flood_deliver(self, origin, hops, text, from_ip):
+        if hops == 0:
+            self.node_names[origin] = from_ip
+            sender = from_ip
+        else:
+            name = self.node_names.get(origin, f"{origin:016x}"[:8])
+            sender = f"{name} via {from_ip}"
+        self.dashboard.add_log(f"PEER({sender})", text)
+        self.lcd.show_msg(self.node_names.get(origin, sender), text)
+        if self.control:
+            self.control.on_message(origin, hops, text, from_ip)
+
+    def flood_send(self, payload, exclude_ip=None):
+        """Send an envelope to every link except exclude_ip. Returns the number of unicast sends."""
+        recipients = [rec for rec in self.peers.linked() if rec.ip != exclude_ip]
+        # One multicast datagram covers every peer that acked our key and beacons
+        # CAP_MULTICAST, the rest (and all of them if the channel is down) go over unicast.
+        if self.mcast and self.mcast.broadcast(payload):
+            recipients = [rec for rec in recipients
+                          if rec.ip not in self.mcast.keyed_peers or not rec.caps & CAP_MULTICAST]
+
+        failed = []
+        for rec in recipients:
+            try:
+                # Both QuicClient and HampterProtocol (server) have send_message
+                rec.protocol.send_message(payload)
+            except Exception as e:
+                self.dashboard.add_debug(f"Send Fail to {rec.ip}: {e}")
+                failed.append(rec.ip)
+        self.queue_offline(payload, exclude_ip, failed)
+        return len(recipients)
+
+    def queue_offline(self, payload, exclude_ip=None, failed=()):
+        """Queue an envelope for every known peer that isn't linked. Returns how many."""
+        msg_id = message_id(payload)
+        queued = 0
+        for ip in self.outbox.destinations():
+            if ip == exclude_ip or ip == cfg.ip_address:
+                continue
+            if (ip in failed or not self.peers.is_linked(ip)) and self.outbox.append(ip, msg_id, payload):
+                queued += 1
+        return queued
+
+    def send_control(self, ip, msg_type, payload):
+        rec = self.peers.get_linked(ip)
+        if rec:
+            rec.protocol.send_control(msg_type, payload)
+
+    def send_unicast(self, ip, data):
+        rec = self.peers.get_linked(ip)
+        if rec:
+            rec.protocol.send_message(data)
+
+    def send_bulk(self, ip, data):
+        rec = self.peers.get_linked(ip)
+        if rec:
+            rec.protocol.send_bulk(data)
+
+    def send_datagram(self, ip, data):
+        rec = self.peers.get_linked(ip)
+        return rec.protocol.send_datagram(data) if rec else False
+
+    def one_way_delay(self, ip):
+        """Half the lowest RTT seen on the link, None before the first sample."""
+        rec = self.peers.get_linked(ip)
+        stats = rec.protocol.link_stats() if rec else None
+        if not stats or stats.get("min_rtt") is None:
+            return None
+        return stats["min_rtt"] / 2
+
+    def bulk_backlog(self, ip):
+        rec = self.peers.get_linked(ip)
+        return rec.protocol.bulk_backlog() if rec else None
+
+    def resolve_peer(self, name):
+        """Linked peer IP by IP or hostname."""
+        if self.peers.is_linked(name):
+            return name
+        for rec in self.peers.linked():
+            if rec.name == name:
+                return rec.ip
+        return None
+
+    async def send_file(self, peer, path):
+        ip = self.resolve_peer(peer)
+        if ip is None:
+            self.dashboard.add_log("SYSTEM", f"No link to {peer}.")
+            return
+        path = os.path.expanduser(path)
+        if not os.path.isfile(path):
+            self.dashboard.add_log("SYSTEM", f"No such file: {path}")
+            return
+        await self.transfers.send_file(ip, path)
 
     async def handle_input(self, msg):
         msg = msg.strip()
         if not msg: return
+        if msg.startswith("/"):
+            command = msg[1:].partition(" ")[0].lower()
+            if command not in COMMANDS:
+                command = "unknown"
+        else:
+            command = "chat"
+        start = time.perf_counter()
+        try:
+            await self._handle_input(msg)
+        finally:
+            INPUTS.inc(command)
+            INPUT_SECONDS.observe(time.perf_counter() - start, command)
+
+    async def _handle_input(self, msg):
 
         # Command Parsing
         if msg.startswith("/"):
-            cmd = msg[1:].lower()
+            cmd, _, arg = msg[1:].partition(" ")
+            cmd = cmd.lower()
             if cmd == "clear":
                 self.dashboard.clear_logs()
                 return
             elif cmd == "help":
-                self.dashboard.add_log("SYSTEM", "Available commands: /clear, /help, /mesh")
+                self.dashboard.add_log("SYSTEM", "Available commands: /clear, /help, /mesh, /handshakes, /send <peer> <path>, /transfers, /audio [<peer> [wav] | stop], /outbox, /radio, /stats [filter], /loop, /profile <seconds>")
+                return
+            elif cmd == "send":
+                parts = arg.strip().split(maxsplit=1)
+                if len(parts) != 2:
+                    self.dashboard.add_log("SYSTEM", "Usage: /send <peer ip or name> <path>")
+                else:
+                    await self.send_file(parts[0], parts[1])
+                return
+            elif cmd == "transfers":
+                lines = self.transfers.status()
+                if not lines:
+                    self.dashboard.add_log("SYSTEM", "No transfers in progress.")
+                for line in lines:
+                    self.dashboard.add_log("SYSTEM", line)
+                return
+            elif cmd == "audio":
+                parts = arg.strip().split(maxsplit=1)
+                if not parts:
+                    lines = self.voice.status()
+                    if not lines:
+                        self.dashboard.add_log("SYSTEM", "No audio streams.")
+                    for line in lines:
+                        self.dashboard.add_log("SYSTEM", f"Audio {line}")
+                elif parts[0] == "stop":
+                    self.voice.stop()
+                else:
+                    ip = self.resolve_peer(parts[0])
+                    path = os.path.expanduser(parts[1]) if len(parts) > 1 else None
+                    if ip is None:
+                        self.dashboard.add_log("SYSTEM", f"No link to {parts[0]}.")
+                    elif path and not os.path.isfile(path):
+                        self.dashboard.add_log("SYSTEM", f"No such file: {path}")
+                    else:
+                        self.voice.start(ip, path)
+                        self.dashboard.add_log("SYSTEM", f"Streaming {path or 'test tone'} to {ip}, /audio stop ends it.")
+                return
+            elif cmd == "outbox":
+                lines = self.outbox.status()
+                if not lines:
+                    self.dashboard.add_log("SYSTEM", "Outbox is empty.")
+                for line in lines:
+                    self.dashboard.add_log("SYSTEM", f"Outbox {line}")
+                return
+            elif cmd == "handshakes":
+                lines = self.handshake_stats.format()
+                if not lines:
+                    self.dashboard.add_log("SYSTEM", "No outgoing handshakes yet.")
+                for line in lines:
+                    self.dashboard.add_log("SYSTEM", f"Handshake {line}")
                 return
             elif cmd == "mesh":
-                if not self.peers:
+                if not self.peers.linked_count:
                     self.dashboard.add_log("SYSTEM", "Mesh is empty.")
                 else:
-                    self.dashboard.add_log("SYSTEM", f"Mesh Nodes ({len(self.peers)}):")
-                    for ip, info in self.peers.items():
-                        self.dashboard.add_log("SYSTEM", f" - {ip} ({info['type']})")
+                    self.dashboard.add_log("SYSTEM", f"Mesh Nodes ({self.peers.linked_count}):")
+                    for ip in self.rank_peers():
+                        rec = self.peers.get_linked(ip)
+                        stats = rec.protocol.link_stats()
+                        rtt = f" rtt {stats['srtt'] * 1000:.1f}ms" if stats and stats.get('srtt') is not None else ""
+                        quality = self.radio.quality(ip) if self.radio else None
+                        radio = f" {RadioSampler.format(quality)}" if quality else ""
+                        self.dashboard.add_log("SYSTEM", f" - {ip} ({rec.link_type}){rtt}{radio}")
+                return
+            elif cmd == "stats":
+                lines = REGISTRY.summary(arg.strip())
+                if not lines:
+                    self.dashboard.add_log("SYSTEM", "No metrics yet." if not arg.strip() else f"No metrics matching {arg.strip()}.")
+                for line in lines:
+                    self.dashboard.add_log("SYSTEM", f"Stats {line}")
+                return
+            elif cmd == "loop":
+                if not self.loop_monitor:
+                    self.dashboard.add_log("SYSTEM", "Loop monitor is off (LOOP_MONITOR).")
+                    return
+                for line in self.loop_monitor.status():
+                    self.dashboard.add_log("SYSTEM", f"Loop {line}")
+                return
+            elif cmd == "profile":
+                try:
+                    seconds = float(arg.strip() or 10)
+                except ValueError:
+                    seconds = 0
+                if not 0 < seconds <= 600:
+                    self.dashboard.add_log("SYSTEM", "Usage: /profile <seconds> (up to 600)")
+                elif self.profiler.running:
+                    self.dashboard.add_log("SYSTEM", "A profile is already running.")
+                else:
+                    # Runs in the background, the prompt stays usable while it records
+                    asyncio.ensure_future(self.run_profile(seconds))
+                    self.dashboard.add_log("SYSTEM", f"Profiling the loop for {seconds:g}s...")
+                return
+            elif cmd == "radio":
+                lines = self.radio.status() if self.radio else []
+                if not lines:
+                    self.dashboard.add_log("SYSTEM", "No radio metrics (sampling off, or no stations seen).")
+                for line in lines:
+                    self.dashboard.add_log("SYSTEM", f"Radio {line}")
                 return
             else:
                 self.dashboard.add_log("SYSTEM", f"Unknown command: {msg}")
                 return
 
         self.dashboard.add_log("ME", msg)
-        
-        # Broadcast to all peers
-        if not self.peers:
-            self.dashboard.add_log("SYSTEM", "No active links to send to.")
+        self.send_chat(msg, quiet=False)
+
+    async def run_profile(self, seconds):
+        try:
+            path, top = await self.profiler.run(seconds)
+        except Exception as e:
+            self.dashboard.add_log("SYSTEM", f"Profile failed: {e}")
             return
+        self.dashboard.add_log("SYSTEM", f"Profile written to {path} (python -m pstats {path})")
+        for line in top:
+            self.dashboard.add_log("SYSTEM", f"Profile {line}")
 
-        for ip, info in list(self.peers.items()):
+    def send_chat(self, msg, quiet=True):
+        """Broadcast a chat line to all peers, or queue it while none are linked."""
+        if not self.peers.linked_count:
+            queued = self.queue_offline(self.router.originate(msg))
+            if quiet:
+                return
+            if queued:
+                self.dashboard.add_log("SYSTEM", f"No active links, queued for {queued} peer(s).")
+            else:
+                self.dashboard.add_log("SYSTEM", "No active links to send to.")
+            return
+
+        self.flood_send(self.router.originate(msg))
+
+    def peer_list(self):
+        """Linked peers for the control socket, lowest RTT first."""
+        peers = []
+        for ip in self.rank_peers():
+            rec = self.peers.get_linked(ip)
+            stats = self.link_view(ip)
+            srtt = stats.get("srtt")
+            peers.append({
+                "ip": ip, "name": rec.name, "link": rec.link_type,
+                "rtt_ms": round(srtt * 1000, 2) if srtt is not None else None,
+                "signal_dbm": stats.get("signal_dbm"),
+                "tx_bitrate_mbps": stats.get("tx_bitrate_mbps"),
+                "retry_rate": stats.get("retry_rate"),
+            })
+        return peers
+
+    async def run_command(self, line):
+        """Run a slash command and return what it logged."""
+        lines = []
+        collect = lambda sender, text: lines.append(text)
+        self.dashboard.listeners.append(collect)
+        try:
+            await self.handle_input(line)
+        finally:
+            self.dashboard.listeners.remove(collect)
+        return lines
+
+    def _on_stdin(self, fd, decoder):
+        """Reader callback: drain everything pending on stdin in one go."""
+        try:
+            data = os.read(fd, 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        if not data:
+            # EOF, stop watching or the reader would fire forever
+            asyncio.get_running_loop().remove_reader(fd)
+            return
+        buf = self.input_buffer
+        for ch in decoder.decode(data):
+            if ch == '\x03':
+                self.stop_tui()
+                return
+            elif ch in ('\n', '\r'):
+                if buf.strip():
+                    self._input_lines.put_nowait(buf)
+                buf = ""
+            elif ch == '\x7f': buf = buf[:-1]
+            elif ch.isprintable(): buf += ch
+        self.input_buffer = buf
+        self.dashboard.update_input(buf)
+
+    async def _input_consumer(self):
+        while True:
+            line = await self._input_lines.get()
             try:
-                target = info['protocol']
-                # Both QuicClient and HampterProtocol (server) have send_message
-                target.send_message(msg)
+                await self.handle_input(line)
             except Exception as e:
-                self.dashboard.add_debug(f"Send Fail to {ip}: {e}")
-                # Optional: Remove failed peers
-                # del self.peers[ip]
+                logger.error(f"Input Error: {e}")
+
+    def stop_tui(self):
+        self.running = False
+        self._render_wakeup.set()
+
+    async def _render_loop(self, live):
+        """Redraw only when the dashboard changed, at most UI_MAX_FPS times a second."""
+        min_interval = 1.0 / cfg.UI_MAX_FPS
+        while self.running:
+            await self._render_wakeup.wait()
+            self._render_wakeup.clear()
+            if not self.running:
+                break
+            if self.dashboard.dirty:
+                self.dashboard.dirty = False
+                try:
+                    live.update(self.dashboard.generate_layout(), refresh=True)
+                except Exception as e:
+                    logger.error(f"TUI Render Error: {e}")
+            await asyncio.sleep(min_interval)
 
     async def tui_loop(self):
         fd = sys.stdin.fileno()
         old_settings = termios.tcgetattr(fd)
+        loop = asyncio.get_running_loop()
+        self._render_wakeup = asyncio.Event()
+        self._input_lines = asyncio.Queue()
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        consumer = None
         try:
             tty.setcbreak(fd)
             with self.dashboard.get_live() as live:
-                while self.running:
-                    try:
-                        live.update(self.dashboard.generate_layout())
-                        if select.select([sys.stdin], [], [], 0)[0]:
-                            ch = sys.stdin.read(1)
-                            if ch == '\x03': self.running = False; break
-                            elif ch in ('\n', '\r'):
-                                if self.input_buffer.strip():
-                                    await self.handle_input(self.input_buffer)
-                                    self.input_buffer = ""
-                            elif ch == '\x7f': self.input_buffer = self.input_buffer[:-1]
-                            elif ch.isprintable(): self.input_buffer += ch
-                            self.dashboard.update_input(self.input_buffer)
-                    except Exception as e:
-                        logger.error(f"TUI Loop Error: {e}")
-                    await asyncio.sleep(0.01)
+                self.dashboard.on_dirty = self._render_wakeup.set
+                if self.dashboard.log_ring is not None:
+                    # New records arrive on the log writer thread
+                    self.dashboard.log_ring.notify = lambda: loop.call_soon_threadsafe(self.dashboard.mark_dirty)
+                self.dashboard.mark_dirty()
+                loop.add_reader(fd, self._on_stdin, fd, decoder)
+                consumer = asyncio.create_task(self._input_consumer())
+                try:
+                    await self._render_loop(live)
+                finally:
+                    loop.remove_reader(fd)
+                    self.dashboard.on_dirty = None
+                    if self.dashboard.log_ring is not None:
+                        self.dashboard.log_ring.notify = None
         except Exception as fatal_e:
             logger.error(f"TUI Fatal: {fatal_e}\n{traceback.format_exc()}")
         finally:
+            if consumer:
+                consumer.cancel()
             termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
 
+def parse_options(argv=None):
+    """CLI flags, with defaults from the config file's [daemon] section.
+    Its [config] section overrides Config attributes (e.g. MULTICAST_ENABLED = True)."""
+    parser = argparse.ArgumentParser(description="Hampter Link node")
+    parser.add_argument("--headless", action="store_true", help="no prompts or TUI, serve a control socket")
+    parser.add_argument("--config", help="INI file with [daemon] and [config] sections")
+    parser.add_argument("--interface", help="wireless interface (default: the AX210, else the first one)")
+    parser.add_argument("--ip", help="IP address for the interface")
+    parser.add_argument("--channel", type=int, help="ad-hoc channel (default 1)")
+    parser.add_argument("--no-configure", dest="configure", action="store_false", default=None,
+                        help="interface is already set up (e.g. by hampter-mesh.service)")
+    parser.add_argument("--socket", help=f"control socket path (default {cfg.CONTROL_SOCKET})")
+    opts = parser.parse_args(argv)
+
+    daemon = {}
+    if opts.config:
+        ini = configparser.ConfigParser()
+        ini.optionxform = str
+        if not ini.read(opts.config):
+            parser.error(f"can't read {opts.config}")
+        if ini.has_section("daemon"):
+            daemon = ini["daemon"]
+            opts.headless = opts.headless or daemon.getboolean("headless", fallback=False)
+        if ini.has_section("config"):
+            for key, value in ini["config"].items():
+                if not hasattr(cfg, key):
+                    parser.error(f"unknown config key {key}")
+                try:
+                    setattr(cfg, key, ast.literal_eval(value))
+                except (ValueError, SyntaxError):
+                    setattr(cfg, key, value)
+    if opts.interface is None:
+        opts.interface = daemon.get("interface")
+    if opts.ip is None:
+        opts.ip = daemon.get("ip")
+    if opts.channel is None:
+        opts.channel = int(daemon.get("channel", 1))
+    if opts.configure is None:
+        opts.configure = daemon.getboolean("configure", fallback=True) if daemon else True
+    if opts.socket is None:
+        opts.socket = daemon.get("socket")
+    return opts
+
+
 if __name__ == "__main__":
-    app = HamperLinkApp()
+    options = parse_options()
+    # After parse_options, the config file may set LOG_* values
+    ring = setup_logging(console=options.headless)
+    app = HamperLinkApp(options, log_ring=ring)
     app.start()
@@ -1,57 +1,170 @@
 """
 Hardware Display Module for Qwiic SerLCD.
 Displays peer messages on external 16x2 LCD.
+
+I2C writes are slow (the driver sleeps 10 ms per character), so they run on
+a dedicated worker thread. Callers only hand over the latest content; the
+worker coalesces bursts, rate-limits updates and rewrites only the cells
+that differ from what is already on screen.
+
+Probing the panel means importing the driver and talking to the bus, so
+the app constructs LCDDisplay with lazy=True and runs connect() alongside
+the rest of startup.
 """
-import qwiic_serlcd
 import sys
+import threading
+import time
 import logging
+from config import cfg
 
 logger = logging.getLogger("Hardware")
 
+COLS = 16
+ROWS = 2
+
+
+def _make_backend():
+    if cfg.LCD_BACKEND == "fake":
+        from src.hw.fake_serlcd import FakeSerLCD
+        return FakeSerLCD()
+    import qwiic_serlcd
+    return qwiic_serlcd.QwiicSerlcd()
+
+
+def diff_runs(old: str, new: str):
+    """Yield (col, text) runs of cells where new differs from old."""
+    col = 0
+    while col < len(new):
+        if old[col] == new[col]:
+            col += 1
+            continue
+        start = col
+        while col < len(new) and old[col] != new[col]:
+            col += 1
+        yield start, new[start:col]
+
+
 class LCDDisplay:
-    def __init__(self):
-        self.lcd = qwiic_serlcd.QwiicSerlcd()
+    def __init__(self, backend=None, min_interval=None, lazy=False):
+        self.lcd = backend
         self.connected = False
+        self.min_interval = cfg.LCD_MIN_INTERVAL if min_interval is None else min_interval
+
+        # What the panel currently shows, only touched by the worker
+        self._shown = [" " * COLS] * ROWS
+        self._pending = None
+        self._cond = threading.Condition()
+        self._running = False
+        self._closed = False
+        self._worker = None
+        self.stats = {"submitted": 0, "written": 0, "coalesced": 0, "cells": 0}
+
+        if not lazy:
+            self.connect()
+
+    def connect(self):
+        """Find the panel and start the writer. Blocking, safe to run on a worker thread."""
         try:
+            if self.lcd is None:
+                self.lcd = _make_backend()
             if self.lcd.connected:
-                self.connected = True
                 self.lcd.clearScreen()
                 self.lcd.setBacklight(0, 100, 255) # Cyber Blue
-                self.lcd.print("Hampter Link Up")
+                with self._cond:
+                    if self._closed:
+                        return False
+                    self.connected = True
+                    self._start_worker()
+                self._submit("Hampter Link Up", "")
             else:
                 logger.error("LCD not found on I2C bus.")
         except Exception as e:
             logger.error(f"LCD Init error: {e}")
+        return self.connected
+
+    def _start_worker(self):
+        self._running = True
+        self._worker = threading.Thread(target=self._run, name="lcd-writer", daemon=True)
+        self._worker.start()
+
+    def close(self, timeout=1.0):
+        """Stop the worker after it has written whatever is pending."""
+        with self._cond:
+            self._running = False
+            self._closed = True
+            self._cond.notify()
+        if self._worker:
+            self._worker.join(timeout)
+
+    def flush(self, timeout=5.0):
+        """Block until pending content is on the panel. For tests and shutdown."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending is not None and time.monotonic() < deadline:
+                self._cond.wait(0.01)
+
+    def _submit(self, line1, line2):
+        lines = (line1[:COLS].ljust(COLS), line2[:COLS].ljust(COLS))
+        with self._cond:
+            if self._pending is not None:
+                self.stats["coalesced"] += 1
+            self._pending = lines
+            self.stats["submitted"] += 1
+            self._cond.notify()
+
+    def _run(self):
+        last_write = 0.0
+        while True:
+            with self._cond:
+                while self._pending is None and self._running:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+            # Rate limit outside the lock so newer content can replace pending
+            wait = last_write + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            with self._cond:
+                lines = self._pending
+                if lines is None:
+                    continue
+            try:
+                self._write(lines)
+            except Exception as e:
+                logger.error(f"LCD Print error: {e}")
+            last_write = time.monotonic()
+            with self._cond:
+                # Only clear if nothing newer arrived while we were writing
+                if self._pending is lines:
+                    self._pending = None
+                self._cond.notify_all()
+
+    def _write(self, lines):
+        for row, (old, new) in enumerate(zip(self._shown, lines)):
+            for col, text in diff_runs(old, new):
+                self.lcd.setCursor(col, row)
+                self.lcd.print(text)
+                self.stats["cells"] += len(text)
+            self._shown[row] = new
+        self.stats["written"] += 1
 
     def show_msg(self, sender, message):
         """Displays a message on the LCD."""
         if not self.connected:
             return
-            
-        try:
-            self.lcd.clearScreen()
-            # Line 1: Peer Name/IP
-            self.lcd.print(f"FR: {sender[:12]}")
-            # Line 2: Message content
-            self.lcd.setCursor(0, 1)
-            self.lcd.print(message[:16])
-        except Exception as e:
-            logger.error(f"LCD Print error: {e}")
+        # Line 1: Peer Name/IP, Line 2: Message content
+        self._submit(f"FR: {sender[:12]}", message)
 
     def show_system(self, text):
         """Displays system status."""
         if not self.connected:
             return
-        try:
-            self.lcd.clearScreen()
-            self.lcd.print("SYSTEM:")
-            self.lcd.setCursor(0, 1)
-            self.lcd.print(text[:16])
-        except Exception as e:
-            logger.error(f"LCD System blink error: {e}")
+        self._submit("SYSTEM:", text)
 
 if __name__ == '__main__':
     # Test block
     d = LCDDisplay()
     if d.connected:
         d.show_msg("TEST", "Hello World!")
+        d.flush()
+        d.close()
@@ -0,0 +1,72 @@
+"""
+Fake Qwiic SerLCD backend.
+Mimics the parts of qwiic_serlcd.QwiicSerlcd that LCDDisplay uses, with a
+simulated I2C bus delay, so the display path can run without hardware.
+The delays default to what the real driver sleeps per call.
+"""
+import threading
+import time
+
+COLS = 16
+ROWS = 2
+
+
+class FakeSerLCD:
+    def __init__(self, char_delay=0.01, command_delay=0.001, clear_delay=0.02, connected=True):
+        self.char_delay = char_delay
+        self.command_delay = command_delay
+        self.clear_delay = clear_delay
+        self.connected = connected
+
+        self.cells = [[" "] * COLS for _ in range(ROWS)]
+        self.col = 0
+        self.row = 0
+        self.backlight = (0, 0, 0)
+        # Bus accounting
+        self.chars_written = 0
+        self.commands = 0
+        self.clears = 0
+        self.busy_time = 0.0
+        self._lock = threading.Lock()
+
+    def _busy(self, seconds):
+        if seconds:
+            time.sleep(seconds)
+        self.busy_time += seconds
+
+    def clearScreen(self):
+        with self._lock:
+            self.cells = [[" "] * COLS for _ in range(ROWS)]
+            self.col = self.row = 0
+            self.clears += 1
+        self._busy(self.clear_delay)
+        return True
+
+    def setBacklight(self, r, g, b):
+        self.backlight = (r, g, b)
+        self.commands += 1
+        self._busy(self.command_delay * 10)
+        return True
+
+    def setCursor(self, col, row):
+        with self._lock:
+            self.col = max(0, min(col, COLS - 1))
+            self.row = max(0, min(row, ROWS - 1))
+            self.commands += 1
+        self._busy(self.command_delay)
+        return True
+
+    def print(self, string):
+        for ch in string:
+            with self._lock:
+                if self.col < COLS:
+                    self.cells[self.row][self.col] = ch
+                self.col += 1
+                self.chars_written += 1
+            self._busy(self.char_delay)
+        return True
+
+    def lines(self):
+        """Current display content as two strings."""
+        with self._lock:
+            return ["".join(row) for row in self.cells]
@@ -0,0 +1,81 @@
+"""
+Hardware Speaker Module.
+Plays received audio frames on the speaker.
+
+The 'aplay' backend pipes raw 16 bit mono PCM into ALSA's aplay, started on
+the first frame of a stream and stopped when the stream ends. The pipe is
+non-blocking: if aplay falls behind a frame is dropped rather than stalling
+the event loop. A frame is written whole or not at all, the tail of a short
+write goes out before anything else, otherwise every later sample would be
+off by a byte. 'null' just counts frames, for headless runs.
+
+One Speaker is one stream; each has its own aplay and ALSA mixes them.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from config import cfg
+
+logger = logging.getLogger("Hardware")
+
+
+class Speaker:
+    def __init__(self, backend=None, rate=None):
+        self.backend = backend or cfg.AUDIO_BACKEND
+        self.rate = rate or cfg.AUDIO_RATE
+        self._proc = None
+        self._pending = b""  # Unwritten tail of the last frame
+        self.stats = {"frames": 0, "dropped": 0}
+        if self.backend == "aplay" and not shutil.which("aplay"):
+            logger.error("aplay not found, audio goes nowhere")
+            self.backend = "null"
+
+    def _open(self):
+        self._proc = subprocess.Popen(
+            ["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-c", "1", "-r", str(self.rate)],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        os.set_blocking(self._proc.stdin.fileno(), False)
+
+    def write(self, pcm):
+        self.stats["frames"] += 1
+        if self.backend != "aplay":
+            return
+        try:
+            if self._proc is None:
+                self._open()
+            fd = self._proc.stdin.fileno()
+            if self._pending:
+                self._pending = self._pending[os.write(fd, self._pending):]
+                if self._pending:
+                    self.stats["dropped"] += 1
+                    return
+            self._pending = pcm[os.write(fd, pcm):]
+        except BlockingIOError:
+            self.stats["dropped"] += 1
+        except (OSError, ValueError) as e:
+            logger.error(f"Speaker write error: {e}")
+            self.close()
+
+    def close(self):
+        """End of stream, let aplay drain and exit."""
+        proc, self._proc = self._proc, None
+        self._pending = b""
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        # aplay plays out what's left in the pipe first, wait for it off the loop
+        threading.Thread(target=self._reap, args=(proc,), name="aplay-reaper", daemon=True).start()
+
+    @staticmethod
+    def _reap(proc):
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
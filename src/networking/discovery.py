@@ -2,25 +2,90 @@
 Discovery Module.
 Handles UDP Beacon broadcasting and listening.
 Enhanced for Robustness: Explicit Broadcast Address and Interface Binding.
+
+Beacons are a fixed binary header (see BEACON below) followed by the
+hostname. The payload is built once and only rebuilt when our advertised
+state changes. JSON beacons from older nodes are still understood.
+
+Sending is paced by a Trickle timer (src/networking/trickle.py): fast at
+startup and after changes, backing off while the neighbourhood is stable.
 """
 import asyncio
 import socket
 import logging
 import json
-import netifaces
+import struct
 from config import cfg
+from src.networking.trickle import TrickleTimer
+from src.ui.metrics import REGISTRY, call_timed
 
 logger = logging.getLogger("Discovery")
 
+BEACON_MAGIC = b'HMPB'
+BEACON_VERSION = 1
+# magic, version, capability bits, node id, QUIC port, epoch, hostname length
+BEACON = struct.Struct(">4sBHQHIB")
+NODE_ID_OFFSET = 7
+MAX_HOSTNAME = 64
+
+# Capability bits
+CAP_MULTICAST = 0x0001
+CAP_RELAY = 0x0002
+
+BEACONS_RX = REGISTRY.counter("hampter_beacons_received_total",
+                              "Discovery beacons heard: new (first or changed epoch), repeat, self, bad", ("result",))
+BEACONS_TX = REGISTRY.counter("hampter_beacons_sent_total", "Discovery beacons sent")
+
+
+def encode_beacon(node_id, port, caps, epoch, hostname):
+    name = hostname.encode('utf-8')[:MAX_HOSTNAME]
+    return BEACON.pack(BEACON_MAGIC, BEACON_VERSION, caps, node_id, port, epoch, len(name)) + name
+
+
+def parse_beacon(data):
+    """
+    Parse a binary beacon. Returns an info dict, or None if data isn't a
+    valid beacon. Cheap checks (length, magic, version) run before any unpacking.
+    """
+    if len(data) < BEACON.size or data[:4] != BEACON_MAGIC or data[4] != BEACON_VERSION:
+        return None
+    _, _, caps, node_id, port, epoch, name_len = BEACON.unpack_from(data)
+    if len(data) != BEACON.size + name_len:
+        return None
+    try:
+        hostname = data[BEACON.size:].decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    return {"hostname": hostname, "node_id": node_id, "port": port, "caps": caps,
+            "epoch": epoch, "status": "READY"}
+
+
+def local_caps():
+    caps = CAP_RELAY
+    if cfg.MULTICAST_ENABLED:
+        caps |= CAP_MULTICAST
+    return caps
+
+
 class DiscoveryProtocol(asyncio.DatagramProtocol):
-    def __init__(self, on_peer_found_callback, dashboard=None):
+    def __init__(self, on_peer_found_callback, dashboard=None, node_id=None):
         self.on_peer_found = on_peer_found_callback
         self.transport = None
         self.dashboard = dashboard
+        self.hostname = cfg.get_hostname()
+        self._own_id = (cfg.node_id if node_id is None else node_id).to_bytes(8, 'big')
+        self.stats = {"rx": 0, "rx_bad": 0, "rx_json": 0, "rx_self": 0}
+        # Last epoch seen per node (node_id, or hostname for JSON beacons)
+        self.known = {}
+        # on_heard(consistent) lets the beacon scheduler count what we hear
+        self.on_heard = None
 
     def connection_made(self, transport):
         self.transport = transport
         sock = transport.get_extra_info('socket')
+        if sock is None:
+            # Not a real socket (benchmarks/sim_discovery.py)
+            return
         
         # Enable Broadcast
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
@@ -38,31 +103,112 @@ class DiscoveryProtocol(asyncio.DatagramProtocol):
                     self.dashboard.add_debug(f"Failed to bind UDP: {e}")
 
     def datagram_received(self, data, addr):
+        self.stats["rx"] += 1
+        if data[:4] == BEACON_MAGIC:
+            # Filter out ourselves before doing any parsing
+            if data[NODE_ID_OFFSET:NODE_ID_OFFSET + 8] == self._own_id:
+                self.stats["rx_self"] += 1
+                BEACONS_RX.inc("self")
+                return
+            info = parse_beacon(data)
+        elif data.startswith(cfg.BEACON_MAGIC):
+            info = self._parse_json(data)
+            # Filter out ourselves (using hostname is a simple way)
+            if info is not None and info.get('hostname') == self.hostname:
+                self.stats["rx_self"] += 1
+                BEACONS_RX.inc("self")
+                return
+        else:
+            info = None
+
+        if info is None:
+            self.stats["rx_bad"] += 1
+            BEACONS_RX.inc("bad")
+            return
+
+        key = info.get("node_id", info.get("hostname"))
+        epoch = info.get("epoch")
+        consistent = key in self.known and self.known[key] == epoch
+        if not consistent:
+            self.known[key] = epoch
+        BEACONS_RX.inc("repeat" if consistent else "new")
+        if self.on_heard:
+            self.on_heard(consistent)
+
+        # Repeats from known peers would only flood the debug panel
+        if self.dashboard and not consistent:
+            self.dashboard.add_debug(f"RX Beacon from {addr[0]}")
         try:
-            if data.startswith(cfg.BEACON_MAGIC):
-                payload = data[len(cfg.BEACON_MAGIC):]
-                info = json.loads(payload)
-                
-                # Filter out ourselves (using hostname is a simple way)
-                if info.get('hostname') == cfg.get_hostname():
-                    return
-                
-                if self.dashboard:
-                    self.dashboard.add_debug(f"RX Beacon from {addr[0]}")
-                    
-                self.on_peer_found(info, addr[0])
-        except Exception:
-            pass
+            call_timed("peer_found", self.on_peer_found, info, addr[0])
+        except Exception as e:
+            logger.error(f"on_peer_found Error: {e}")
+
+    def _parse_json(self, data):
+        # Compatibility path for nodes that still send JSON beacons
+        try:
+            info = json.loads(data[len(cfg.BEACON_MAGIC):])
+        except (ValueError, UnicodeDecodeError):
+            return None
+        if not isinstance(info, dict):
+            return None
+        self.stats["rx_json"] += 1
+        return info
 
 class DiscoveryService:
-    def __init__(self, on_peer_found, dashboard=None):
+    def __init__(self, on_peer_found, dashboard=None, node_id=None):
         self.on_peer_found = on_peer_found
+        self.node_id = cfg.node_id if node_id is None else node_id
         self.dashboard = dashboard
         self.transport = None
         self.protocol = None
         self.broadcasting = False
+        self.hostname = cfg.get_hostname()
+        self.caps = local_caps()
+        self.port = cfg.DEFAULT_PORT
+        self.epoch = 0
+        self._payloads = []
+        self._build_payload()
+        self.trickle = TrickleTimer(cfg.BEACON_IMIN, cfg.BEACON_IMAX, cfg.BEACON_K,
+                                    max_silent=cfg.BEACON_MAX_SILENT)
+        self._wakeup = asyncio.Event()
+
+    def _build_payload(self):
+        payloads = []
+        if cfg.BEACON_FORMAT in ("binary", "both"):
+            payloads.append(encode_beacon(self.node_id, self.port, self.caps, self.epoch, self.hostname))
+        if cfg.BEACON_FORMAT in ("json", "both"):
+            msg = {"hostname": self.hostname, "status": "READY"}
+            payloads.append(cfg.BEACON_MAGIC + json.dumps(msg).encode())
+        self._payloads = payloads
+
+    def update_state(self, caps=None, port=None, hostname=None):
+        """Change what we advertise. Bumps the epoch and rebuilds the payload once."""
+        changed = False
+        if caps is not None and caps != self.caps:
+            self.caps, changed = caps, True
+        if port is not None and port != self.port:
+            self.port, changed = port, True
+        if hostname is not None and hostname != self.hostname:
+            self.hostname, changed = hostname, True
+        if changed:
+            self.epoch = (self.epoch + 1) & 0xFFFFFFFF
+            self._build_payload()
+            self.topology_changed()
+
+    def topology_changed(self):
+        """Something changed (our state, a lost link): go back to fast beacons."""
+        if self.broadcasting and self.trickle.reset(asyncio.get_running_loop().time()):
+            self._wakeup.set()
+
+    def _on_heard(self, consistent):
+        if self.broadcasting and self.trickle.heard(consistent, asyncio.get_running_loop().time()):
+            self._wakeup.set()
 
-    async def start(self):
+    async def start(self, create_endpoint=None):
+        """
+        Open the beacon socket and start beaconing. create_endpoint(factory)
+        replaces loop.create_datagram_endpoint, e.g. with a simulated medium.
+        """
         loop = asyncio.get_running_loop()
         
         # Robustness Fix: Force Global Broadcast
@@ -74,29 +220,62 @@ class DiscoveryService:
             self.dashboard.add_debug(f"UDP Target: {broadcast_addr}")
 
         # Bind to 0.0.0.0 to receive, but we rely on SO_BINDTODEVICE in protocol
-        self.transport, self.protocol = await loop.create_datagram_endpoint(
-            lambda: DiscoveryProtocol(self.on_peer_found, self.dashboard),
-            local_addr=('0.0.0.0', cfg.DISCOVERY_PORT),
-            allow_broadcast=True
-        )
+        factory = lambda: DiscoveryProtocol(self.on_peer_found, self.dashboard, self.node_id)
+        if create_endpoint:
+            self.transport, self.protocol = await create_endpoint(factory)
+        else:
+            self.transport, self.protocol = await loop.create_datagram_endpoint(
+                factory,
+                local_addr=('0.0.0.0', cfg.DISCOVERY_PORT),
+                allow_broadcast=True
+            )
+        self.protocol.on_heard = self._on_heard
         
         # Start broadcast loop
         self.broadcasting = True
         asyncio.create_task(self._broadcast_loop(broadcast_addr))
 
+    def _send_beacon(self, target):
+        if not self.transport:
+            return
+        try:
+            for payload in self._payloads:
+                self.transport.sendto(payload, target)
+            BEACONS_TX.inc(by=len(self._payloads))
+            # if self.dashboard: self.dashboard.add_debug("TX Beacon")
+        except Exception as e:
+            if self.dashboard:
+                self.dashboard.add_debug(f"TX Fail: {e}")
+
+    async def _sleep_until(self, deadline):
+        """Sleep until deadline. Returns False if a Trickle reset cut it short."""
+        loop = asyncio.get_running_loop()
+        if not self._wakeup.is_set():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                return True
+        self._wakeup.clear()
+        return False
+
     async def _broadcast_loop(self, broadcast_addr):
+        target = (broadcast_addr, cfg.DISCOVERY_PORT)
+        if not cfg.BEACON_TRICKLE:
+            while self.broadcasting:
+                self._send_beacon(target)
+                await asyncio.sleep(cfg.BEACON_INTERVAL)
+            return
+
+        loop = asyncio.get_running_loop()
+        trickle = self.trickle
+        trickle.start(loop.time())
         while self.broadcasting:
-            if self.transport:
-                msg = {
-                    "hostname": cfg.get_hostname(),
-                    "status": "READY"
-                }
-                payload = cfg.BEACON_MAGIC + json.dumps(msg).encode()
-                try:
-                    self.transport.sendto(payload, (broadcast_addr, cfg.DISCOVERY_PORT))
-                    # if self.dashboard: self.dashboard.add_debug("TX Beacon")
-                except Exception as e:
-                    if self.dashboard:
-                        self.dashboard.add_debug(f"TX Fail: {e}")
-            
-            await asyncio.sleep(cfg.BEACON_INTERVAL)
+            if not await self._sleep_until(trickle.t_fire):
+                continue
+            now = loop.time()
+            if trickle.should_transmit(now):
+                self._send_beacon(target)
+                trickle.transmitted(now)
+            if not await self._sleep_until(trickle.t_end):
+                continue
+            trickle.interval_expired(loop.time())
@@ -0,0 +1,137 @@
+"""
+Flooding Module.
+Multi-hop relay of chat messages with duplicate suppression.
+
+Every chat payload is wrapped in a small envelope:
+    <origin id: 8 bytes><seq: 4 bytes><ttl: 1 byte><utf-8 body>
+A node delivers a message the first time it sees (origin, seq), then
+forwards it to all of its other links with the TTL decremented.
+"""
+import logging
+import struct
+from collections import OrderedDict
+from config import cfg
+
+logger = logging.getLogger("Flood")
+
+ENVELOPE = struct.Struct(">QIB")  # origin, seq, ttl
+MESSAGE_ID_SIZE = 12  # origin + seq, unique per message
+SEQ_MASK = 0xFFFFFFFF
+
+
+def encode_envelope(origin: int, seq: int, ttl: int, body: bytes) -> bytes:
+    return ENVELOPE.pack(origin, seq, ttl) + body
+
+
+def message_id(payload) -> bytes:
+    """The (origin, seq) bytes of an envelope, the same on every hop."""
+    return bytes(payload[:MESSAGE_ID_SIZE])
+
+
+def decode_envelope(payload):
+    """Returns (origin, seq, ttl, body view). Raises ValueError on short payloads."""
+    if len(payload) < ENVELOPE.size:
+        raise ValueError(f"Envelope too short ({len(payload)} bytes)")
+    origin, seq, ttl = ENVELOPE.unpack_from(payload)
+    return origin, seq, ttl, memoryview(payload)[ENVELOPE.size:]
+
+
+class SeenCache:
+    """
+    Bounded LRU set of (origin << 32 | seq) keys. All operations are O(1) amortised.
+
+    Per origin it also keeps a floor: every seq from the first one seen up to
+    the floor has been seen. Seqs only go up, so once the gaps fill (a flushed
+    outbox delivers in order) old messages stay known after the LRU evicted them.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._floors = {}  # origin -> [first seq seen, floor]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _below_floor(self, origin, seq):
+        span = self._floors.get(origin)
+        return span is not None and span[0] <= seq <= span[1]
+
+    def __contains__(self, key):
+        return key in self._entries or self._below_floor(key >> 32, key & SEQ_MASK)
+
+    def add(self, key) -> bool:
+        """Record key. Returns False if it was already present."""
+        entries = self._entries
+        if key in entries:
+            entries.move_to_end(key)
+            return False
+        origin, seq = key >> 32, key & SEQ_MASK
+        if self._below_floor(origin, seq):
+            return False
+        entries[key] = None
+        span = self._floors.get(origin)
+        if span is None:
+            self._floors[origin] = [seq, seq]
+        elif seq == span[1] + 1:
+            span[1] = seq
+            while (origin << 32 | (span[1] + 1)) in entries:
+                span[1] += 1
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+        return True
+
+
+class FloodRouter:
+    """
+    deliver(origin, hops, text, from_ip) shows a message locally.
+    forward(payload, exclude_ip) sends an envelope to every link except exclude_ip.
+    """
+
+    def __init__(self, node_id, deliver, forward, ttl=None, cache_size=None):
+        self.node_id = node_id
+        self.deliver = deliver
+        self.forward = forward
+        self.ttl = ttl if ttl is not None else cfg.FLOOD_TTL
+        self.seen = SeenCache(cache_size if cache_size is not None else cfg.FLOOD_CACHE_SIZE)
+        self._seq = 0
+        self.stats = {"originated": 0, "received": 0, "delivered": 0,
+                      "duplicates": 0, "forwarded": 0, "expired": 0, "bad": 0}
+
+    def originate(self, text: str) -> bytes:
+        """Wrap a local message in an envelope. The caller sends the result to all links."""
+        self._seq = (self._seq + 1) & SEQ_MASK
+        self.seen.add((self.node_id << 32) | self._seq)
+        self.stats["originated"] += 1
+        return encode_envelope(self.node_id, self._seq, self.ttl, text.encode('utf-8'))
+
+    def receive(self, payload, from_ip):
+        """Handle an envelope that arrived from a direct link."""
+        self.stats["received"] += 1
+        try:
+            origin, seq, ttl, body = decode_envelope(payload)
+        except ValueError as e:
+            self.stats["bad"] += 1
+            logger.error(f"Bad envelope from {from_ip}: {e}")
+            return
+
+        if not self.seen.add((origin << 32) | seq):
+            self.stats["duplicates"] += 1
+            return
+
+        try:
+            text = str(body, 'utf-8')
+        except UnicodeDecodeError as e:
+            self.stats["bad"] += 1
+            logger.error(f"Decode error from {from_ip}: {e}")
+            return
+        self.stats["delivered"] += 1
+        self.deliver(origin, max(0, self.ttl - ttl), text, from_ip)
+
+        if ttl <= 1:
+            self.stats["expired"] += 1
+            return
+        relayed = bytearray(payload)
+        relayed[ENVELOPE.size - 1] = ttl - 1
+        self.stats["forwarded"] += 1
+        self.forward(bytes(relayed), from_ip)
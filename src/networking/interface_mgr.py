@@ -1,61 +1,142 @@
 """
 Interface Management Module.
 Handles detection and configuration of network interfaces.
+
+Detection reads sysfs, no subprocesses: /sys/class/net/<iface>/wireless (or
+phy80211) marks a wireless interface, device/driver links to the kernel
+driver and device/vendor + device/device are the PCI IDs, which is how the
+AX210 is told apart from other iwlwifi cards. Results are cached until a
+netlink RTM_NEWLINK/RTM_DELLINK message says the links changed.
 """
+import os
+import socket
 import subprocess
 import logging
-import re
 from typing import List, Dict, Optional
-import netifaces
 
 logger = logging.getLogger("InterfaceMgr")
 
+SYSFS_NET = "/sys/class/net"
+# (vendor, device) PCI IDs of the Intel Wi-Fi 6E AX210
+AX210_IDS = {(0x8086, 0x2725)}
+RTMGRP_LINK = 0x1
+
+
+def _read(path) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _read_hex(path) -> Optional[int]:
+    value = _read(path)
+    try:
+        return int(value, 16) if value else None
+    except ValueError:
+        return None
+
+
+class LinkWatcher:
+    """Netlink socket subscribed to link events. changed() says if any arrived since the last call."""
+
+    def __init__(self):
+        self.sock = None
+        try:
+            self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_NONBLOCK, socket.NETLINK_ROUTE)
+            self.sock.bind((0, RTMGRP_LINK))
+        except (AttributeError, OSError) as e:
+            # No netlink (not Linux, or sandboxed): callers just don't cache
+            logger.debug(f"Link watcher unavailable: {e}")
+            self.sock = None
+
+    def changed(self) -> bool:
+        if self.sock is None:
+            return True
+        changed = False
+        while True:
+            try:
+                if not self.sock.recv(65536):
+                    break
+                changed = True
+            except BlockingIOError:
+                break
+            except OSError:
+                # ENOBUFS: we missed some, which is a change too
+                changed = True
+                break
+        return changed
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+
 class InterfaceManager:
+    _cache = {}  # sysfs root -> interface list
+    _watcher = None
+
+    @staticmethod
+    def read_interface(root: str, name: str) -> Optional[Dict]:
+        """Details of one interface from sysfs, None if it isn't wireless."""
+        base = os.path.join(root, name)
+        if not (os.path.isdir(os.path.join(base, "wireless")) or os.path.exists(os.path.join(base, "phy80211"))):
+            return None
+        try:
+            driver = os.path.basename(os.readlink(os.path.join(base, "device", "driver")))
+        except OSError:
+            driver = "Unknown"
+        vendor = _read_hex(os.path.join(base, "device", "vendor"))
+        device = _read_hex(os.path.join(base, "device", "device"))
+        return {
+            'name': name,
+            'mac': _read(os.path.join(base, "address")) or 'Unknown',
+            'driver': driver,
+            'pci_id': f"{vendor:04x}:{device:04x}" if vendor is not None and device is not None else None,
+            'is_ax210': (vendor, device) in AX210_IDS,
+        }
+
     @staticmethod
-    def scan_interfaces() -> List[Dict[str, str]]:
+    def scan_interfaces(root: Optional[str] = None, refresh: bool = False) -> List[Dict[str, str]]:
         """
         Scan for wireless interfaces and return details.
-        Returns: List of dicts {'name': str, 'driver': str, 'mac': str, 'is_ax210': bool}
+        Returns: List of dicts {'name': str, 'driver': str, 'mac': str, 'pci_id': str|None, 'is_ax210': bool}
+        root is the sysfs net class directory, for pointing at a fake tree.
         """
+        root = root or SYSFS_NET
+        if InterfaceManager._watcher is None:
+            InterfaceManager._watcher = LinkWatcher()
+        if InterfaceManager._watcher.changed():
+            InterfaceManager._cache.clear()
+        cached = None if refresh else InterfaceManager._cache.get(root)
+        if cached is None:
+            cached = InterfaceManager._scan(root)
+            if InterfaceManager._watcher.sock is not None:
+                InterfaceManager._cache[root] = cached
+        # Copies, callers may edit theirs
+        return [dict(i) for i in cached]
+
+    @staticmethod
+    def invalidate():
+        InterfaceManager._cache.clear()
+
+    @staticmethod
+    def _scan(root):
         interfaces = []
         try:
-            # Use 'ip link' to get basic list
-            result = subprocess.run(['ip', 'link', 'show'], capture_output=True, text=True)
-            for line in result.stdout.split('\n'):
-                # Basic parsing, in reality we might want 'ethtool -i' for driver info
-                # Match: 3: wlan0: <...>
-                match = re.search(r'\d+: ([\w\d]+):', line)
-                if match:
-                    iface = match.group(1)
-                    if not iface.startswith('wl'): continue # Skip non-wireless usually
-                    
-                    details = {
-                        'name': iface,
-                        'mac': 'Unknown',
-                        'driver': 'Unknown',
-                        'is_ax210': False
-                    }
-                    
-                    # Get Driver Info
-                    try:
-                        ethtool = subprocess.run(['ethtool', '-i', iface], capture_output=True, text=True)
-                        if "driver: iwlwifi" in ethtool.stdout:
-                            details['driver'] = "iwlwifi"
-                            # Loose check for AX210 based on driver or lspci if needed
-                            # For MVP assume if it's iwlwifi on a Pi, it's likely our PCIe card
-                            details['is_ax210'] = True 
-                    except FileNotFoundError:
-                        pass # ethtool might not be installed
-
+            for name in sorted(os.listdir(root)):
+                details = InterfaceManager.read_interface(root, name)
+                if details:
                     interfaces.append(details)
-                    
-        except Exception as e:
+        except OSError as e:
             logger.error(f"Scan failed: {e}")
             # Fallback for dev/mac (netifaces)
+            import netifaces
             for iface in netifaces.interfaces():
                 if iface.startswith('en') or iface.startswith('wl'):
-                     interfaces.append({'name': iface, 'driver': 'N/A', 'is_ax210': False})
-
+                     interfaces.append({'name': iface, 'mac': 'Unknown', 'driver': 'N/A', 'pci_id': None, 'is_ax210': False})
         return interfaces
 
     @staticmethod
@@ -0,0 +1,273 @@
+"""
+Multicast Module.
+Encrypted UDP multicast fast path for mesh-wide broadcast messages.
+
+Every node owns a random sender key and hands it to each peer over the
+existing QUIC link (CTRL_GROUP_KEY). A peer whose channel is up (group
+joined) answers with CTRL_GROUP_KEY_ACK, and only acked peers are left out
+of the unicast fan-out; one without multicast never acks and keeps getting
+everything over QUIC. A broadcast is then sent once as an AES-GCM sealed
+datagram instead of once per peer. Receivers track the
+sender's sequence numbers; gaps are reported back with CTRL_GROUP_NACK and
+repaired over unicast QUIC. A periodic CTRL_GROUP_SYNC carries the latest
+sequence so a lost final datagram is noticed too.
+"""
+import asyncio
+import logging
+import os
+import socket
+import struct
+from collections import deque
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from config import cfg
+from src.protocol.control import CTRL_GROUP_KEY, CTRL_GROUP_KEY_ACK, CTRL_GROUP_NACK, CTRL_GROUP_SYNC
+
+logger = logging.getLogger("Multicast")
+
+DATAGRAM_MAGIC = b'HMC1'
+HEADER = struct.Struct(">4sIQ")  # magic, key_id, seq
+KEY_MSG = struct.Struct(">IQ32s")  # key_id, next_seq, key
+SYNC_MSG = struct.Struct(">IQ")  # key_id, last_seq
+KEY_ACK_MSG = struct.Struct(">I")  # key_id
+NACK_HEAD = struct.Struct(">IH")  # key_id, count
+MAX_NACK = 64
+
+
+def _nonce(key_id: int, seq: int) -> bytes:
+    # Unique per (key, seq) since seq never repeats under one key
+    return struct.pack(">IQ", key_id, seq)
+
+
+class _PeerKey:
+    __slots__ = ("ip", "aead", "highest")
+
+    def __init__(self, ip, key, next_seq):
+        self.ip = ip
+        self.aead = AESGCM(key)
+        self.highest = next_seq - 1
+
+
+class MulticastProtocol(asyncio.DatagramProtocol):
+    def __init__(self, channel):
+        self.channel = channel
+
+    def datagram_received(self, data, addr):
+        self.channel.on_datagram(data, addr)
+
+
+class MulticastChannel:
+    """
+    send_control(ip, msg_type, payload) and send_unicast(ip, data) are
+    provided by the app and go out over the peer's QUIC link.
+    on_message(ip, data) is called with the payload of every broadcast we receive.
+    """
+
+    def __init__(self, on_message, send_control, send_unicast, dashboard=None):
+        self.on_message = on_message
+        self.send_control = send_control
+        self.send_unicast = send_unicast
+        self.dashboard = dashboard
+        self.transport = None
+        self.running = False
+
+        self.key_id = int.from_bytes(os.urandom(4), "big")
+        self._key = AESGCM.generate_key(bit_length=256)
+        self._aead = AESGCM(self._key)
+        self.next_seq = 1
+        self._synced_seq = 0
+
+        # Peers that acked our key, i.e. receive our multicast
+        self.keyed_peers = set()
+        # Keys we received: { key_id: _PeerKey }
+        self.peer_keys = {}
+        self._key_by_ip = {}
+
+        self._history = {}
+        self._history_order = deque()
+
+        self.stats = {"tx_datagrams": 0, "tx_bytes": 0, "rx_datagrams": 0,
+                      "rx_bad": 0, "nacks_sent": 0, "repairs_sent": 0}
+
+    def _make_socket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if cfg.interface and hasattr(socket, 'SO_BINDTODEVICE'):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, cfg.interface.encode('utf-8'))
+            except OSError as e:
+                logger.warning(f"Failed to bind multicast to {cfg.interface}: {e}")
+        sock.bind(('', cfg.MULTICAST_PORT))
+
+        local = socket.inet_aton(cfg.ip_address) if cfg.ip_address else socket.inet_aton('0.0.0.0')
+        group = socket.inet_aton(cfg.MULTICAST_GROUP)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, group + local)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, local)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 0)
+        sock.setblocking(False)
+        return sock
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: MulticastProtocol(self), sock=self._make_socket()
+        )
+        self.running = True
+        if self.dashboard:
+            self.dashboard.add_debug(f"MCAST: Joined {cfg.MULTICAST_GROUP}:{cfg.MULTICAST_PORT}")
+        asyncio.create_task(self._sync_loop())
+
+    def stop(self):
+        self.running = False
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+
+    # --- Key distribution -------------------------------------------------
+
+    def key_message(self) -> bytes:
+        return KEY_MSG.pack(self.key_id, self.next_seq, self._key)
+
+    def peer_linked(self, ip):
+        """Hand our sender key to a newly linked peer. It counts as keyed once it acks."""
+        self.keyed_peers.discard(ip)
+        self.send_control(ip, CTRL_GROUP_KEY, self.key_message())
+
+    def peer_lost(self, ip):
+        self.keyed_peers.discard(ip)
+        key_id = self._key_by_ip.pop(ip, None)
+        if key_id is not None:
+            self.peer_keys.pop(key_id, None)
+
+    def on_control(self, ip, msg_type, payload):
+        """Handle a group control message from a peer. Returns True if consumed."""
+        try:
+            if msg_type == CTRL_GROUP_KEY:
+                key_id, next_seq, key = KEY_MSG.unpack(payload)
+                old = self._key_by_ip.get(ip)
+                if old is not None and old != key_id:
+                    self.peer_keys.pop(old, None)
+                if key_id not in self.peer_keys:
+                    self.peer_keys[key_id] = _PeerKey(ip, key, next_seq)
+                self._key_by_ip[ip] = key_id
+                # Only ack once we can actually hear the group
+                if self.running:
+                    self.send_control(ip, CTRL_GROUP_KEY_ACK, KEY_ACK_MSG.pack(key_id))
+                return True
+            if msg_type == CTRL_GROUP_KEY_ACK:
+                key_id, = KEY_ACK_MSG.unpack(payload)
+                if key_id == self.key_id:
+                    self.keyed_peers.add(ip)
+                return True
+            if msg_type == CTRL_GROUP_SYNC:
+                key_id, last_seq = SYNC_MSG.unpack(payload)
+                peer = self.peer_keys.get(key_id)
+                if peer is not None and last_seq > peer.highest:
+                    self._mark_missing(key_id, peer, peer.highest + 1, last_seq + 1)
+                    peer.highest = last_seq
+                return True
+            if msg_type == CTRL_GROUP_NACK:
+                key_id, count = NACK_HEAD.unpack_from(payload)
+                if key_id != self.key_id:
+                    return True
+                seqs = struct.unpack_from(f">{count}Q", payload, NACK_HEAD.size)
+                self._repair(ip, seqs)
+                return True
+        except struct.error as e:
+            logger.error(f"Bad group control from {ip}: {e}")
+            return True
+        return False
+
+    # --- Send path --------------------------------------------------------
+
+    def broadcast(self, data: bytes) -> bool:
+        """Seal and multicast one message. Returns False if the channel is down."""
+        if not self.running or not self.transport:
+            return False
+        seq = self.next_seq
+        self.next_seq += 1
+        header = HEADER.pack(DATAGRAM_MAGIC, self.key_id, seq)
+        packet = header + self._aead.encrypt(_nonce(self.key_id, seq), data, header)
+
+        self._history[seq] = data
+        self._history_order.append(seq)
+        while len(self._history_order) > cfg.MULTICAST_HISTORY:
+            self._history.pop(self._history_order.popleft(), None)
+
+        try:
+            self.transport.sendto(packet, (cfg.MULTICAST_GROUP, cfg.MULTICAST_PORT))
+        except Exception as e:
+            # Receivers will notice the gap on the next sync and ask for a repair
+            logger.error(f"Multicast send failed: {e}")
+            return True
+        self.stats["tx_datagrams"] += 1
+        self.stats["tx_bytes"] += len(packet)
+        return True
+
+    def _repair(self, ip, seqs):
+        for seq in seqs:
+            data = self._history.get(seq)
+            if data is None:
+                continue
+            try:
+                self.send_unicast(ip, data)
+                self.stats["repairs_sent"] += 1
+            except Exception as e:
+                logger.error(f"Repair to {ip} failed: {e}")
+                return
+
+    async def _sync_loop(self):
+        while self.running:
+            await asyncio.sleep(cfg.MULTICAST_SYNC_INTERVAL)
+            last = self.next_seq - 1
+            if last == self._synced_seq:
+                continue
+            self._synced_seq = last
+            payload = SYNC_MSG.pack(self.key_id, last)
+            for ip in list(self.keyed_peers):
+                try:
+                    self.send_control(ip, CTRL_GROUP_SYNC, payload)
+                except Exception as e:
+                    logger.error(f"Sync to {ip} failed: {e}")
+
+    # --- Receive path -----------------------------------------------------
+
+    def on_datagram(self, data, addr):
+        if len(data) < HEADER.size + 16 or data[:4] != DATAGRAM_MAGIC:
+            self.stats["rx_bad"] += 1
+            return
+        _, key_id, seq = HEADER.unpack_from(data)
+        peer = self.peer_keys.get(key_id)
+        if peer is None:
+            # Key not here yet, the sender's sync will trigger a repair
+            return
+        if seq <= peer.highest:
+            # Duplicate, or a late copy of something already repaired over unicast
+            return
+        header = data[:HEADER.size]
+        try:
+            plain = peer.aead.decrypt(_nonce(key_id, seq), data[HEADER.size:], header)
+        except Exception:
+            self.stats["rx_bad"] += 1
+            return
+
+        self.stats["rx_datagrams"] += 1
+        if seq > peer.highest + 1:
+            self._mark_missing(key_id, peer, peer.highest + 1, seq)
+        peer.highest = seq
+
+        try:
+            self.on_message(peer.ip, plain)
+        except Exception as e:
+            logger.error(f"Multicast delivery error: {e}")
+
+    def _mark_missing(self, key_id, peer, first, end):
+        seqs = list(range(max(first, end - MAX_NACK), end))
+        if not seqs:
+            return
+        self.stats["nacks_sent"] += 1
+        payload = NACK_HEAD.pack(key_id, len(seqs)) + struct.pack(f">{len(seqs)}Q", *seqs)
+        try:
+            self.send_control(peer.ip, CTRL_GROUP_NACK, payload)
+        except Exception as e:
+            logger.error(f"NACK to {peer.ip} failed: {e}")
@@ -0,0 +1,333 @@
+"""
+Outbox Module.
+Durable store-and-forward queue of chat envelopes for peers that are down.
+
+Every destination we have linked with gets a directory under OUTBOX_DIR:
+  <n>.log   append-only records <len: 4><crc32: 4><message id: 12><envelope>
+  <n>.idx   one entry per record <message id: 12><offset: 4><length: 4>
+  cursor    <segment: 4><offset: 4>, first record not yet flushed
+
+A new segment starts once the current one reaches OUTBOX_SEGMENT_BYTES.
+When a destination goes over OUTBOX_MAX_BYTES its oldest segment is
+dropped, so the disk use is bounded. The .idx files make reopening cheap,
+because the logs don't have to be scanned. A torn tail (crash between the
+log and the index write) is cut back to the last indexed record.
+
+The message id is the envelope's (origin, seq), the same key the flood
+router dedupes on. A message already queued for a destination is not
+queued twice, and a receiver drops anything it has seen before, so a flush
+that is cut off and retried never delivers twice. On reconnect the backlog
+goes out as a few large writes instead of one write per message, and a
+batch only leaves the disk once the peer has acknowledged all of it.
+"""
+import asyncio
+import logging
+import os
+import struct
+import zlib
+from config import cfg
+
+logger = logging.getLogger("Outbox")
+
+RECORD = struct.Struct(">II12s")  # payload length, crc32, message id (payload follows)
+INDEX = struct.Struct(">12sII")  # message id, record offset, record length
+CURSOR = struct.Struct(">II")  # segment, offset
+
+ACK_POLL = 0.005  # Seconds between acknowledgement checks while flushing
+
+
+def _dir_name(ip):
+    return ip.replace(":", "_").replace("/", "_")
+
+
+class Segment:
+    __slots__ = ("number", "log_path", "idx_path", "entries", "size")
+
+    def __init__(self, number, root):
+        self.number = number
+        self.log_path = os.path.join(root, f"{number:08d}.log")
+        self.idx_path = os.path.join(root, f"{number:08d}.idx")
+        self.entries = []  # (message id, offset, length)
+        self.size = 0
+
+    def load(self):
+        """Read the index, cutting both files back to the last complete record."""
+        try:
+            with open(self.idx_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = b""
+        try:
+            log_size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            log_size = 0
+        usable = len(raw) - len(raw) % INDEX.size
+        for off in range(0, usable, INDEX.size):
+            entry = INDEX.unpack_from(raw, off)
+            if entry[1] + entry[2] > log_size:
+                break
+            self.entries.append(entry)
+        self.size = self.entries[-1][1] + self.entries[-1][2] if self.entries else 0
+        if self.size != log_size or len(raw) != len(self.entries) * INDEX.size:
+            logger.warning(f"Outbox segment {self.log_path}: torn tail, truncating")
+            with open(self.log_path, "ab") as f:
+                f.truncate(self.size)
+            with open(self.idx_path, "ab") as f:
+                f.truncate(len(self.entries) * INDEX.size)
+
+    def remove(self):
+        for path in (self.log_path, self.idx_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class PeerOutbox:
+    """Queue for one destination."""
+
+    def __init__(self, root, segment_bytes, max_bytes):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.segments = []
+        self.ids = set()  # Message ids still queued
+        self.cursor = (0, 0)
+        self.dropped = 0
+        self._log = None  # Append handles for the last segment
+        self._idx = None
+        os.makedirs(root, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        numbers = sorted(int(n[:-4]) for n in os.listdir(self.root) if n.endswith(".log"))
+        for number in numbers:
+            seg = Segment(number, self.root)
+            seg.load()
+            self.segments.append(seg)
+        try:
+            with open(os.path.join(self.root, "cursor"), "rb") as f:
+                self.cursor = CURSOR.unpack(f.read(CURSOR.size))
+        except (FileNotFoundError, struct.error):
+            self.cursor = (numbers[0], 0) if numbers else (0, 0)
+        self._trim_flushed()
+        for seg, entry in self._pending_entries():
+            self.ids.add(entry[0])
+
+    def _pending_entries(self):
+        cur_seg, cur_off = self.cursor
+        for seg in self.segments:
+            if seg.number < cur_seg:
+                continue
+            for entry in seg.entries:
+                if seg.number > cur_seg or entry[1] >= cur_off:
+                    yield seg, entry
+
+    def pending(self):
+        return len(self.ids)
+
+    def disk_bytes(self):
+        return sum(seg.size for seg in self.segments)
+
+    def _close_handles(self):
+        for f in (self._log, self._idx):
+            if f:
+                f.close()
+        self._log = self._idx = None
+
+    def append(self, msg_id, payload) -> bool:
+        """Queue an envelope. False if this message is already queued."""
+        if msg_id in self.ids:
+            return False
+        record = RECORD.pack(len(payload), zlib.crc32(payload), msg_id) + bytes(payload)
+        seg = self.segments[-1] if self.segments else None
+        if seg is None or seg.size + len(record) > self.segment_bytes and seg.entries:
+            self._close_handles()
+            seg = Segment(seg.number + 1 if seg else self.cursor[0], self.root)
+            self.segments.append(seg)
+        if self._log is None:
+            self._log = open(seg.log_path, "ab")
+            self._idx = open(seg.idx_path, "ab")
+        offset = seg.size
+        # Log before index, so a crash leaves at worst an unindexed tail
+        self._log.write(record)
+        self._log.flush()
+        self._idx.write(INDEX.pack(msg_id, offset, len(record)))
+        self._idx.flush()
+        seg.entries.append((msg_id, offset, len(record)))
+        seg.size += len(record)
+        self.ids.add(msg_id)
+        self._enforce_limit()
+        return True
+
+    def _enforce_limit(self):
+        while len(self.segments) > 1 and self.disk_bytes() > self.max_bytes:
+            seg = self.segments.pop(0)
+            for msg_id, offset, _ in seg.entries:
+                unsent = seg.number > self.cursor[0] or (seg.number == self.cursor[0] and offset >= self.cursor[1])
+                if unsent and msg_id in self.ids:
+                    self.ids.discard(msg_id)
+                    self.dropped += 1
+            seg.remove()
+            if self.cursor[0] <= seg.number:
+                self._set_cursor((self.segments[0].number, 0))
+            logger.warning(f"Outbox {self.root} over {self.max_bytes} bytes, dropped segment {seg.number}")
+
+    def read_batch(self, max_bytes):
+        """Up to max_bytes of queued envelopes from one segment: (payloads, cursor after them)."""
+        for seg in self.segments:
+            if seg.number < self.cursor[0]:
+                continue
+            start = self.cursor[1] if seg.number == self.cursor[0] else 0
+            end = start
+            for _, offset, length in seg.entries:
+                if offset < start:
+                    continue
+                if end > start and end - start + length > max_bytes:
+                    break
+                end = offset + length
+            if end == start:
+                continue
+            with open(seg.log_path, "rb") as f:
+                data = os.pread(f.fileno(), end - start, start)
+            payloads = []
+            pos = 0
+            while pos < len(data):
+                length, crc, msg_id = RECORD.unpack_from(data, pos)
+                body = data[pos + RECORD.size:pos + RECORD.size + length]
+                pos += RECORD.size + length
+                if zlib.crc32(body) != crc:
+                    logger.error(f"Outbox {seg.log_path}: bad record, skipped")
+                    continue
+                payloads.append((msg_id, body))
+            return payloads, (seg.number, end)
+        return [], self.cursor
+
+    def commit(self, cursor, ids):
+        """Everything before cursor went out, forget it."""
+        self.ids.difference_update(ids)
+        self._set_cursor(cursor)
+        self._trim_flushed()
+
+    def _set_cursor(self, cursor):
+        self.cursor = cursor
+        tmp = os.path.join(self.root, "cursor.tmp")
+        with open(tmp, "wb") as f:
+            f.write(CURSOR.pack(*cursor))
+        os.replace(tmp, os.path.join(self.root, "cursor"))
+
+    def _trim_flushed(self):
+        # Whole segments behind the cursor are done
+        while self.segments:
+            seg = self.segments[0]
+            done = seg.number < self.cursor[0] or (seg.number == self.cursor[0] and self.cursor[1] >= seg.size)
+            if not done or (len(self.segments) == 1 and seg.size < self.segment_bytes):
+                break
+            self.segments.pop(0)
+            if not self.segments:
+                self._close_handles()
+            seg.remove()
+            if seg.number == self.cursor[0]:
+                self._set_cursor((seg.number + 1, 0))
+
+
+class Outbox:
+    """
+    Store-and-forward for chat envelopes. The app appends for every known
+    destination that isn't linked and calls flush() when the link is back.
+    """
+
+    def __init__(self, root=None, segment_bytes=None, max_bytes=None, batch_bytes=None, dashboard=None):
+        self.root = root or cfg.OUTBOX_DIR
+        self.segment_bytes = segment_bytes or cfg.OUTBOX_SEGMENT_BYTES
+        self.max_bytes = max_bytes or cfg.OUTBOX_MAX_BYTES
+        self.batch_bytes = batch_bytes or cfg.OUTBOX_BATCH_BYTES
+        self.dashboard = dashboard
+        self._boxes = {}
+        self._flushing = set()
+        self.stats = {"queued": 0, "duplicate": 0, "flushed": 0, "batches": 0}
+        # Destinations from earlier runs
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                self._boxes[name] = None
+
+    def _box(self, ip):
+        name = _dir_name(ip)
+        box = self._boxes.get(name)
+        if box is None:
+            box = self._boxes[name] = PeerOutbox(os.path.join(self.root, name), self.segment_bytes, self.max_bytes)
+        return box
+
+    def add_peer(self, ip):
+        """Remember a destination, so messages get queued for it while it's down."""
+        self._box(ip)
+
+    def destinations(self):
+        return list(self._boxes)
+
+    def append(self, ip, msg_id, payload) -> bool:
+        try:
+            if self._box(ip).append(msg_id, payload):
+                self.stats["queued"] += 1
+                return True
+            self.stats["duplicate"] += 1
+        except OSError as e:
+            logger.error(f"Outbox append for {ip} failed: {e}")
+        return False
+
+    def pending(self, ip):
+        return self._box(ip).pending() if _dir_name(ip) in self._boxes else 0
+
+    async def flush(self, ip, send_batch, unacked):
+        """
+        Send the queue for ip. send_batch(payloads) writes them to the link and
+        returns False if it's down, unacked() returns the bytes on it the peer
+        hasn't acknowledged (None once the link is gone). A batch is only
+        forgotten once the peer has acked it. Leaving our send buffer isn't
+        enough, the link can drop while it's in flight or being retransmitted.
+        Anything else stays for the next flush.
+        """
+        if ip in self._flushing or not self.pending(ip):
+            return 0
+        self._flushing.add(ip)
+        box = self._box(ip)
+        sent = 0
+        try:
+            while box.pending():
+                batch, cursor = box.read_batch(self.batch_bytes)
+                if not batch:
+                    break
+                if not send_batch([payload for _, payload in batch]):
+                    break
+                while True:
+                    waiting = unacked()
+                    if not waiting:
+                        break
+                    await asyncio.sleep(ACK_POLL)
+                if waiting is None:
+                    break
+                box.commit(cursor, [msg_id for msg_id, _ in batch])
+                sent += len(batch)
+                self.stats["flushed"] += len(batch)
+                self.stats["batches"] += 1
+        except OSError as e:
+            logger.error(f"Outbox flush for {ip} failed: {e}")
+        finally:
+            self._flushing.discard(ip)
+        if sent:
+            logger.info(f"Outbox: flushed {sent} messages to {ip}")
+            if self.dashboard:
+                self.dashboard.add_debug(f"OUTBOX: {sent} queued messages sent to {ip}")
+        return sent
+
+    def pending_total(self):
+        """Messages queued across all destinations."""
+        return sum(self._box(name).pending() for name in self._boxes)
+
+    def status(self):
+        lines = []
+        for name in self._boxes:
+            box = self._box(name)
+            if box.pending() or box.dropped:
+                lines.append(f"{name}: {box.pending()} queued, {box.disk_bytes() / 1024:.0f} KB, {box.dropped} dropped")
+        return lines
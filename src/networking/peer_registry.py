@@ -0,0 +1,251 @@
+"""
+Peer Registry Module.
+Tracks every node we know about, from first beacon to live QUIC link.
+
+Records are __slots__ objects keyed by IP. The peer's address is parsed once
+when the record is created, and beacons from a known peer with an unchanged
+epoch only refresh last_seen. Peers that go quiet are expired by a hashed
+timer wheel: touching a record never reschedules it, the wheel re-checks
+last_seen when its slot comes round (lazy expiry).
+
+Failed or lost dials back off exponentially with jitter before the next
+attempt, whether that attempt comes from a beacon or the redial timer.
+"""
+import ipaddress
+import logging
+import random
+from config import cfg
+
+logger = logging.getLogger("PeerRegistry")
+
+# Peer states
+DISCOVERED = "discovered"
+CONNECTING = "connecting"
+LINKED = "linked"
+
+
+class PeerRecord:
+    __slots__ = ("ip", "addr_int", "node_id", "epoch", "name", "port", "caps",
+                 "state", "last_seen", "protocol", "link_type", "dial", "scheduled",
+                 "retries", "retry_at")
+
+    def __init__(self, ip, now):
+        self.ip = ip
+        try:
+            self.addr_int = int(ipaddress.ip_address(ip))
+        except ValueError:
+            self.addr_int = None
+        self.node_id = None
+        self.epoch = None
+        self.name = "Unknown"
+        self.port = cfg.DEFAULT_PORT
+        self.caps = 0
+        self.state = DISCOVERED
+        self.last_seen = now
+        self.protocol = None
+        # "client" if we dialled, "server" if they did
+        self.link_type = None
+        # True if the tie-breaking rule says we are the one who dials
+        self.dial = False
+        self.scheduled = False
+        # Dial backoff, reset once a link comes up
+        self.retries = 0
+        self.retry_at = 0.0
+
+
+class TimerWheel:
+    """Hashed timer wheel. Keys land in the slot of their deadline tick."""
+
+    def __init__(self, tick, slots):
+        self.tick = tick
+        self.slots = [set() for _ in range(slots)]
+        self._current = None
+
+    def schedule(self, key, deadline):
+        # Deadlines past the wheel span simply come round early and get rescheduled
+        self.slots[int(deadline // self.tick) % len(self.slots)].add(key)
+
+    def advance(self, now):
+        """Return keys from every slot between the last advance and now."""
+        target = int(now // self.tick)
+        if self._current is None:
+            self._current = target - 1
+        due = []
+        # Never walk more than one lap, that covers every slot
+        start = max(self._current + 1, target - len(self.slots) + 1)
+        for t in range(start, target + 1):
+            slot = self.slots[t % len(self.slots)]
+            if slot:
+                due.extend(slot)
+                slot.clear()
+        self._current = target
+        return due
+
+
+def backoff_delay(retries, base, cap, rng=random):
+    """Exponential backoff with equal jitter: half fixed, half random."""
+    delay = min(cap, base * (2 ** retries))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+class PeerRegistry:
+    def __init__(self, local_ip=None, expiry=None, tick=None, slots=None, rng=None):
+        self.expiry = cfg.PEER_EXPIRY if expiry is None else expiry
+        self._peers = {}
+        self._linked = {}
+        self._local_ip = None
+        self._local_int = None
+        self.wheel = TimerWheel(cfg.PEER_WHEEL_TICK if tick is None else tick,
+                                cfg.PEER_WHEEL_SLOTS if slots is None else slots)
+        self.rng = rng or random.Random()
+        self.stats = {"beacons": 0, "fast_path": 0, "expired": 0, "backoffs": 0}
+        if local_ip:
+            self.set_local_ip(local_ip)
+
+    def set_local_ip(self, ip):
+        self._local_ip = ip
+        try:
+            self._local_int = int(ipaddress.ip_address(ip))
+        except ValueError:
+            self._local_int = None
+        for rec in self._peers.values():
+            rec.dial = self._tie_break(rec)
+
+    def _tie_break(self, rec):
+        # Tie-breaking rule: Only connect if my IP is "smaller"
+        if self._local_int is not None and rec.addr_int is not None:
+            return self._local_int < rec.addr_int
+        return (self._local_ip or "") < rec.ip
+
+    def _new_record(self, ip, now):
+        rec = PeerRecord(ip, now)
+        rec.dial = self._tie_break(rec)
+        self._peers[ip] = rec
+        self._schedule(rec, now + self.expiry)
+        return rec
+
+    def _schedule(self, rec, deadline):
+        rec.scheduled = True
+        self.wheel.schedule(rec.ip, deadline)
+
+    # --- Lookups ----------------------------------------------------------
+
+    def get(self, ip):
+        return self._peers.get(ip)
+
+    def get_linked(self, ip):
+        return self._linked.get(ip)
+
+    def is_linked(self, ip):
+        return ip in self._linked
+
+    def linked(self):
+        """Records of all live links."""
+        return self._linked.values()
+
+    def linked_ips(self):
+        return self._linked.keys()
+
+    @property
+    def linked_count(self):
+        return len(self._linked)
+
+    def __len__(self):
+        return len(self._peers)
+
+    # --- Updates ----------------------------------------------------------
+
+    def on_beacon(self, info, ip, now) -> bool:
+        """
+        Record a beacon. Returns True if we should dial this peer now,
+        i.e. it is only discovered and the tie-break says we dial.
+        """
+        self.stats["beacons"] += 1
+        rec = self._peers.get(ip)
+        if rec is not None and rec.epoch == info.get("epoch") and rec.node_id == info.get("node_id"):
+            # Fast path: known peer, nothing changed
+            self.stats["fast_path"] += 1
+            rec.last_seen = now
+            return self._dial_due(rec, now)
+
+        if rec is None:
+            rec = self._new_record(ip, now)
+        rec.last_seen = now
+        rec.node_id = info.get("node_id")
+        rec.epoch = info.get("epoch")
+        rec.port = info.get("port", cfg.DEFAULT_PORT)
+        rec.caps = info.get("caps", 0)
+        if info.get("hostname") and rec.state != LINKED:
+            rec.name = info["hostname"]
+        return self._dial_due(rec, now)
+
+    @staticmethod
+    def _dial_due(rec, now):
+        return rec.dial and rec.state == DISCOVERED and now >= rec.retry_at
+
+    def dial_due(self, ip, now) -> bool:
+        """True if we own the dial to ip and its backoff has run out."""
+        rec = self._peers.get(ip)
+        return rec is not None and self._dial_due(rec, now)
+
+    def dial_failed(self, ip, now):
+        """Back off after a failed or lost dial. Returns the delay, None if the peer is gone."""
+        rec = self._peers.get(ip)
+        if rec is None:
+            return None
+        delay = backoff_delay(rec.retries, cfg.RECONNECT_BASE, cfg.RECONNECT_MAX, self.rng)
+        rec.retries += 1
+        rec.retry_at = now + delay
+        self.stats["backoffs"] += 1
+        return delay
+
+    def touch(self, ip, now):
+        rec = self._peers.get(ip)
+        if rec is not None:
+            rec.last_seen = now
+
+    def mark_connecting(self, ip, now=0.0):
+        rec = self._peers.get(ip) or self._new_record(ip, now)
+        rec.state = CONNECTING
+        return rec
+
+    def mark_linked(self, ip, protocol, link_type, name=None, now=0.0):
+        rec = self._peers.get(ip) or self._new_record(ip, now)
+        rec.state = LINKED
+        rec.retries = 0
+        rec.retry_at = 0.0
+        rec.protocol = protocol
+        rec.link_type = link_type
+        if name:
+            rec.name = name
+        self._linked[ip] = rec
+        return rec
+
+    def mark_down(self, ip):
+        """Link or dial attempt ended. Returns the record if it was linked."""
+        rec = self._peers.get(ip)
+        if rec is None:
+            return None
+        was_linked = self._linked.pop(ip, None) is not None
+        rec.state = DISCOVERED
+        rec.protocol = None
+        rec.link_type = None
+        return rec if was_linked else None
+
+    def expire(self, now):
+        """Drop peers not heard from within expiry. Returns the expired records."""
+        expired = []
+        for ip in self.wheel.advance(now):
+            rec = self._peers.get(ip)
+            if rec is None:
+                continue
+            deadline = rec.last_seen + self.expiry
+            if rec.state != DISCOVERED or deadline > now:
+                # Live links are watched by QUIC itself, just keep them on the wheel
+                self._schedule(rec, max(deadline, now + self.wheel.tick))
+                continue
+            del self._peers[ip]
+            rec.scheduled = False
+            expired.append(rec)
+        self.stats["expired"] += len(expired)
+        return expired
@@ -0,0 +1,252 @@
+"""
+Radio Module.
+Per-station link quality for the mesh interface.
+
+Every RADIO_SAMPLE_INTERVAL the sampler runs `iw dev <iface> station dump`
+(as an asyncio subprocess, so the loop never waits on it) and reads
+/proc/net/wireless for the interface as a whole. Stations are keyed by MAC;
+/proc/net/arp turns those into the peer IPs the rest of the app uses.
+The tx retry/failed counters are cumulative, so the sampler keeps the last
+reading and reports the rate over the interval.
+
+The parsers are plain functions of the command/file text, so they can be
+checked against captured output (see benchmarks/samples/).
+"""
+import asyncio
+import logging
+import shutil
+import time
+from config import cfg
+
+logger = logging.getLogger("Radio")
+
+PROC_WIRELESS = "/proc/net/wireless"
+PROC_ARP = "/proc/net/arp"
+IW_TIMEOUT = 2.0  # Seconds before a hung iw is killed
+
+
+def _number(text):
+    """Leading number of a value like '-52 [-55, -54] dBm' or '866.7 MBit/s VHT-MCS 9'."""
+    token = text.split()[0] if text.split() else ""
+    try:
+        return int(token)
+    except ValueError:
+        try:
+            return float(token.rstrip("Mbps"))
+        except ValueError:
+            return None
+
+
+def parse_station_dump(text):
+    """`iw dev <iface> station dump` -> {mac: {metric: value}}."""
+    stations = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("Station "):
+            mac = line.split()[1].lower()
+            current = stations[mac] = {}
+            continue
+        if current is None or ":" not in line:
+            continue
+        key, _, value = line.strip().partition(":")
+        value = value.strip()
+        if key == "signal":
+            current["signal_dbm"] = _number(value)
+        elif key == "signal avg":
+            current["signal_avg_dbm"] = _number(value)
+        elif key in ("tx bitrate", "rx bitrate"):
+            prefix = key.split()[0]
+            current[f"{prefix}_bitrate_mbps"] = _number(value)
+            # What's left after "MBit/s" is the MCS/width/GI description
+            mode = value.split("MBit/s", 1)[1].strip() if "MBit/s" in value else ""
+            if mode:
+                current[f"{prefix}_mode"] = mode
+        elif key in ("tx packets", "tx retries", "tx failed", "rx packets", "beacon loss"):
+            current[key.replace(" ", "_")] = _number(value)
+        elif key == "inactive time":
+            current["inactive_ms"] = _number(value)
+        elif key == "expected throughput":
+            current["expected_mbps"] = _number(value)
+        elif key == "mesh plink":
+            current["plink"] = value
+    return stations
+
+
+def parse_proc_wireless(text):
+    """/proc/net/wireless -> {iface: {link, level_dbm, noise_dbm, discard_retry, missed_beacon}}."""
+    interfaces = {}
+    for line in text.splitlines()[2:]:
+        name, _, rest = line.partition(":")
+        fields = rest.split()
+        if len(fields) < 10:
+            continue
+        try:
+            interfaces[name.strip()] = {
+                "link": float(fields[1].rstrip(".")),
+                "level_dbm": float(fields[2].rstrip(".")),
+                "noise_dbm": float(fields[3].rstrip(".")),
+                "discard_retry": int(fields[7]),
+                "missed_beacon": int(fields[9]),
+            }
+        except ValueError:
+            continue
+    return interfaces
+
+
+def parse_arp(text, interface=None):
+    """/proc/net/arp -> {mac: ip} of complete entries, optionally on one interface only."""
+    macs = {}
+    for line in text.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 6:
+            continue
+        ip, _, flags, mac, _, device = fields[:6]
+        # 0x2 is ATF_COM, anything without it has no usable MAC yet
+        if not int(flags, 16) & 0x2 or (interface and device != interface):
+            continue
+        macs[mac.lower()] = ip
+    return macs
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def is_poor(quality):
+    """Weak signal or lots of retries, the peer should be used last."""
+    if not quality:
+        return False
+    signal = quality.get("signal_dbm")
+    if signal is not None and signal < cfg.RADIO_WEAK_DBM:
+        return True
+    return quality.get("retry_rate", 0) > cfg.RADIO_MAX_RETRY_RATE
+
+
+class RadioSampler:
+    """
+    Samples the radio in the background. on_sample(by_ip) is called after
+    every round with {ip: metrics} for the stations that could be matched
+    to an IP.
+    """
+
+    def __init__(self, interface, on_sample=None, dashboard=None, interval=None):
+        self.interface = interface
+        self.on_sample = on_sample
+        self.dashboard = dashboard
+        self.interval = interval or cfg.RADIO_SAMPLE_INTERVAL
+        self.iw = shutil.which("iw")
+        self.stations = {}  # mac -> latest metrics
+        self.by_ip = {}  # ip -> latest metrics
+        self.interface_stats = None  # From /proc/net/wireless
+        self._counters = {}  # mac -> (tx_packets, tx_retries, tx_failed) at the last sample
+        self._task = None
+        self.stats = {"samples": 0, "iw_errors": 0, "last_ms": 0.0}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        if not self.iw:
+            logger.info("iw not found, radio metrics from /proc/net/wireless only")
+            if self.dashboard:
+                self.dashboard.add_debug("RADIO: iw not found, no per-peer metrics")
+        while True:
+            try:
+                await self.sample()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Radio sample failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _station_dump(self):
+        if not self.iw:
+            return ""
+        proc = await asyncio.create_subprocess_exec(
+            self.iw, "dev", self.interface, "station", "dump",
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            out, _ = await asyncio.wait_for(proc.communicate(), IW_TIMEOUT)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            self.stats["iw_errors"] += 1
+            return ""
+        if proc.returncode != 0:
+            self.stats["iw_errors"] += 1
+            return ""
+        return out.decode("utf-8", "replace")
+
+    async def sample(self):
+        """One round: station dump, interface totals, MAC -> IP join."""
+        dump = await self._station_dump()
+        start = time.perf_counter()
+        self.update(parse_station_dump(dump), _read(PROC_WIRELESS), _read(PROC_ARP))
+        self.stats["last_ms"] = (time.perf_counter() - start) * 1000
+        if self.on_sample:
+            self.on_sample(self.by_ip)
+        return self.by_ip
+
+    def update(self, stations, proc_wireless, arp):
+        """Fold one round of raw readings in. Split out of sample() so it runs without a radio."""
+        self.interface_stats = parse_proc_wireless(proc_wireless).get(self.interface)
+        for mac, metrics in stations.items():
+            now = (metrics.get("tx_packets"), metrics.get("tx_retries"), metrics.get("tx_failed"))
+            before = self._counters.get(mac)
+            if before is None and None not in now and now[0]:
+                # First sighting, the lifetime ratio until there's an interval to go on
+                metrics["retry_rate"] = now[1] / now[0]
+                metrics["fail_rate"] = now[2] / now[0]
+            elif before and None not in now and None not in before:
+                packets = now[0] - before[0]
+                if packets > 0:
+                    metrics["retry_rate"] = max(0, now[1] - before[1]) / packets
+                    metrics["fail_rate"] = max(0, now[2] - before[2]) / packets
+                elif "retry_rate" in self.stations.get(mac, {}):
+                    # Idle interval, keep the last rate
+                    metrics["retry_rate"] = self.stations[mac]["retry_rate"]
+                    metrics["fail_rate"] = self.stations[mac]["fail_rate"]
+            self._counters[mac] = now
+        self.stations = stations
+        for mac in list(self._counters):
+            if mac not in stations:
+                del self._counters[mac]
+        macs = parse_arp(arp, self.interface)
+        self.by_ip = {macs[mac]: metrics for mac, metrics in stations.items() if mac in macs}
+        self.stats["samples"] += 1
+
+    def quality(self, ip):
+        return self.by_ip.get(ip)
+
+    @staticmethod
+    def format(q):
+        parts = []
+        if q.get("signal_dbm") is not None:
+            parts.append(f"{q['signal_dbm']}dBm")
+        if q.get("tx_bitrate_mbps") is not None:
+            parts.append(f"{q['tx_bitrate_mbps']:.0f}Mb/s")
+        if q.get("retry_rate") is not None:
+            parts.append(f"retry {q['retry_rate'] * 100:.0f}%")
+        return " ".join(parts)
+
+    def status(self):
+        lines = []
+        if self.interface_stats:
+            s = self.interface_stats
+            lines.append(f"{self.interface}: link {s['link']:.0f} level {s['level_dbm']:.0f}dBm "
+                         f"noise {s['noise_dbm']:.0f}dBm, {s['missed_beacon']} missed beacons")
+        ips = {id(m): ip for ip, m in self.by_ip.items()}
+        for mac, q in self.stations.items():
+            lines.append(f"{ips.get(id(q), mac)}: {self.format(q) or 'no data'}")
+        return lines
@@ -0,0 +1,351 @@
+"""
+File Transfer Module.
+Resumable file transfer between linked peers over the bulk stream.
+
+  OFFER   control  id, size, sha256, name       sender -> receiver
+  ACCEPT  control  id, offset                   receiver -> sender
+  DATA    bulk     id, offset, chunk            sender -> receiver
+  DONE    control  id, status                   receiver -> sender
+
+The sender reads chunks straight out of an mmap of the file and only reads
+ahead while the link's bulk queue is below BULK_HIGH_WATER, so memory use
+stays flat and the pace follows QUIC's flow and congestion control. The
+receiver writes every chunk at its offset into <inbox>/.<id>.part. After a
+link drop the sender offers again once the peer is back, and the receiver
+answers with how much it already has, so the transfer resumes from there.
+The transfer id is derived from our certificate's public key, the
+destination and the file hash. The key persists, so re-sending the same
+file after a restart resumes too, and the same file going to two peers is
+two transfers. Once all bytes are in,
+the receiver checks the sha256 and moves the file into place.
+"""
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from config import cfg
+from src.protocol.certificates import public_key_fingerprint
+from src.protocol.control import CTRL_FILE_OFFER, CTRL_FILE_ACCEPT, CTRL_FILE_DONE
+
+logger = logging.getLogger("Transfer")
+
+OFFER_MSG = struct.Struct(">16sQ32sH")  # id, size, sha256, name length (name follows)
+ACCEPT_MSG = struct.Struct(">16sQ")  # id, offset
+DONE_MSG = struct.Struct(">16sB")  # id, status
+DATA_HEADER = struct.Struct(">16sQ")  # id, offset (chunk follows)
+
+STATUS_OK = 0
+STATUS_BAD_HASH = 1
+STATUS_REFUSED = 2
+STATUS_TEXT = {STATUS_OK: "verified", STATUS_BAD_HASH: "hash mismatch", STATUS_REFUSED: "refused"}
+
+CHUNK_SIZE = 64 * 1024
+BULK_HIGH_WATER = 256 * 1024  # Stop reading the file while this much bulk is queued
+BULK_POLL = 0.01  # Seconds between backlog checks while waiting
+COMPLETED_MEMORY = 64  # Finished transfer ids kept to answer a repeated offer
+
+
+def file_digest(path) -> bytes:
+    """sha256 of a file, hashed through an mmap."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+    return h.digest()
+
+
+def _safe_name(name):
+    name = os.path.basename(name.replace("\\", "/")).lstrip(".")
+    return name or "file"
+
+
+class OutgoingTransfer:
+    def __init__(self, tid, ip, path, size, digest):
+        self.id = tid
+        self.ip = ip
+        self.path = path
+        self.name = os.path.basename(path)
+        self.size = size
+        self.digest = digest
+        self.sent = 0
+        # Offset from the latest ACCEPT, where sending (re)started
+        self.offset = 0
+        self.resumed_from = 0
+        self.state = "offered"
+        self.task = None
+        self.started = None
+
+
+class IncomingTransfer:
+    def __init__(self, tid, ip, name, size, digest, part_path):
+        self.id = tid
+        self.ip = ip
+        self.name = name
+        self.size = size
+        self.digest = digest
+        self.part_path = part_path
+        self.received = 0
+        self.fd = None
+        self.state = "receiving"
+
+
+class FileTransferManager:
+    """
+    send_control(ip, msg_type, payload) and send_bulk(ip, data) go out over the
+    peer's QUIC link, bulk_backlog(ip) returns the bytes still queued on its bulk
+    stream (None if the peer isn't linked). All provided by the app.
+    identity is stable bytes naming this node, by default our public key's
+    fingerprint (read on the first send, the certs may still be generating
+    when we're built).
+    """
+
+    def __init__(self, send_control, send_bulk, bulk_backlog, inbox_dir=None, dashboard=None, identity=None):
+        self.send_control = send_control
+        self.send_bulk = send_bulk
+        self.bulk_backlog = bulk_backlog
+        self.inbox_dir = inbox_dir or cfg.FILE_INBOX
+        self.dashboard = dashboard
+        self.identity = identity
+        self.outgoing = {}
+        self.incoming = {}
+        # id -> status, in case our DONE got lost with the link
+        self.completed = OrderedDict()
+        # Called with (transfer, status) when a transfer finishes, either direction
+        self.on_complete = None
+
+    def _log(self, text):
+        if self.dashboard:
+            self.dashboard.add_log("FILE", text)
+        logger.info(text)
+
+    # --- Sending ----------------------------------------------------------
+
+    def _identity(self):
+        if self.identity is None:
+            try:
+                self.identity = public_key_fingerprint()
+            except (OSError, ValueError) as e:
+                # Still works, a restart just won't resume
+                logger.warning(f"No certificate to derive transfer ids from ({e}), using the run's node id")
+                self.identity = cfg.node_id.to_bytes(8, "big")
+        return self.identity
+
+    async def send_file(self, ip, path):
+        """Offer a file to a peer. Returns the transfer."""
+        size = os.path.getsize(path)
+        loop = asyncio.get_running_loop()
+        # Hashing a large image takes a while on the Pi, keep it off the loop
+        digest = await loop.run_in_executor(None, file_digest, path)
+        # The destination is part of the id, the same file to two peers is two transfers
+        tid = hashlib.sha256(self._identity() + ip.encode() + digest).digest()[:16]
+
+        t = self.outgoing.get(tid)
+        if t is None:
+            t = OutgoingTransfer(tid, ip, path, size, digest)
+            self.outgoing[tid] = t
+        self._offer(t)
+        self._log(f"Offering {t.name} ({size / 1e6:.2f} MB) to {ip}")
+        return t
+
+    def _offer(self, t):
+        name = t.name.encode("utf-8")[:1024]
+        t.state = "offered"
+        self.send_control(t.ip, CTRL_FILE_OFFER, OFFER_MSG.pack(t.id, t.size, t.digest, len(name)) + name)
+
+    def _on_accept(self, ip, payload):
+        tid, offset = ACCEPT_MSG.unpack_from(payload)
+        t = self.outgoing.get(tid)
+        if t is None or t.ip != ip:
+            return
+        if t.task:
+            t.task.cancel()
+        t.sent = t.offset = min(offset, t.size)
+        if t.started is None:
+            t.started = asyncio.get_running_loop().time()
+            t.resumed_from = t.sent
+        elif offset:
+            self._log(f"Resuming {t.name} to {ip} at {offset / 1e6:.2f} MB")
+        t.state = "sending"
+        t.task = asyncio.ensure_future(self._pump(t))
+
+    async def _pump(self, t):
+        if t.sent >= t.size:
+            t.state = "verifying"
+            return
+        try:
+            with open(t.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                while t.sent < t.size:
+                    backlog = self.bulk_backlog(t.ip)
+                    if backlog is None:
+                        # Link is gone, peer_linked() starts us again
+                        t.state = "paused"
+                        return
+                    if backlog > BULK_HIGH_WATER:
+                        await asyncio.sleep(BULK_POLL)
+                        continue
+                    end = min(t.sent + CHUNK_SIZE, t.size)
+                    self.send_bulk(t.ip, DATA_HEADER.pack(t.id, t.sent) + mm[t.sent:end])
+                    t.sent = end
+                    # Let the loop breathe between chunks
+                    await asyncio.sleep(0)
+            t.state = "verifying"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            t.state = "failed"
+            self._log(f"Sending {t.name} failed: {e}")
+
+    def _on_done(self, ip, payload):
+        tid, status = DONE_MSG.unpack_from(payload)
+        t = self.outgoing.get(tid)
+        if t is None or t.ip != ip:
+            return
+        if t.task:
+            t.task.cancel()
+        del self.outgoing[tid]
+        t.state = "done" if status == STATUS_OK else "failed"
+        if status == STATUS_OK and t.started is not None:
+            elapsed = max(asyncio.get_running_loop().time() - t.started, 1e-6)
+            rate = (t.size - t.resumed_from) / elapsed / 1e6
+            self._log(f"{t.name} delivered to {ip}, {STATUS_TEXT[status]} ({rate:.2f} MB/s)")
+        else:
+            self._log(f"{t.name} to {ip}: {STATUS_TEXT.get(status, status)}")
+        if self.on_complete:
+            self.on_complete(t, status)
+
+    # --- Receiving --------------------------------------------------------
+
+    def _part_path(self, tid):
+        return os.path.join(self.inbox_dir, f".{tid.hex()}.part")
+
+    def _on_offer(self, ip, payload):
+        tid, size, digest, name_len = OFFER_MSG.unpack_from(payload)
+        name = bytes(payload[OFFER_MSG.size:OFFER_MSG.size + name_len]).decode("utf-8", "replace")
+        if size > cfg.FILE_MAX_SIZE:
+            self.send_control(ip, CTRL_FILE_DONE, DONE_MSG.pack(tid, STATUS_REFUSED))
+            self._log(f"Refused {name} from {ip}: {size / 1e6:.0f} MB is over the limit")
+            return
+
+        if tid in self.completed:
+            self.send_control(ip, CTRL_FILE_DONE, DONE_MSG.pack(tid, self.completed[tid]))
+            return
+        r = self.incoming.get(tid)
+        if r is not None and r.state == "verifying":
+            # DONE follows once the hash check is through
+            return
+        if r is None:
+            os.makedirs(self.inbox_dir, exist_ok=True)
+            r = IncomingTransfer(tid, ip, _safe_name(name), size, digest, self._part_path(tid))
+            self.incoming[tid] = r
+            self._log(f"Receiving {r.name} ({size / 1e6:.2f} MB) from {ip}")
+        r.ip = ip
+        r.state = "receiving"
+        if r.fd is None:
+            r.fd = os.open(r.part_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        # Chunks arrive in order, so whatever is on disk is one contiguous prefix
+        r.received = min(os.fstat(r.fd).st_size, size)
+        self.send_control(ip, CTRL_FILE_ACCEPT, ACCEPT_MSG.pack(tid, r.received))
+        if r.received == size:
+            self._finish(r)
+
+    def on_bulk(self, ip, data):
+        if len(data) < DATA_HEADER.size:
+            return
+        tid, offset = DATA_HEADER.unpack_from(data)
+        r = self.incoming.get(tid)
+        if r is None or r.fd is None:
+            return
+        chunk = memoryview(data)[DATA_HEADER.size:]
+        if offset != r.received or offset + len(chunk) > r.size:
+            # Leftover from before a resume, the ACCEPT offset wins
+            logger.debug(f"Out of place chunk for {r.name} at {offset}, have {r.received}")
+            return
+        os.pwrite(r.fd, chunk, offset)
+        r.received += len(chunk)
+        if r.received == r.size:
+            self._finish(r)
+
+    def _finish(self, r):
+        os.close(r.fd)
+        r.fd = None
+        r.state = "verifying"
+        asyncio.ensure_future(self._verify(r))
+
+    async def _verify(self, r):
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, file_digest, r.part_path)
+        self.incoming.pop(r.id, None)
+        if digest != r.digest:
+            os.remove(r.part_path)
+            status = STATUS_BAD_HASH
+            self._log(f"{r.name} from {r.ip} failed the hash check, discarded")
+        else:
+            final = self._final_path(r.name)
+            os.replace(r.part_path, final)
+            status = STATUS_OK
+            self._log(f"Received {r.name} from {r.ip} -> {final}")
+        r.state = "done" if status == STATUS_OK else "failed"
+        self.completed[r.id] = status
+        while len(self.completed) > COMPLETED_MEMORY:
+            self.completed.popitem(last=False)
+        self.send_control(r.ip, CTRL_FILE_DONE, DONE_MSG.pack(r.id, status))
+        if self.on_complete:
+            self.on_complete(r, status)
+
+    def _final_path(self, name):
+        base, ext = os.path.splitext(name)
+        path = os.path.join(self.inbox_dir, name)
+        n = 1
+        while os.path.exists(path):
+            path = os.path.join(self.inbox_dir, f"{base}.{n}{ext}")
+            n += 1
+        return path
+
+    # --- Link events ------------------------------------------------------
+
+    def on_control(self, ip, msg_type, payload) -> bool:
+        """Handle a file control message. Returns True if it was one."""
+        try:
+            if msg_type == CTRL_FILE_OFFER:
+                self._on_offer(ip, payload)
+            elif msg_type == CTRL_FILE_ACCEPT:
+                self._on_accept(ip, payload)
+            elif msg_type == CTRL_FILE_DONE:
+                self._on_done(ip, payload)
+            else:
+                return False
+        except (struct.error, OSError) as e:
+            logger.error(f"File control from {ip} failed: {e}")
+        return True
+
+    def peer_linked(self, ip):
+        for t in self.outgoing.values():
+            if t.ip == ip and t.state in ("paused", "sending", "offered", "verifying"):
+                self._offer(t)
+
+    def peer_lost(self, ip):
+        for t in self.outgoing.values():
+            if t.ip == ip and t.state in ("sending", "offered"):
+                if t.task:
+                    t.task.cancel()
+                t.state = "paused"
+        for r in self.incoming.values():
+            if r.ip == ip and r.fd is not None:
+                os.close(r.fd)
+                r.fd = None
+                r.state = "paused"
+
+    def status(self):
+        """One line per transfer in progress."""
+        lines = []
+        for t in self.outgoing.values():
+            pct = 100 * t.sent / t.size if t.size else 100
+            lines.append(f"-> {t.ip} {t.name} {pct:.0f}% {t.state}")
+        for r in self.incoming.values():
+            pct = 100 * r.received / r.size if r.size else 100
+            lines.append(f"<- {r.ip} {r.name} {pct:.0f}% {r.state}")
+        return lines
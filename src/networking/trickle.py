@@ -0,0 +1,85 @@
+"""
+Trickle Timer Module.
+Adaptive beacon scheduling after RFC 6206.
+
+The interval starts at Imin and doubles up to Imax while everything we hear
+is consistent. Within each interval we pick a random point in [I/2, I) and
+beacon there, unless k consistent beacons were already heard in the
+interval. Anything new (unknown node, changed epoch, lost link) resets the
+interval to Imin.
+
+Two additions for neighbour discovery: the first few intervals after a reset
+(fresh_intervals) are never suppressed, so every node answers a newcomer
+quickly even if one of its beacons is lost, and a node never stays silent
+for longer than max_silent so peers can still track liveness.
+
+The timer is sans-IO: callers pass the current time in and read t_fire /
+t_end back, which lets the simulator drive it on a virtual clock.
+"""
+import random
+
+
+class TrickleTimer:
+    def __init__(self, imin, imax, k, max_silent=None, fresh_intervals=3, rng=None):
+        self.imin = imin
+        self.imax = imax
+        self.k = k
+        self.max_silent = max_silent
+        self.fresh_intervals = fresh_intervals
+        self.rng = rng or random.Random()
+
+        self.interval = imin
+        self.counter = 0
+        self.interval_start = 0.0
+        self.t_fire = 0.0
+        self.t_end = 0.0
+        self.last_tx = None
+        # Unsuppressed intervals left since the last (re)start
+        self.fresh = fresh_intervals
+        self.stats = {"tx": 0, "suppressed": 0, "resets": 0}
+
+    def start(self, now):
+        self.interval = self.imin
+        self.fresh = self.fresh_intervals
+        self._begin(now)
+
+    def _begin(self, now):
+        self.counter = 0
+        self.interval_start = now
+        self.t_fire = now + self.rng.uniform(self.interval / 2, self.interval)
+        self.t_end = now + self.interval
+
+    def heard(self, consistent, now) -> bool:
+        """Record a received beacon. Returns True if it reset the interval."""
+        if consistent:
+            self.counter += 1
+            return False
+        return self.reset(now)
+
+    def reset(self, now) -> bool:
+        self.fresh = self.fresh_intervals
+        if self.interval == self.imin and now < self.t_fire:
+            # Already about to beacon at the fastest rate
+            return False
+        self.stats["resets"] += 1
+        self.interval = self.imin
+        self._begin(now)
+        return True
+
+    def should_transmit(self, now) -> bool:
+        if self.fresh or self.counter < self.k:
+            return True
+        if self.max_silent is not None and (self.last_tx is None or now - self.last_tx >= self.max_silent):
+            return True
+        self.stats["suppressed"] += 1
+        return False
+
+    def transmitted(self, now):
+        self.last_tx = now
+        self.stats["tx"] += 1
+
+    def interval_expired(self, now):
+        self.interval = min(self.interval * 2, self.imax)
+        if self.fresh:
+            self.fresh -= 1
+        self._begin(now)
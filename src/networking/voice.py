@@ -0,0 +1,154 @@
+"""
+Voice Module.
+Audio streams between linked peers over QUIC datagrams (src/protocol/audio.py).
+
+Sending paces frames off the loop clock, so a late wakeup never shifts the
+stream. Every sender gets its own JitterBuffer, Speaker and playout task on
+the receiving side, which pulls one frame per frame period into that
+speaker and stops once the sender has been quiet for AUDIO_IDLE_TIMEOUT.
+"""
+import asyncio
+import logging
+import time
+from config import cfg
+from src.protocol.audio import AudioSender, JitterBuffer, parse_frame, tone_frames, wav_frames
+
+logger = logging.getLogger("Voice")
+
+
+class AudioStream:
+    """Receive side of one peer's stream."""
+
+    def __init__(self, ip, speaker=None):
+        self.ip = ip
+        self.speaker = speaker
+        self.buffer = JitterBuffer()
+        self.last_rx = time.monotonic()
+        self.task = None
+
+
+class VoiceManager:
+    """
+    send_datagram(ip, data) sends a QUIC datagram over the peer's link and
+    returns False if it can't. one_way_delay(ip) gives the base one-way delay
+    in seconds (half the min RTT) for the latency figures, or None.
+    new_speaker() makes the Speaker for one incoming stream, so streams from
+    different peers never share a device.
+    """
+
+    def __init__(self, send_datagram, one_way_delay=None, new_speaker=None, dashboard=None):
+        self.send_datagram = send_datagram
+        self.one_way_delay = one_way_delay or (lambda ip: None)
+        self.new_speaker = new_speaker
+        self.dashboard = dashboard
+        self.frame_time = cfg.AUDIO_FRAME_MS / 1000
+        self.outgoing = {}  # ip -> (task, AudioSender)
+        self.incoming = {}  # ip -> AudioStream
+        # Summary of the last finished stream per peer
+        self.last = {}
+        # Called with (ip, summary dict) when an incoming stream ends
+        self.on_stream_end = None
+
+    def _log(self, text):
+        if self.dashboard:
+            self.dashboard.add_log("AUDIO", text)
+        logger.info(text)
+
+    # --- Sending ----------------------------------------------------------
+
+    def start(self, ip, path=None, seconds=None):
+        """Stream a WAV file, or a test tone when path is None, to a peer."""
+        self.stop(ip)
+        frames = wav_frames(path) if path else tone_frames()
+        sender = AudioSender(lambda data: self.send_datagram(ip, data))
+        task = asyncio.ensure_future(self._pump(ip, sender, frames, seconds))
+        self.outgoing[ip] = (task, sender)
+        return sender
+
+    async def _pump(self, ip, sender, frames, seconds):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + seconds if seconds else None
+        due = start
+        try:
+            for pcm in frames:
+                now = loop.time()
+                if deadline and now >= deadline:
+                    break
+                sender.send(pcm)
+                due += self.frame_time
+                await asyncio.sleep(max(0.0, due - loop.time()))
+        except ValueError as e:
+            self._log(f"Can't stream to {ip}: {e}")
+        finally:
+            if self.outgoing.get(ip, (None,))[0] is asyncio.current_task():
+                del self.outgoing[ip]
+        self._log(f"Stream to {ip} done, {sender.sent} frames ({sender.refused} refused)")
+
+    def stop(self, ip=None):
+        for peer in [ip] if ip else list(self.outgoing):
+            entry = self.outgoing.pop(peer, None)
+            if entry:
+                entry[0].cancel()
+
+    # --- Receiving --------------------------------------------------------
+
+    def on_datagram(self, ip, data):
+        frame = parse_frame(data)
+        if frame is None:
+            return
+        stream = self.incoming.get(ip)
+        if stream is None:
+            stream = self.incoming[ip] = AudioStream(ip, self.new_speaker() if self.new_speaker else None)
+            stream.task = asyncio.ensure_future(self._playout(stream))
+            self._log(f"Incoming audio from {ip}")
+        seq, timestamp, sent_ns, pcm = frame
+        stream.last_rx = time.monotonic()
+        stream.buffer.push(seq, timestamp, pcm, sent_ns)
+
+    async def _playout(self, stream):
+        loop = asyncio.get_running_loop()
+        due = loop.time()
+        buf = stream.buffer
+        try:
+            while time.monotonic() - stream.last_rx < cfg.AUDIO_IDLE_TIMEOUT:
+                base = self.one_way_delay(stream.ip)
+                if base is not None:
+                    buf.base_delay = base
+                pcm = buf.pop()
+                if pcm is not None and stream.speaker:
+                    stream.speaker.write(pcm)
+                due += self.frame_time
+                await asyncio.sleep(max(0.0, due - loop.time()))
+        finally:
+            if self.incoming.get(stream.ip) is stream:
+                del self.incoming[stream.ip]
+            if stream.speaker:
+                stream.speaker.close()
+            buf.finish()
+            summary = buf.summary()
+            self.last[stream.ip] = summary
+            self._log(f"Audio from {stream.ip} ended: {self.format(summary)}")
+            if self.on_stream_end:
+                self.on_stream_end(stream.ip, summary)
+
+    def peer_lost(self, ip):
+        self.stop(ip)
+        stream = self.incoming.get(ip)
+        if stream and stream.task:
+            stream.task.cancel()
+
+    @staticmethod
+    def format(s):
+        text = (f"{s['played']} played, loss {s['loss'] * 100:.1f}%, {s['late']} late, "
+                f"{s['concealed']} concealed, jitter {s['jitter_ms']:.1f}ms, buffer {s['target_ms']:.0f}ms")
+        if "latency_p50_ms" in s:
+            text += f", latency p50 {s['latency_p50_ms']:.0f}ms p95 {s['latency_p95_ms']:.0f}ms"
+        return text
+
+    def status(self):
+        """One line per stream, live ones first."""
+        lines = [f"-> {ip} {sender.sent} frames sent" for ip, (_, sender) in self.outgoing.items()]
+        lines += [f"<- {ip} {self.format(s.buffer.summary())}" for ip, s in self.incoming.items()]
+        lines += [f"<- {ip} (ended) {self.format(s)}" for ip, s in self.last.items() if ip not in self.incoming]
+        return lines
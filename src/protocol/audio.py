@@ -0,0 +1,313 @@
+"""
+Audio Module.
+Real-time audio frames carried as unreliable QUIC DATAGRAM frames.
+
+Every datagram is <header><payload>:
+  kind       1 byte   DGRAM_AUDIO
+  codec      1 byte   CODEC_PCM (16 bit) or CODEC_ULAW (G.711 mu-law, 8 bit)
+  seq        2 bytes  frame counter, wraps
+  timestamp  4 bytes  media clock in samples, wraps
+  sent       8 bytes  sender's monotonic clock (ns)
+
+A lost datagram is never retransmitted, the receiver's JitterBuffer plays
+something else in its place instead. The buffer holds frames until their
+playout slot, sized from an RFC 3550 interarrival jitter estimate, and
+conceals holes by repeating the last frame at falling volume. When it runs
+deeper than needed it drops a frame to bring the delay back down.
+
+End-to-end latency uses the sender's clock only as an offset: the smallest
+(arrival - sent) seen is taken as the base one-way delay, which the caller
+supplies from the link RTT. On loopback both clocks are the same and the
+figure is exact.
+"""
+import math
+import os
+import struct
+import time
+import wave
+from array import array
+from collections import deque
+from config import cfg
+from src.protocol.control import DGRAM_AUDIO
+
+AUDIO_HEADER = struct.Struct(">BBHIQ")  # kind, codec, seq, timestamp, sent (ns)
+
+CODEC_PCM = 0
+CODEC_ULAW = 1
+CODECS = {"pcm": CODEC_PCM, "ulaw": CODEC_ULAW}
+
+CONCEAL_FRAMES = 3  # Repeat the last frame this often before going silent
+SKIP_SLACK = 1  # Frames above target before one is dropped
+LATENCY_SAMPLES = 512
+
+
+def _ulaw_encode_sample(sample):
+    # G.711 mu-law, bias 0x84, clip at 32635
+    sign = 0x80 if sample < 0 else 0
+    if sample < 0:
+        sample = -sample
+    sample = min(sample, 32635) + 0x84
+    exponent = 7
+    mask = 0x4000
+    while exponent > 0 and not sample & mask:
+        exponent -= 1
+        mask >>= 1
+    mantissa = (sample >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+def _ulaw_decode_byte(byte):
+    byte = ~byte & 0xFF
+    exponent = (byte >> 4) & 0x07
+    sample = ((((byte & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    return -sample if byte & 0x80 else sample
+
+
+# Lookup tables, indexed by the unsigned 16 bit sample and by the code byte.
+# Built on first use, the encoder table takes ~50 ms and most runs never need it.
+_ULAW_ENC = None
+_ULAW_DEC = None
+
+
+def _ulaw_tables():
+    global _ULAW_ENC, _ULAW_DEC
+    if _ULAW_ENC is None:
+        _ULAW_DEC = [_ulaw_decode_byte(b) for b in range(256)]
+        _ULAW_ENC = bytes(_ulaw_encode_sample(s - 65536 if s >= 32768 else s) for s in range(65536))
+    return _ULAW_ENC, _ULAW_DEC
+
+
+def encode(codec, pcm) -> bytes:
+    """Encode native 16 bit mono PCM."""
+    if codec == CODEC_ULAW:
+        return bytes(map(_ulaw_tables()[0].__getitem__, array("H", pcm)))
+    return bytes(pcm)
+
+
+def decode(codec, payload) -> bytes:
+    """Decode a payload back to native 16 bit mono PCM."""
+    if codec == CODEC_ULAW:
+        return array("h", map(_ulaw_tables()[1].__getitem__, payload)).tobytes()
+    return bytes(payload)
+
+
+def pack_frame(codec, seq, timestamp, pcm, sent_ns=None) -> bytes:
+    if sent_ns is None:
+        sent_ns = time.monotonic_ns()
+    return AUDIO_HEADER.pack(DGRAM_AUDIO, codec, seq, timestamp, sent_ns) + encode(codec, pcm)
+
+
+def parse_frame(data):
+    """(seq, timestamp, sent_ns, pcm) from an audio datagram, None if malformed."""
+    if len(data) < AUDIO_HEADER.size:
+        return None
+    kind, codec, seq, timestamp, sent_ns = AUDIO_HEADER.unpack_from(data)
+    if kind != DGRAM_AUDIO or codec not in (CODEC_PCM, CODEC_ULAW):
+        return None
+    payload = memoryview(data)[AUDIO_HEADER.size:]
+    if codec == CODEC_PCM and len(payload) % 2:
+        return None
+    return seq, timestamp, sent_ns, decode(codec, payload)
+
+
+def frame_samples(rate=None, frame_ms=None):
+    rate = rate or cfg.AUDIO_RATE
+    frame_ms = frame_ms or cfg.AUDIO_FRAME_MS
+    return rate * frame_ms // 1000
+
+
+def tone_frames(freq=440.0, rate=None, frame_ms=None, amplitude=0.3):
+    """Endless synthetic sine, one PCM frame at a time."""
+    rate = rate or cfg.AUDIO_RATE
+    n = frame_samples(rate, frame_ms)
+    step = 2 * math.pi * freq / rate
+    peak = int(32767 * amplitude)
+    i = 0
+    while True:
+        yield array("h", (int(peak * math.sin(step * (i + k))) for k in range(n))).tobytes()
+        i += n
+
+
+def wav_frames(path, rate=None, frame_ms=None):
+    """PCM frames from a mono 16 bit WAV file at the audio rate (no resampling)."""
+    rate = rate or cfg.AUDIO_RATE
+    n = frame_samples(rate, frame_ms)
+    with wave.open(path, "rb") as w:
+        if w.getnchannels() != 1 or w.getsampwidth() != 2 or w.getframerate() != rate:
+            raise ValueError(f"need mono 16 bit {rate} Hz WAV")
+        while True:
+            data = w.readframes(n)
+            if not data:
+                return
+            if len(data) < 2 * n:
+                data += bytes(2 * n - len(data))
+            yield data
+
+
+class AudioSender:
+    """Numbers and timestamps frames and hands them to send_datagram(data)."""
+
+    def __init__(self, send_datagram, codec=None, rate=None, frame_ms=None):
+        self.send_datagram = send_datagram
+        self.codec = CODECS[codec or cfg.AUDIO_CODEC]
+        self.samples = frame_samples(rate, frame_ms)
+        # Random starting points, as in RTP
+        self.seq = int.from_bytes(os.urandom(2), "big")
+        self.timestamp = 0
+        self.sent = 0
+        self.refused = 0
+
+    def send(self, pcm):
+        if self.send_datagram(pack_frame(self.codec, self.seq, self.timestamp, pcm)) is False:
+            self.refused += 1
+        else:
+            self.sent += 1
+        self.seq = (self.seq + 1) & 0xFFFF
+        self.timestamp = (self.timestamp + self.samples) & 0xFFFFFFFF
+
+
+class JitterBuffer:
+    def __init__(self, rate=None, frame_ms=None, min_delay=None, max_delay=None):
+        self.rate = rate or cfg.AUDIO_RATE
+        self.frame_time = (frame_ms or cfg.AUDIO_FRAME_MS) / 1000
+        self.samples = frame_samples(self.rate, frame_ms)
+        min_delay = cfg.AUDIO_JITTER_MIN_MS / 1000 if min_delay is None else min_delay
+        max_delay = cfg.AUDIO_JITTER_MAX_MS / 1000 if max_delay is None else max_delay
+        self.min_frames = max(1, round(min_delay / self.frame_time))
+        self.max_frames = max(self.min_frames, round(max_delay / self.frame_time))
+        self.target = self.min_frames
+        # Base one-way delay (seconds) added to latency samples, set from the link RTT
+        self.base_delay = 0.0
+
+        self.frames = {}  # extended seq -> (pcm, sent_ns)
+        self.next_seq = None
+        self.highest = None
+        self.playing = False
+        self.jitter = 0.0  # Seconds, RFC 3550 estimator
+        self._last_transit = None
+        self._min_offset = None
+        self._last_pcm = None
+        self._concealed_run = 0
+        self._underrun_run = 0
+        self._silence = bytes(2 * self.samples)
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.stats = {
+            "received": 0, "played": 0, "lost": 0, "late": 0, "duplicate": 0,
+            "concealed": 0, "underrun": 0, "skipped": 0,
+        }
+
+    def _extend(self, seq):
+        if self.highest is None:
+            return seq
+        delta = (seq - self.highest) & 0xFFFF
+        if delta >= 0x8000:
+            delta -= 0x10000
+        return self.highest + delta
+
+    def push(self, seq, timestamp, pcm, sent_ns, now_ns=None):
+        """Store a received frame. now_ns is the arrival time (monotonic ns)."""
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        self.stats["received"] += 1
+
+        # Interarrival jitter, media clock vs arrival clock
+        transit = now_ns / 1e9 - timestamp / self.rate
+        if self._last_transit is not None:
+            d = abs(transit - self._last_transit)
+            # Timestamp wrap shows up as a huge jump, skip it
+            if d < 1.0:
+                self.jitter += (d - self.jitter) / 16
+        self._last_transit = transit
+        offset = now_ns - sent_ns
+        if self._min_offset is None or offset < self._min_offset:
+            self._min_offset = offset
+
+        ext = self._extend(seq)
+        if self.next_seq is not None and ext < self.next_seq:
+            self.stats["late"] += 1
+            return
+        if ext in self.frames:
+            self.stats["duplicate"] += 1
+            return
+        self.frames[ext] = (pcm, sent_ns)
+        if self.highest is None or ext > self.highest:
+            self.highest = ext
+        if self.next_seq is None:
+            self.next_seq = ext
+        # Cover ~4x the jitter, plus the frame in flight
+        want = math.ceil(4 * self.jitter / self.frame_time) + 1
+        self.target = max(self.min_frames, min(self.max_frames, want))
+
+    def depth(self):
+        """Frames from the playout point to the newest one, holes included."""
+        if self.next_seq is None:
+            return 0
+        return max(0, self.highest - self.next_seq + 1)
+
+    def pop(self, now_ns=None):
+        """PCM for the next playout slot, None while still prebuffering."""
+        if self.next_seq is None:
+            return None
+        depth = self.depth()
+        if not self.playing:
+            if depth < self.target:
+                return None
+            self.playing = True
+
+        if depth > self.target + SKIP_SLACK:
+            # Running behind, drop the oldest frame to cut the delay
+            self.frames.pop(self.next_seq, None)
+            self.next_seq += 1
+            self.stats["skipped"] += 1
+            depth -= 1
+
+        frame = self.frames.pop(self.next_seq, None)
+        if frame is not None:
+            self.next_seq += 1
+            pcm, sent_ns = frame
+            if now_ns is None:
+                now_ns = time.monotonic_ns()
+            self.latencies.append((now_ns - sent_ns - self._min_offset) / 1e9 + self.base_delay)
+            self._last_pcm = pcm
+            self._concealed_run = 0
+            self._underrun_run = 0
+            self.stats["played"] += 1
+            return pcm
+
+        if depth > 0:
+            # Newer frames are here, this one is lost (or too late to matter)
+            self.next_seq += 1
+            self.stats["lost"] += 1
+        else:
+            self.stats["underrun"] += 1
+            self._underrun_run += 1
+            if self._concealed_run >= self.max_frames:
+                # Sender paused, rebuffer before playing again
+                self.playing = False
+        return self._conceal()
+
+    def _conceal(self):
+        self.stats["concealed"] += 1
+        self._concealed_run += 1
+        if self._last_pcm is None or self._concealed_run > CONCEAL_FRAMES:
+            return self._silence
+        gain = 0.5 ** self._concealed_run
+        return array("h", (int(s * gain) for s in array("h", self._last_pcm))).tobytes()
+
+    def finish(self):
+        """Stream over: the underruns since the last frame were just the sender stopping."""
+        self.stats["underrun"] -= self._underrun_run
+        self.stats["concealed"] -= self._underrun_run
+        self._underrun_run = 0
+
+    def summary(self) -> dict:
+        out = dict(self.stats)
+        out["jitter_ms"] = self.jitter * 1000
+        out["target_ms"] = self.target * self.frame_time * 1000
+        passed = out["played"] + out["lost"]
+        out["loss"] = out["lost"] / passed if passed else 0.0
+        lat = sorted(self.latencies)
+        if lat:
+            out["latency_p50_ms"] = lat[len(lat) // 2] * 1000
+            out["latency_p95_ms"] = lat[min(len(lat) - 1, int(0.95 * len(lat)))] * 1000
+        return out
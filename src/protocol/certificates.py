@@ -1,37 +1,104 @@
 """
 Certificate Generation Module.
 Generates self-signed TLS 1.3 certificates for QUIC.
+
+The key algorithm comes from cfg.CERT_KEY_TYPE: 'p256' (ECDSA, default),
+'ed25519' or 'rsa' (2048 bit). EC keys generate in well under a millisecond
+and sign much faster than RSA, which is what the server does on every full
+handshake. Peers don't verify each other's certificates, so nodes with
+different key types still link.
 """
 import datetime
+import hashlib
 import os
 import logging
 from cryptography import x509
 from cryptography.x509.oid import NameOID
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
 from cryptography.hazmat.primitives import serialization
 from config import cfg
 
 logger = logging.getLogger("CertMgr")
 
+KEY_TYPES = ("p256", "ed25519", "rsa")
+
+
+def generate_private_key(key_type=None):
+    key_type = key_type or cfg.CERT_KEY_TYPE
+    if key_type == "p256":
+        return ec.generate_private_key(ec.SECP256R1())
+    if key_type == "ed25519":
+        return ed25519.Ed25519PrivateKey.generate()
+    if key_type == "rsa":
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    raise ValueError(f"Unknown key type {key_type!r}, expected one of {KEY_TYPES}")
+
+
+def key_type_of(key):
+    if isinstance(key, ec.EllipticCurvePrivateKey) and isinstance(key.curve, ec.SECP256R1):
+        return "p256"
+    if isinstance(key, ed25519.Ed25519PrivateKey):
+        return "ed25519"
+    if isinstance(key, rsa.RSAPrivateKey):
+        return "rsa"
+    return None
+
+
+def signing_hash(key):
+    """Hash for certificate signing. Ed25519 signs the message itself."""
+    return None if isinstance(key, ed25519.Ed25519PrivateKey) else hashes.SHA256()
+
+
+def private_key_bytes(key):
+    # PKCS8, the traditional OpenSSL format has no Ed25519 encoding
+    return key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+def public_key_fingerprint(cert_path=None) -> bytes:
+    """sha256 of our certificate's public key. Survives restarts, unlike cfg.node_id."""
+    with open(cert_path or cfg.CERT_PATH, "rb") as f:
+        cert = x509.load_pem_x509_certificate(f.read())
+    spki = cert.public_key().public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+    return hashlib.sha256(spki).digest()
+
+
 class CertificateManager:
     @staticmethod
-    def ensure_certs():
+    def _current_key_type(key_path):
+        try:
+            with open(key_path, "rb") as f:
+                return key_type_of(serialization.load_pem_private_key(f.read(), password=None))
+        except Exception as e:
+            logger.warning(f"Could not read existing key: {e}")
+            return None
+
+    @staticmethod
+    def ensure_certs(key_type=None, cert_path=None, key_path=None):
         """
-        Check if certs exist, otherwise generate them.
+        Check if certs exist (with the configured key type), otherwise generate them.
         """
-        if os.path.exists(cfg.CERT_PATH) and os.path.exists(cfg.KEY_PATH):
-            logger.info("Certificates found.")
-            return
+        key_type = key_type or cfg.CERT_KEY_TYPE
+        cert_path = cert_path or cfg.CERT_PATH
+        key_path = key_path or cfg.KEY_PATH
+        if os.path.exists(cert_path) and os.path.exists(key_path):
+            current = CertificateManager._current_key_type(key_path)
+            if current == key_type:
+                logger.info("Certificates found.")
+                return
+            # Never replace a node's identity quietly
+            logger.warning(f"Existing key {key_path} is {current or 'unreadable'}, CERT_KEY_TYPE is {key_type}. "
+                           f"Overwriting it and {cert_path}.")
 
-        logger.info("Generating new self-signed certificates...")
-        os.makedirs(os.path.dirname(cfg.CERT_PATH), exist_ok=True)
+        logger.info(f"Generating new self-signed certificates ({key_type})...")
+        os.makedirs(os.path.dirname(cert_path), exist_ok=True)
 
         # Generate Private Key
-        key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048,
-        )
+        key = generate_private_key(key_type)
 
         # Generate Certificate
         subject = x509.Name([
@@ -59,18 +126,14 @@ class CertificateManager:
         ).add_extension(
             x509.SubjectAlternativeName([x509.DNSName(cfg.get_hostname())]),
             critical=False,
-        ).sign(key, hashes.SHA256())
+        ).sign(key, signing_hash(key))
 
         # Save Private Key
-        with open(cfg.KEY_PATH, "wb") as f:
-            f.write(key.private_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PrivateFormat.TraditionalOpenSSL,
-                encryption_algorithm=serialization.NoEncryption(),
-            ))
+        with open(key_path, "wb") as f:
+            f.write(private_key_bytes(key))
 
         # Save Certificate
-        with open(cfg.CERT_PATH, "wb") as f:
+        with open(cert_path, "wb") as f:
             f.write(cert.public_bytes(serialization.Encoding.PEM))
             
-        logger.info(f"Certificates generated at {cfg.CERT_DIR}")
+        logger.info(f"Certificates generated at {os.path.dirname(cert_path)}")
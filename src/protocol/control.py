@@ -0,0 +1,43 @@
+"""
+Control Message Module.
+Typed messages carried as frames on the control stream (stream 0).
+Each frame is <1 byte type><payload>.
+QUIC DATAGRAM frames (unreliable, no stream) start with a kind byte too.
+"""
+from src.protocol.framing import encode_frame
+
+CONTROL_STREAM_ID = 0
+CHAT_STREAM_ID = 4
+BULK_STREAM_ID = 8
+
+# QUIC DATAGRAM support, advertised by both ends
+MAX_DATAGRAM_FRAME_SIZE = 65536
+# Datagram kinds (see src/protocol/audio.py)
+DGRAM_AUDIO = 0x01
+
+# Keepalive (see src/protocol/keepalive.py)
+CTRL_PING = 0x01
+CTRL_PONG = 0x02
+
+# Multicast group channel (see src/networking/multicast.py)
+CTRL_GROUP_KEY = 0x10
+CTRL_GROUP_NACK = 0x11
+CTRL_GROUP_SYNC = 0x12
+CTRL_GROUP_KEY_ACK = 0x13
+
+# File transfer (see src/networking/transfer.py)
+CTRL_FILE_OFFER = 0x20
+CTRL_FILE_ACCEPT = 0x21
+CTRL_FILE_DONE = 0x22
+
+
+def encode_control(msg_type: int, payload: bytes = b"") -> bytes:
+    """Build a framed control message ready for send_stream_data."""
+    return encode_frame(bytes((msg_type,)) + payload)
+
+
+def split_control(frame):
+    """Split a received control frame into (msg_type, payload view)."""
+    if not frame:
+        return None, frame
+    return frame[0], frame[1:]
@@ -0,0 +1,166 @@
+"""
+Stream Framing Module.
+Length-prefixed message framing shared by the QUIC server and client.
+
+QUIC is a byte stream: writes get coalesced or split in transit, so a single
+StreamDataReceived chunk can hold half a message or three of them. Every
+message is sent as <varint length><payload>, using the QUIC variable-length
+integer encoding (RFC 9000, section 16).
+"""
+import logging
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("Framing")
+
+MAX_FRAME_SIZE = 1 << 20  # 1 MiB, anything bigger is a broken peer
+VARINT_MAX = (1 << 62) - 1
+
+
+class FramingError(Exception):
+    """Raised when a stream carries data that can't be a valid frame."""
+
+
+def encode_varint(value: int) -> bytes:
+    """Encode an integer as a QUIC variable-length integer."""
+    if value < 0x40:
+        return bytes((value,))
+    if value < 0x4000:
+        return (value | 0x4000).to_bytes(2, "big")
+    if value < 0x40000000:
+        return (value | 0x80000000).to_bytes(4, "big")
+    if value <= VARINT_MAX:
+        return (value | 0xC000000000000000).to_bytes(8, "big")
+    raise ValueError(f"Varint too large: {value}")
+
+
+def decode_varint(buf, offset: int = 0):
+    """
+    Decode a varint from buf at offset.
+    Returns (value, new_offset), or (None, offset) if buf is too short.
+    """
+    if offset >= len(buf):
+        return None, offset
+    first = buf[offset]
+    length = 1 << (first >> 6)
+    end = offset + length
+    if end > len(buf):
+        return None, offset
+    value = first & 0x3F
+    for i in range(offset + 1, end):
+        value = (value << 8) | buf[i]
+    return value, end
+
+
+def encode_frame(payload) -> bytes:
+    """Prefix a payload with its varint length."""
+    return encode_varint(len(payload)) + bytes(payload)
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for a single stream.
+
+    Frames are handed to on_frame as memoryview slices. They are only valid
+    for the duration of the callback, copy them (bytes(frame)) to keep them.
+    Chunks that contain only whole frames are parsed in place without ever
+    touching the internal buffer; only a trailing partial frame is kept.
+    """
+
+    def __init__(self, on_frame: Callable, max_frame_size: int = MAX_FRAME_SIZE):
+        self.on_frame = on_frame
+        self.max_frame_size = max_frame_size
+        self._buf = bytearray()
+
+    @property
+    def pending(self) -> int:
+        """Bytes buffered waiting for the rest of a frame."""
+        return len(self._buf)
+
+    def feed(self, data) -> int:
+        """Feed received bytes. Returns the number of complete frames delivered."""
+        if not data:
+            return 0
+
+        if not self._buf:
+            # Fast path: parse straight out of the received chunk
+            view = memoryview(data)
+            consumed, count = self._parse(view)
+            if consumed < len(view):
+                self._buf += view[consumed:]
+            return count
+
+        self._buf += data
+        view = memoryview(self._buf)
+        try:
+            consumed, count = self._parse(view)
+        finally:
+            view.release()
+        if consumed:
+            try:
+                del self._buf[:consumed]
+            except BufferError:
+                # A callback held on to a frame view, so we can't resize in place
+                self._buf = bytearray(self._buf[consumed:])
+        return count
+
+    def _parse(self, view):
+        offset = 0
+        count = 0
+        total = len(view)
+        while offset < total:
+            length, start = decode_varint(view, offset)
+            if length is None:
+                break
+            if length > self.max_frame_size:
+                self._buf = bytearray()
+                raise FramingError(f"Frame of {length} bytes exceeds limit {self.max_frame_size}")
+            end = start + length
+            if end > total:
+                break
+            self.on_frame(view[start:end])
+            offset = end
+            count += 1
+        return offset, count
+
+    def reset(self):
+        self._buf = bytearray()
+
+
+class StreamFramer:
+    """
+    Keeps one FrameDecoder per QUIC stream.
+    on_frame is called as on_frame(stream_id, frame).
+    """
+
+    def __init__(self, on_frame: Callable, max_frame_size: int = MAX_FRAME_SIZE):
+        self.on_frame = on_frame
+        self.max_frame_size = max_frame_size
+        self._decoders: Dict[int, FrameDecoder] = {}
+
+    def feed(self, stream_id: int, data, end_stream: bool = False) -> int:
+        decoder = self._decoders.get(stream_id)
+        if decoder is None:
+            decoder = FrameDecoder(
+                lambda frame, sid=stream_id: self.on_frame(sid, frame),
+                self.max_frame_size,
+            )
+            self._decoders[stream_id] = decoder
+        try:
+            count = decoder.feed(data)
+        except FramingError:
+            self._decoders.pop(stream_id, None)
+            raise
+        if end_stream:
+            if decoder.pending:
+                logger.warning(f"Stream {stream_id} closed with {decoder.pending} bytes of partial frame")
+            self._decoders.pop(stream_id, None)
+        return count
+
+    def decoder(self, stream_id: int) -> Optional[FrameDecoder]:
+        return self._decoders.get(stream_id)
+
+    def reset(self, stream_id: Optional[int] = None):
+        if stream_id is None:
+            self._decoders.clear()
+        else:
+            self._decoders.pop(stream_id, None)
@@ -0,0 +1,121 @@
+"""
+Keepalive Module.
+PING/PONG exchange on the control stream with per-link RTT estimation.
+
+A PING carries <nonce: 4 bytes><send time: 8 bytes, sender's monotonic ns>
+and the peer echoes it back unchanged as a PONG, so only the sender's clock
+is ever used. Samples feed an EWMA estimator (RFC 6298 smoothing) and an
+RFC 3550 style jitter estimate. The ping interval stretches while the link
+is stable and snaps back to the minimum after a loss or an RTT spike.
+"""
+import logging
+import os
+import struct
+import time
+from config import cfg
+
+logger = logging.getLogger("Keepalive")
+
+PING_MSG = struct.Struct(">IQ")  # nonce, send time (ns)
+STABLE_SAMPLES = 3
+MAX_OUTSTANDING = 16
+
+
+class LinkMonitor:
+    def __init__(self, quic=None, on_sample=None):
+        # aioquic QuicConnection, used to read its own RTT estimate
+        self.quic = quic
+        self.on_sample = on_sample
+        self.interval = cfg.KEEPALIVE_INTERVAL
+        self.srtt = None
+        self.rttvar = 0.0
+        self.jitter = 0.0
+        self.min_rtt = None
+        self.last_rtt = None
+        self.samples = 0
+        self.lost = 0
+        self._stable = 0
+        self._nonce = int.from_bytes(os.urandom(4), "big")
+        self._outstanding = {}
+
+    def _timeout(self):
+        if self.srtt is None:
+            return max(1.0, self.interval)
+        return max(1.0, self.srtt + 4 * self.rttvar)
+
+    def make_ping(self, now_ns=None) -> bytes:
+        """Payload for the next PING. Pings older than the timeout count as lost."""
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        limit = now_ns - int(self._timeout() * 1e9)
+        expired = [n for n, sent in self._outstanding.items() if sent < limit]
+        for nonce in expired:
+            del self._outstanding[nonce]
+        if expired:
+            self.lost += len(expired)
+            self._unstable()
+        while len(self._outstanding) >= MAX_OUTSTANDING:
+            self._outstanding.pop(next(iter(self._outstanding)))
+
+        self._nonce = (self._nonce + 1) & 0xFFFFFFFF
+        self._outstanding[self._nonce] = now_ns
+        return PING_MSG.pack(self._nonce, now_ns)
+
+    def on_pong(self, payload, now_ns=None):
+        """Feed a PONG payload. Returns the RTT sample in seconds, or None if unknown."""
+        try:
+            nonce, sent_ns = PING_MSG.unpack(payload)
+        except struct.error:
+            return None
+        if self._outstanding.pop(nonce, None) != sent_ns:
+            return None
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        rtt = max(0, now_ns - sent_ns) / 1e9
+        self._add_sample(rtt)
+        if self.on_sample:
+            try:
+                self.on_sample(self)
+            except Exception as e:
+                logger.error(f"RTT callback error: {e}")
+        return rtt
+
+    def _add_sample(self, rtt):
+        spike = False
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            spike = abs(rtt - self.srtt) > max(4 * self.rttvar, 0.005)
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+            self.jitter += (abs(rtt - self.last_rtt) - self.jitter) / 16
+        self.last_rtt = rtt
+        self.samples += 1
+        self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+
+        if spike:
+            self._unstable()
+            return
+        self._stable += 1
+        if self._stable >= STABLE_SAMPLES:
+            self._stable = 0
+            self.interval = min(self.interval * 1.5, cfg.KEEPALIVE_MAX)
+
+    def _unstable(self):
+        self._stable = 0
+        self.interval = cfg.KEEPALIVE_MIN
+
+    def quic_rtt(self):
+        """aioquic's own (smoothed, min) RTT estimate in seconds, if available."""
+        loss = getattr(self.quic, "_loss", None)
+        if loss is None or not getattr(loss, "_rtt_initialized", False):
+            return None, None
+        return loss._rtt_smoothed, loss._rtt_min
+
+    def stats(self) -> dict:
+        quic_srtt, quic_min = self.quic_rtt()
+        return {
+            "srtt": self.srtt, "rttvar": self.rttvar, "jitter": self.jitter,
+            "min_rtt": self.min_rtt, "last_rtt": self.last_rtt,
+            "samples": self.samples, "lost": self.lost, "interval": self.interval,
+            "quic_srtt": quic_srtt, "quic_min_rtt": quic_min,
+        }
@@ -1,14 +1,27 @@
 """
 QUIC Client Module.
 Handles outgoing connections to peers.
+Reconnects resume with a stored session ticket when one is available, and
+the stream opens plus the first PING then ride in 0-RTT.
 """
 import asyncio
 import logging
 import ssl
 from aioquic.asyncio import connect
 from aioquic.quic.configuration import QuicConfiguration
-from aioquic.quic.events import StreamDataReceived, HandshakeCompleted, ConnectionTerminated
+from aioquic.quic.events import (
+    StreamDataReceived, DatagramFrameReceived, HandshakeCompleted, ConnectionTerminated
+)
 from aioquic.asyncio.protocol import QuicConnectionProtocol
+from src.protocol.framing import StreamFramer, FramingError, encode_frame
+from src.protocol.control import (
+    CONTROL_STREAM_ID, BULK_STREAM_ID, CTRL_PING, CTRL_PONG, MAX_DATAGRAM_FRAME_SIZE,
+    encode_control, split_control
+)
+from src.protocol.keepalive import LinkMonitor
+from src.protocol.session import HandshakeStats
+from src.protocol.streams import StreamScheduler, STREAM_IDS, CONTROL, INTERACTIVE, BULK
+from src.ui.metrics import FRAMES, BYTES, CONNECTIONS, HANDSHAKES, STREAM_NAMES, call_timed
 
 logger = logging.getLogger("QuicClient")
 
@@ -18,27 +31,74 @@ class HampterClientProtocol(QuicConnectionProtocol):
         self._on_message_callback = None
         self._on_connect_callback = None
         self._on_disconnect_callback = None
+        self._on_control_callback = None
+        self._on_bulk_callback = None
+        self._on_datagram_callback = None
+        self._framer = StreamFramer(self._on_frame)
+        self.streams = StreamScheduler(self._quic)
+        self.monitor = LinkMonitor(self._quic)
+        self.handshake = None
+        self.peer_ip = None  # Set by QuicClient.connect_to, labels the metrics
+
+    def transmit(self):
+        # Every send goes through the scheduler first
+        self.streams.fill()
+        super().transmit()
+
+    def _send(self, kind, data, count=1):
+        self.streams.enqueue(kind, data)
+        stream = STREAM_NAMES[STREAM_IDS[kind]]
+        FRAMES.inc(self.peer_ip, stream, "tx", by=count)
+        BYTES.inc(self.peer_ip, stream, "tx", by=len(data))
+        self.transmit()
 
     def quic_event_received(self, event):
         if isinstance(event, HandshakeCompleted):
-            logger.info("QUIC Handshake Completed!")
+            logger.info(f"QUIC Handshake Completed! resumed={event.session_resumed} 0rtt={event.early_data_accepted}")
+            self.handshake = event
             if self._on_connect_callback:
                 self._on_connect_callback()
         elif isinstance(event, StreamDataReceived):
+            if event.stream_id in STREAM_NAMES:
+                BYTES.inc(self.peer_ip, STREAM_NAMES[event.stream_id], "rx", by=len(event.data))
             try:
-                data = event.data.decode('utf-8')
-                if self._on_message_callback:
-                    self._on_message_callback(data, None)
-            except Exception as e:
-                logger.error(f"Decode error: {e}")
+                self._framer.feed(event.stream_id, event.data, event.end_stream)
+            except FramingError as e:
+                logger.error(f"Framing error: {e}")
+        elif isinstance(event, DatagramFrameReceived):
+            FRAMES.inc(self.peer_ip, "datagram", "rx")
+            BYTES.inc(self.peer_ip, "datagram", "rx", by=len(event.data))
+            if self._on_datagram_callback:
+                call_timed("datagram", self._on_datagram_callback, event.data)
         elif isinstance(event, ConnectionTerminated):
             logger.warning("QUIC Connection Terminated")
+            CONNECTIONS.inc("client", "down")
             if self._on_disconnect_callback:
                 self._on_disconnect_callback()
 
+    def _on_frame(self, stream_id, frame):
+        FRAMES.inc(self.peer_ip, STREAM_NAMES.get(stream_id, "other"), "rx")
+        if stream_id == CONTROL_STREAM_ID:
+            msg_type, payload = split_control(frame)
+            if msg_type == CTRL_PING:
+                self._send(CONTROL, encode_control(CTRL_PONG, bytes(payload)))
+            elif msg_type == CTRL_PONG:
+                self.monitor.on_pong(payload)
+            elif msg_type is not None and self._on_control_callback:
+                call_timed("control", self._on_control_callback, msg_type, payload)
+            return
+        if not frame:
+            return
+        if stream_id == BULK_STREAM_ID:
+            if self._on_bulk_callback:
+                call_timed("bulk", self._on_bulk_callback, bytes(frame))
+            return
+        if self._on_message_callback:
+            call_timed("message", self._on_message_callback, bytes(frame), None)
+
 class QuicClient:
-    def __init__(self, cert_path, dashboard=None):
-        self.config = QuicConfiguration(is_client=True)
+    def __init__(self, cert_path, dashboard=None, tickets=None, handshake_stats=None):
+        self.config = QuicConfiguration(is_client=True, max_datagram_frame_size=MAX_DATAGRAM_FRAME_SIZE)
         # Force aioquic to ignore self-signed cert issues
         self.config.verify_mode = ssl.CERT_NONE
         
@@ -46,58 +106,72 @@ class QuicClient:
         self.connected = False
         self.connecting = False
         self.target_ip = None
-        self.chat_stream_id = 4
-        self.heartbeat_stream_id = 0
         self.dashboard = dashboard
+        # Called with the LinkMonitor after every RTT sample
+        self.on_rtt_sample = None
+        # Shared ClientTicketStore and HandshakeStats (src/protocol/session.py)
+        self.tickets = tickets
+        self.handshake_stats = handshake_stats
+        self.handshake_time = None
+        self.resumed = False
     
-    async def connect_to(self, ip, port, message_callback, connect_callback):
+    async def connect_to(self, ip, port, message_callback, connect_callback, control_callback=None, bulk_callback=None,
+                         datagram_callback=None):
         if self.dashboard:
             self.dashboard.add_debug(f"CLI: Connecting to {ip}:{port}")
         
         self.connecting = True
         self.target_ip = ip
+        loop = asyncio.get_running_loop()
+        session_ticket_handler = None
+        if self.tickets is not None:
+            self.config.session_ticket = self.tickets.take(ip, port)
+            session_ticket_handler = self.tickets.handler(ip, port)
+        started = loop.time()
         try:
-            # We use a short timeout for the connection attempt
+            # Don't wait for the handshake, with a ticket the first writes go out as 0-RTT
             async with connect(
                 ip, port, 
                 configuration=self.config,
                 create_protocol=HampterClientProtocol,
-                wait_connected=True # Wait for handshake
+                session_ticket_handler=session_ticket_handler,
+                wait_connected=False
             ) as protocol:
                 self.protocol = protocol
+                protocol.peer_ip = ip
                 protocol._on_message_callback = message_callback
+                protocol._on_control_callback = control_callback
+                protocol._on_bulk_callback = bulk_callback
+                protocol._on_datagram_callback = datagram_callback
+                protocol.monitor.on_sample = self.on_rtt_sample
                 
-                def on_handshake_done():
-                    if not self.connected:
-                        self.connected = True
-                        if self.dashboard:
-                            self.dashboard.add_debug("CLI: Handshake OK!")
-                        connect_callback()
-                    
-                protocol._on_connect_callback = on_handshake_done
-                
-                # wait_connected=True returns AFTER handshake. If event happened during wait, 
-                # we might have missed the trigger. We manually sync state here.
-                if not self.connected:
-                    on_handshake_done()
-                
-                # Proactively "Touch" the chat stream to open it for the server
+                # Proactively open all three streams for the server.
+                # An empty frame is enough on chat and bulk, control gets a first PING.
+                # All idempotent, so they are safe to send as replayable early data.
                 try:
-                    protocol._quic.send_stream_data(self.chat_stream_id, b"", end_stream=False)
-                    protocol.transmit()
+                    protocol.streams.enqueue(INTERACTIVE, encode_frame(b""))
+                    protocol.streams.enqueue(BULK, encode_frame(b""))
+                    self._send_ping(protocol)
                 except Exception as e:
                     logger.warning(f"Initial stream touch failed: {e}")
+
+                await protocol.wait_connected()
+                self._handshake_done(protocol, loop.time() - started)
+                connect_callback()
                 
-                # Keep connection alive
-                while True:
-                    await asyncio.sleep(2)
-                    if self.connected:
-                        try:
-                            protocol._quic.send_stream_data(self.heartbeat_stream_id, b'PING', end_stream=False)
-                            protocol.transmit()
-                        except Exception as e:
-                            logger.error(f"Heartbeat fail: {e}")
-                            break
+                # Keep connection alive, the monitor adapts the interval to the link
+                closed = asyncio.ensure_future(protocol.wait_closed())
+                try:
+                    while not closed.done():
+                        await asyncio.wait([closed], timeout=protocol.monitor.interval)
+                        if self.connected and not closed.done():
+                            try:
+                                self._send_ping(protocol)
+                            except Exception as e:
+                                logger.error(f"Heartbeat fail: {e}")
+                                break
+                finally:
+                    closed.cancel()
                             
         except asyncio.TimeoutError:
             if self.dashboard: self.dashboard.add_debug("CLI Error: Timeout")
@@ -109,7 +183,73 @@ class QuicClient:
             self.connected = False
             self.connecting = False
 
-    def send_message(self, message: str):
+    def _handshake_done(self, protocol, elapsed):
+        event = protocol.handshake
+        self.connected = True
+        self.handshake_time = elapsed
+        self.resumed = bool(event and event.session_resumed)
+        early = bool(event and event.early_data_accepted)
+        if self.handshake_stats is not None:
+            self.handshake_stats.record(self.handshake_stats.kind_of(self.resumed, early), elapsed)
+        HANDSHAKES.observe(elapsed, "client", HandshakeStats.kind_of(self.resumed, early))
+        CONNECTIONS.inc("client", "up")
+        if self.dashboard:
+            kind = "0-RTT" if early else ("resumed" if self.resumed else "full")
+            self.dashboard.add_debug(f"CLI: Handshake OK! ({kind}, {elapsed * 1000:.0f}ms)")
+
+    def close(self):
+        """Close the connection, connect_to returns once it is down."""
+        if self.protocol:
+            self.protocol.close()
+
+    def _send_ping(self, protocol):
+        protocol._send(CONTROL, encode_control(CTRL_PING, protocol.monitor.make_ping()))
+
+    def link_stats(self):
+        """RTT statistics for this link, or None before the handshake."""
+        return self.protocol.monitor.stats() if self.protocol else None
+
+    def send_message(self, message):
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        if self.connected and self.protocol:
+            self.protocol._send(INTERACTIVE, encode_frame(message))
+
+    def send_batch(self, messages):
+        """Send many chat messages as one write. False while down."""
+        if not (self.connected and self.protocol):
+            return False
+        self.protocol._send(INTERACTIVE, b"".join(encode_frame(m) for m in messages), len(messages))
+        return True
+
+    def chat_unacked(self):
+        """Chat stream bytes the peer hasn't acknowledged yet, None when down."""
+        if self.connected and self.protocol:
+            return self.protocol.streams.unacked(INTERACTIVE)
+        return None
+
+    def send_bulk(self, data):
+        """Queue a large payload on the bulk stream, behind chat and control."""
+        if self.connected and self.protocol:
+            self.protocol._send(BULK, encode_frame(data))
+
+    def send_datagram(self, data) -> bool:
+        """Send an unreliable QUIC datagram (audio). False if down or the peer can't take it."""
+        if not (self.connected and self.protocol):
+            return False
+        if not self.protocol.streams.send_datagram(data):
+            return False
+        FRAMES.inc(self.target_ip, "datagram", "tx")
+        BYTES.inc(self.target_ip, "datagram", "tx", by=len(data))
+        self.protocol.transmit()
+        return True
+
+    def bulk_backlog(self):
+        """Bytes queued on the bulk stream that aioquic hasn't taken yet, None when down."""
+        if self.connected and self.protocol:
+            return self.protocol.streams.pending(BULK)
+        return None
+
+    def send_control(self, msg_type: int, payload: bytes = b""):
         if self.connected and self.protocol:
-            self.protocol._quic.send_stream_data(self.chat_stream_id, message.encode('utf-8'), end_stream=False)
-            self.protocol.transmit()
+            self.protocol._send(CONTROL, encode_control(msg_type, payload))
@@ -4,10 +4,21 @@ Handles incoming QUIC connections and streams.
 """
 import asyncio
 import logging
-from typing import Dict, Callable, Optional
+from typing import Callable, Optional
 from aioquic.asyncio import QuicConnectionProtocol
 from aioquic.quic.configuration import QuicConfiguration
-from aioquic.quic.events import StreamDataReceived, HandshakeCompleted, ConnectionTerminated
+from aioquic.quic.events import (
+    StreamDataReceived, DatagramFrameReceived, HandshakeCompleted, ConnectionTerminated
+)
+from src.protocol.framing import StreamFramer, FramingError, encode_frame
+from src.protocol.control import (
+    CONTROL_STREAM_ID, CHAT_STREAM_ID, BULK_STREAM_ID, CTRL_PING, CTRL_PONG, MAX_DATAGRAM_FRAME_SIZE,
+    encode_control, split_control
+)
+from src.protocol.keepalive import LinkMonitor
+from src.protocol.streams import StreamScheduler, STREAM_IDS, CONTROL, INTERACTIVE, BULK
+from src.protocol.session import HandshakeStats
+from src.ui.metrics import FRAMES, BYTES, CONNECTIONS, HANDSHAKES, STREAM_NAMES, call_timed
 
 logger = logging.getLogger("QuicServer")
 
@@ -15,57 +26,181 @@ class HampterProtocol(QuicConnectionProtocol):
     _on_message_callback: Optional[Callable] = None
     _on_connect_callback: Optional[Callable] = None
     _on_disconnect_callback: Optional[Callable] = None
+    _on_control_callback: Optional[Callable] = None
+    _on_bulk_callback: Optional[Callable] = None
+    _on_datagram_callback: Optional[Callable] = None
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._framer = StreamFramer(self._on_frame)
+        # Client-initiated streams only exist here once the client has written to them,
+        # so the scheduler holds anything for them back until then.
+        self._open_streams = set()
+        self.streams = StreamScheduler(self._quic, can_write=self._open_streams.__contains__)
+        self.monitor = LinkMonitor(self._quic)
+        self._keepalive_task = None
+        self._started = self._loop.time()
+        self.peer_ip = None
+
+    def _peer(self):
+        # Metrics label, looked up once the address is known
+        if self.peer_ip is None:
+            ip = self._peer_addr()[0]
+            if ip == "Unknown":
+                return ip
+            self.peer_ip = ip
+        return self.peer_ip
+
+    def _peer_addr(self):
+        # Try multiple ways to get peer info
+        peer = self._transport.get_extra_info('peername')
+        if not peer:
+            peer = self._transport.get_extra_info('addr')
+        if not peer:
+            # The server transport is shared, the connection knows the real path
+            paths = getattr(self._quic, '_network_paths', None)
+            if paths:
+                peer = paths[0].addr
+        if not peer:
+            # Fallback to internal address tracking if available
+            peer = getattr(self._transport, '_address', None)
+        return peer or ("Unknown", 0)
 
     def quic_event_received(self, event):
         if isinstance(event, HandshakeCompleted):
             logger.info("SRV: Handshake Completed")
+            HANDSHAKES.observe(self._loop.time() - self._started, "server",
+                               HandshakeStats.kind_of(event.session_resumed, event.early_data_accepted))
+            CONNECTIONS.inc("server", "up")
+            self._keepalive_task = asyncio.ensure_future(self._keepalive())
             if HampterProtocol._on_connect_callback:
-                # Try multiple ways to get peer info
-                peer = self._transport.get_extra_info('peername')
-                if not peer:
-                    peer = self._transport.get_extra_info('addr')
-                if not peer:
-                    # Fallback to internal address tracking if available
-                    peer = getattr(self._transport, '_address', None)
-                
                 # Pass both peer info AND this protocol instance
-                HampterProtocol._on_connect_callback(peer or ("Unknown", 0), self)
+                HampterProtocol._on_connect_callback(self._peer_addr(), self)
                 
         elif isinstance(event, StreamDataReceived):
-            try:
-                data = event.data.decode('utf-8')
-                stream_id = event.stream_id
-                
-                if stream_id == 0:
-                    # Heartbeat
-                    pass
-                elif stream_id == 4:
-                    if HampterProtocol._on_message_callback:
-                        HampterProtocol._on_message_callback(data, self._transport.get_extra_info('peername'))
-            except Exception as e:
-                logger.error(f"SRV Decode error: {e}")
+            stream_id = event.stream_id
+            if stream_id not in self._open_streams:
+                self._open_streams.add(stream_id)
+                # Release anything queued for it
+                self.transmit()
+            if stream_id in (CONTROL_STREAM_ID, CHAT_STREAM_ID, BULK_STREAM_ID):
+                BYTES.inc(self._peer(), STREAM_NAMES[stream_id], "rx", by=len(event.data))
+                try:
+                    self._framer.feed(stream_id, event.data, event.end_stream)
+                except FramingError as e:
+                    logger.error(f"SRV Framing error: {e}")
+
+        elif isinstance(event, DatagramFrameReceived):
+            FRAMES.inc(self._peer(), "datagram", "rx")
+            BYTES.inc(self._peer(), "datagram", "rx", by=len(event.data))
+            if HampterProtocol._on_datagram_callback:
+                call_timed("datagram", HampterProtocol._on_datagram_callback, event.data, self._peer_addr(), self)
                 
         elif isinstance(event, ConnectionTerminated):
             logger.info("SRV: Connection Terminated")
+            CONNECTIONS.inc("server", "down")
+            if self._keepalive_task:
+                self._keepalive_task.cancel()
             if HampterProtocol._on_disconnect_callback:
-                # Use same logic to get IP as on_connect
-                peer = self._transport.get_extra_info('peername')
-                if not peer: peer = self._transport.get_extra_info('addr')
-                if not peer: peer = getattr(self._transport, '_address', None)
-                HampterProtocol._on_disconnect_callback(peer or ("Unknown", 0))
-
-    def send_message(self, message: str):
-        """Allow server protocol to send data back to client."""
+                HampterProtocol._on_disconnect_callback(self._peer_addr(), self)
+
+    def _on_frame(self, stream_id, frame):
+        FRAMES.inc(self._peer(), STREAM_NAMES[stream_id], "rx")
+        if stream_id == CONTROL_STREAM_ID:
+            msg_type, payload = split_control(frame)
+            if msg_type == CTRL_PING:
+                self.send_control(CTRL_PONG, bytes(payload))
+            elif msg_type == CTRL_PONG:
+                self.monitor.on_pong(payload)
+            elif msg_type is not None and HampterProtocol._on_control_callback:
+                call_timed("control", HampterProtocol._on_control_callback, self._peer_addr(), self, msg_type, payload)
+            return
+        if not frame:
+            # Empty frame is the client opening the stream
+            return
+        if stream_id == BULK_STREAM_ID:
+            if HampterProtocol._on_bulk_callback:
+                call_timed("bulk", HampterProtocol._on_bulk_callback, bytes(frame), self._peer_addr(), self)
+            return
+        if HampterProtocol._on_message_callback:
+            call_timed("message", HampterProtocol._on_message_callback, bytes(frame), self._peer_addr())
+
+    def transmit(self):
+        # Every send goes through the scheduler first
+        self.streams.fill()
+        super().transmit()
+
+    def _send(self, kind, data, count=1):
+        self.streams.enqueue(kind, data)
+        stream = STREAM_NAMES[STREAM_IDS[kind]]
+        FRAMES.inc(self._peer(), stream, "tx", by=count)
+        BYTES.inc(self._peer(), stream, "tx", by=len(data))
+        self.transmit()
+
+    def send_message(self, message):
+        """Allow server protocol to send data back to client. Accepts str or bytes."""
+        if isinstance(message, str):
+            message = message.encode('utf-8')
         try:
-            self._quic.send_stream_data(4, message.encode('utf-8'), end_stream=False)
-            self.transmit()
+            self._send(INTERACTIVE, encode_frame(message))
         except Exception as e:
             logger.error(f"SRV Send Error: {e}")
 
+    def send_batch(self, messages):
+        """Send many chat messages as one write."""
+        try:
+            self._send(INTERACTIVE, b"".join(encode_frame(m) for m in messages), len(messages))
+            return True
+        except Exception as e:
+            logger.error(f"SRV Batch Send Error: {e}")
+            return False
+
+    def chat_unacked(self):
+        """Chat stream bytes the peer hasn't acknowledged yet."""
+        return self.streams.unacked(INTERACTIVE)
+
+    def send_bulk(self, data):
+        """Queue a large payload on the bulk stream, behind chat and control."""
+        try:
+            self._send(BULK, encode_frame(data))
+        except Exception as e:
+            logger.error(f"SRV Bulk Send Error: {e}")
+
+    def send_datagram(self, data) -> bool:
+        """Send an unreliable QUIC datagram (audio). False if the peer can't take it."""
+        try:
+            ok = self.streams.send_datagram(data)
+        except Exception as e:
+            logger.error(f"SRV Datagram Send Error: {e}")
+            return False
+        if ok:
+            FRAMES.inc(self._peer(), "datagram", "tx")
+            BYTES.inc(self._peer(), "datagram", "tx", by=len(data))
+            self.transmit()
+        return ok
+
+    def bulk_backlog(self):
+        """Bytes queued on the bulk stream that aioquic hasn't taken yet."""
+        return self.streams.pending(BULK)
+
+    async def _keepalive(self):
+        # Measure RTT from this side too, the client pings independently
+        while True:
+            await asyncio.sleep(self.monitor.interval)
+            self.send_control(CTRL_PING, self.monitor.make_ping())
+
+    def link_stats(self):
+        """RTT statistics for this link."""
+        return self.monitor.stats()
+
+    def send_control(self, msg_type: int, payload: bytes = b""):
+        """Send a typed message on the control stream."""
+        try:
+            self._send(CONTROL, encode_control(msg_type, payload))
+        except Exception as e:
+            logger.error(f"SRV Control Send Error: {e}")
+
 def build_quic_config(cert_path, key_path):
-    configuration = QuicConfiguration(is_client=False)
+    configuration = QuicConfiguration(is_client=False, max_datagram_frame_size=MAX_DATAGRAM_FRAME_SIZE)
     configuration.load_cert_chain(cert_path, key_path)
     return configuration
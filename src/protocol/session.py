@@ -0,0 +1,127 @@
+"""
+Session Resumption Module.
+TLS session ticket stores for both ends of a link, and handshake timing.
+
+The client keeps the latest ticket per peer (ip, port) and hands it to the
+next connection, so a reconnect resumes instead of doing a full handshake.
+Tickets from our server allow early data, so the client's first control
+messages can go out as 0-RTT. The server store is single use: a ticket is
+removed when it is fetched, which stops a replayed ClientHello from resuming
+(and replaying its 0-RTT data) a second time.
+"""
+import bisect
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger("Session")
+
+# Handshake time histogram bucket upper bounds, seconds
+HANDSHAKE_BUCKETS = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+
+def _ticket_valid(ticket):
+    try:
+        return ticket.is_valid
+    except Exception:
+        return False
+
+
+class ClientTicketStore:
+    """Latest session ticket per peer, used once."""
+
+    def __init__(self):
+        self._tickets = {}
+
+    def handler(self, ip, port):
+        """session_ticket_handler for a connection to ip:port."""
+        def store(ticket):
+            self._tickets[(ip, port)] = ticket
+        return store
+
+    def take(self, ip, port):
+        ticket = self._tickets.pop((ip, port), None)
+        if ticket is not None and not _ticket_valid(ticket):
+            return None
+        return ticket
+
+    def __len__(self):
+        return len(self._tickets)
+
+
+class ServerTicketStore:
+    """Tickets we issued, keyed by ticket id. Bounded, oldest dropped first."""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._tickets = OrderedDict()
+
+    def add(self, ticket):
+        self._tickets[ticket.ticket] = ticket
+        while len(self._tickets) > self.max_size:
+            self._tickets.popitem(last=False)
+
+    def pop(self, label):
+        ticket = self._tickets.pop(label, None)
+        if ticket is not None and not _ticket_valid(ticket):
+            return None
+        return ticket
+
+    def __len__(self):
+        return len(self._tickets)
+
+
+class HandshakeStats:
+    """Handshake duration histograms, split by full / resumed / 0-RTT."""
+    KINDS = ("full", "resumed", "0rtt")
+
+    def __init__(self, buckets=HANDSHAKE_BUCKETS):
+        self.buckets = buckets
+        # One extra bucket for everything above the last bound
+        self.counts = {kind: [0] * (len(buckets) + 1) for kind in self.KINDS}
+        self.totals = {kind: 0.0 for kind in self.KINDS}
+
+    @staticmethod
+    def kind_of(resumed, early_data_accepted):
+        if early_data_accepted:
+            return "0rtt"
+        return "resumed" if resumed else "full"
+
+    def record(self, kind, seconds):
+        self.counts[kind][bisect.bisect_left(self.buckets, seconds)] += 1
+        self.totals[kind] += seconds
+
+    def count(self, kind):
+        return sum(self.counts[kind])
+
+    def mean(self, kind):
+        n = self.count(kind)
+        return self.totals[kind] / n if n else None
+
+    def percentile(self, kind, q):
+        """Upper bound of the bucket holding the q-th quantile (inf if past the last bound)."""
+        n = self.count(kind)
+        if not n:
+            return None
+        target = q * n
+        seen = 0
+        for i, c in enumerate(self.counts[kind]):
+            seen += c
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def format(self):
+        """Text lines, one per kind that has samples."""
+        lines = []
+        for kind in self.KINDS:
+            n = self.count(kind)
+            if not n:
+                continue
+            bars = " ".join(
+                f"<{b * 1000:g}ms:{c}" for b, c in zip(self.buckets, self.counts[kind]) if c
+            )
+            over = self.counts[kind][-1]
+            if over:
+                bars += f" >{self.buckets[-1] * 1000:g}ms:{over}"
+            lines.append(f"{kind}: n={n} mean={self.mean(kind) * 1000:.1f}ms  {bars}")
+        return lines
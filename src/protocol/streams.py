@@ -0,0 +1,175 @@
+"""
+Stream Scheduler Module.
+Typed streams per connection and a weighted scheduler in front of aioquic.
+
+Every link carries three client-initiated bidirectional streams:
+  control      stream 0  PING/PONG, group keys, anything small and urgent
+  interactive  stream 4  chat
+  bulk         stream 8  large payloads (file transfer and the like)
+
+Writes don't go to send_stream_data directly. They are queued here, and on
+every transmit() the scheduler hands aioquic only about one congestion
+window of unsent data, shared between the classes by deficit round robin
+(weights 8:4:1). A big bulk payload therefore sits in our queue rather than
+in aioquic's stream buffer, and chat written behind it goes into the very
+next fill instead of waiting for megabytes to drain. Bulk also leaves some
+connection flow-control credit unused so it can never block the other two.
+
+QUIC datagrams (real-time audio) skip the stream queues, aioquic writes them
+ahead of stream data. Only a few are allowed to wait for the congestion
+window; older ones are dropped, since late audio is useless anyway.
+"""
+from collections import deque
+
+from src.protocol.control import CONTROL_STREAM_ID, CHAT_STREAM_ID, BULK_STREAM_ID
+
+CONTROL = "control"
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+STREAM_IDS = {CONTROL: CONTROL_STREAM_ID, INTERACTIVE: CHAT_STREAM_ID, BULK: BULK_STREAM_ID}
+WEIGHTS = {CONTROL: 8, INTERACTIVE: 4, BULK: 1}
+
+QUANTUM = 1200  # Bytes of deficit per round and unit of weight, about one packet
+MIN_WINDOW = 16 * 1200  # Fill at least this much even before the cwnd is known
+FLOW_RESERVE = 64 * 1024  # Connection credit bulk leaves for control and chat
+DATAGRAM_BACKLOG = 4  # Datagrams allowed to wait in aioquic, older ones are dropped
+
+
+class StreamClass:
+    __slots__ = ("kind", "stream_id", "weight", "queue", "queued", "written", "deficit", "max_queued")
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.stream_id = STREAM_IDS[kind]
+        self.weight = WEIGHTS[kind]
+        self.queue = deque()
+        self.queued = 0
+        self.written = 0
+        self.deficit = 0
+        self.max_queued = 0
+
+
+class StreamScheduler:
+    def __init__(self, quic, can_write=None):
+        # aioquic QuicConnection
+        self.quic = quic
+        # can_write(stream_id): the server may only write once the client opened the stream
+        self.can_write = can_write or (lambda stream_id: True)
+        self.classes = [StreamClass(kind) for kind in (CONTROL, INTERACTIVE, BULK)]
+        self._by_kind = {c.kind: c for c in self.classes}
+        self.datagrams = {"sent": 0, "dropped": 0}
+
+    def enqueue(self, kind, data):
+        if not data:
+            return
+        c = self._by_kind[kind]
+        c.queue.append(memoryview(data))
+        c.queued += len(data)
+        if c.queued > c.max_queued:
+            c.max_queued = c.queued
+
+    def send_datagram(self, data) -> bool:
+        """Queue a DATAGRAM frame. False if the peer doesn't accept datagrams this size."""
+        limit = self.quic._remote_max_datagram_frame_size
+        if limit is None or len(data) > limit:
+            return False
+        waiting = self.quic._datagrams_pending
+        while len(waiting) >= DATAGRAM_BACKLOG:
+            waiting.popleft()
+            self.datagrams["dropped"] += 1
+        self.quic.send_datagram_frame(data)
+        self.datagrams["sent"] += 1
+        return True
+
+    def pending(self, kind=None):
+        """Bytes still queued here (not yet handed to aioquic)."""
+        if kind is not None:
+            return self._by_kind[kind].queued
+        return sum(c.queued for c in self.classes)
+
+    def unacked(self, kind):
+        """Bytes queued here or written to aioquic that the peer hasn't acknowledged yet."""
+        c = self._by_kind[kind]
+        stream = self.quic._streams.get(c.stream_id)
+        # aioquic drops the buffer front as acks come in, _buffer_start is the acked prefix
+        acked = stream.sender._buffer_start if stream is not None else 0
+        return c.queued + c.written - acked
+
+    def _unsent(self, c):
+        # Bytes handed to aioquic that it hasn't put on the wire yet
+        stream = self.quic._streams.get(c.stream_id)
+        if stream is None:
+            return c.written
+        return max(0, c.written - stream.sender.highest_offset)
+
+    def _budget(self):
+        loss = getattr(self.quic, "_loss", None)
+        window = loss.congestion_window if loss is not None else 0
+        return max(window, MIN_WINDOW) - sum(self._unsent(c) for c in self.classes)
+
+    def _limit(self, c):
+        if c.kind != BULK:
+            return None
+        credit = self.quic._remote_max_data - self.quic._remote_max_data_used
+        return credit - FLOW_RESERVE - sum(self._unsent(o) for o in self.classes)
+
+    def _write(self, c, n):
+        """Move up to n bytes from the class queue into aioquic."""
+        parts = []
+        taken = 0
+        while c.queue and taken < n:
+            head = c.queue[0]
+            if len(head) <= n - taken:
+                parts.append(head)
+                taken += len(head)
+                c.queue.popleft()
+            else:
+                cut = n - taken
+                parts.append(head[:cut])
+                c.queue[0] = head[cut:]
+                taken += cut
+        if taken:
+            self.quic.send_stream_data(c.stream_id, b"".join(parts), end_stream=False)
+            c.queued -= taken
+            c.written += taken
+        return taken
+
+    def fill(self):
+        """Hand aioquic its share of queued data. Called before every transmit()."""
+        active = [c for c in self.classes if c.queued and self.can_write(c.stream_id)]
+        if not active:
+            return
+        budget = self._budget()
+        limits = {c.kind: self._limit(c) for c in active}
+        while budget > 0 and active:
+            for c in active:
+                c.deficit += QUANTUM * c.weight
+                allowance = min(c.deficit, budget)
+                if limits[c.kind] is not None:
+                    allowance = min(allowance, limits[c.kind])
+                n = self._write(c, allowance) if allowance > 0 else 0
+                # Don't let a class bank more than a couple of rounds while the window is shut
+                c.deficit = min(c.deficit - n, 2 * QUANTUM * c.weight)
+                budget -= n
+                if limits[c.kind] is not None:
+                    limits[c.kind] -= n
+                if budget <= 0:
+                    break
+            still = []
+            for c in active:
+                blocked = limits[c.kind] is not None and limits[c.kind] <= 0
+                if c.queued and not blocked:
+                    still.append(c)
+                else:
+                    # Idle classes don't bank deficit (standard DRR)
+                    c.deficit = 0
+            active = still
+
+    def stats(self) -> dict:
+        out = {
+            c.kind: {"queued": c.queued, "written": c.written, "max_queued": c.max_queued}
+            for c in self.classes
+        }
+        out["datagram"] = dict(self.datagrams)
+        return out
@@ -0,0 +1,176 @@
+"""
+Control Socket Module.
+Unix-domain socket for local programs to drive a headless node.
+
+Newline-delimited JSON both ways. Every request gets one reply, carrying
+the request's "id" if it had one:
+  {"cmd": "send", "text": "hi"}              -> {"ok": true, "sent": 1}
+  {"cmd": "send", "texts": ["a", "b"]}       -> {"ok": true, "sent": 2}
+  {"cmd": "peers"}                           -> {"ok": true, "peers": [...]}
+  {"cmd": "command", "line": "/mesh"}        -> {"ok": true, "lines": [...]}
+  {"cmd": "subscribe", "events": ["message"]} -> {"ok": true}
+After subscribe the connection also receives events as they happen:
+  {"event": "message", "origin": "..", "from": "10.0.0.2", "hops": 0, "text": ".."}
+  {"event": "log", "sender": "SYSTEM", "text": ".."}
+
+Requests on one connection are handled in order, so a client can pipeline
+sends without waiting for each reply. A subscriber that stops reading is
+not allowed to grow the node's memory: once SUBSCRIBER_BUFFER bytes are
+waiting, events for it are dropped and the next one that gets through
+carries the count in "dropped".
+"""
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger("ControlSocket")
+
+SUBSCRIBER_BUFFER = 1024 * 1024  # Bytes queued for a subscriber before events are dropped
+MAX_LINE = 1024 * 1024  # Longest request line accepted
+EVENTS = ("message", "log")
+
+
+class Subscriber:
+    __slots__ = ("writer", "events", "dropped")
+
+    def __init__(self, writer, events):
+        self.writer = writer
+        self.events = events
+        self.dropped = 0
+
+
+class ControlServer:
+    """
+    send(text) broadcasts a chat line, peers() lists linked peers as dicts,
+    command(line) runs a slash command and returns the lines it logged.
+    All provided by the app.
+    """
+
+    def __init__(self, path, send, peers, command):
+        self.path = path
+        self.send = send
+        self.peers = peers
+        self.command = command
+        self.server = None
+        self.subscribers = []
+        self.stats = {"clients": 0, "requests": 0, "sent": 0, "events": 0, "dropped": 0}
+
+    async def start(self):
+        if os.path.exists(self.path):
+            # Left over from a previous run
+            os.unlink(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.server = await asyncio.start_unix_server(self._client, path=self.path, limit=MAX_LINE)
+        os.chmod(self.path, 0o660)
+        logger.info(f"Control socket listening on {self.path}")
+
+    def close(self):
+        if self.server:
+            self.server.close()
+            self.server = None
+        for sub in self.subscribers:
+            sub.writer.close()
+        self.subscribers.clear()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def _client(self, reader, writer):
+        self.stats["clients"] += 1
+        conn = {"writer": writer, "subscriber": None}
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    self._write(writer, {"ok": False, "error": "line too long"})
+                    break
+                if not line:
+                    break
+                self.stats["requests"] += 1
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be an object")
+                    reply = await self._handle(request, conn)
+                except KeyError as e:
+                    reply = {"ok": False, "error": f"missing {e}"}
+                except (ValueError, TypeError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                if isinstance(request, dict) and "id" in request:
+                    reply["id"] = request["id"]
+                self._write(writer, reply)
+                if writer.transport.get_write_buffer_size() > SUBSCRIBER_BUFFER:
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Control client error: {e}")
+        finally:
+            if conn["subscriber"] in self.subscribers:
+                self.subscribers.remove(conn["subscriber"])
+            writer.close()
+
+    async def _handle(self, request, conn):
+        cmd = request.get("cmd")
+        if cmd == "send":
+            texts = request["texts"] if "texts" in request else [request["text"]]
+            for text in texts:
+                if not isinstance(text, str):
+                    raise TypeError("text must be a string")
+                self.send(text)
+            self.stats["sent"] += len(texts)
+            return {"ok": True, "sent": len(texts)}
+        if cmd == "peers":
+            return {"ok": True, "peers": self.peers()}
+        if cmd == "command":
+            line = request["line"]
+            if not isinstance(line, str) or not line.startswith("/"):
+                raise ValueError("line must be a slash command")
+            return {"ok": True, "lines": await self.command(line)}
+        if cmd == "subscribe":
+            events = request.get("events", ["message"])
+            unknown = [e for e in events if e not in EVENTS]
+            if unknown:
+                raise ValueError(f"unknown events {unknown}")
+            if conn["subscriber"] is None:
+                conn["subscriber"] = Subscriber(conn["writer"], set(events))
+                self.subscribers.append(conn["subscriber"])
+            else:
+                conn["subscriber"].events = set(events)
+            return {"ok": True}
+        raise ValueError(f"unknown cmd {cmd!r}")
+
+    @staticmethod
+    def _write(writer, obj):
+        writer.write(json.dumps(obj, separators=(",", ":")).encode("utf-8") + b"\n")
+
+    def publish(self, kind, **fields):
+        """Push an event to every subscriber that asked for it."""
+        if not self.subscribers:
+            return
+        event = None
+        for sub in self.subscribers:
+            if kind not in sub.events or sub.writer.is_closing():
+                continue
+            if sub.writer.transport.get_write_buffer_size() > SUBSCRIBER_BUFFER:
+                sub.dropped += 1
+                self.stats["dropped"] += 1
+                continue
+            if sub.dropped:
+                self._write(sub.writer, {"event": kind, **fields, "dropped": sub.dropped})
+                sub.dropped = 0
+            else:
+                if event is None:
+                    event = json.dumps({"event": kind, **fields}, separators=(",", ":")).encode("utf-8") + b"\n"
+                sub.writer.write(event)
+            self.stats["events"] += 1
+
+    def on_message(self, origin, hops, text, from_ip):
+        self.publish("message", **{"origin": f"{origin:016x}", "from": from_ip, "hops": hops, "text": text})
+
+    def on_log(self, sender, text):
+        self.publish("log", sender=sender, text=text)
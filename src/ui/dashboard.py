@@ -8,9 +8,13 @@ from rich.table import Table
 from rich.text import Text
 from rich.live import Live
 from rich.console import Console
+import logging
 from datetime import datetime
 from collections import deque
 from config import cfg
+from src.ui.logs import TELEMETRY
+
+telemetry = logging.getLogger(TELEMETRY)
 
 class Dashboard:
     def __init__(self):
@@ -18,9 +22,21 @@ class Dashboard:
         self.layout = Layout()
         self.messages = deque(maxlen=20)
         self.debug_log = deque(maxlen=10) # New Debug Log
+        # With logging set up (src/ui/logs.py) the debug panel shows its ring buffer instead
+        self.log_ring = None
         self.peer_data = {"status": "SEARCHING", "ip": "N/A", "ping": "N/A", "name": "N/A", "count": 0}
         self.my_info = {"iface": "Unknown", "ip": "Unknown"}
         self.input_buffer = ""
+        # Per-peer link metrics: { ip: {"srtt": s, "jitter": s, "quic_srtt": s, ...} }
+        self.links = {}
+        # Set whenever something visible changes; on_dirty lets the TUI loop wake up
+        self.dirty = True
+        self.on_dirty = None
+
+        # Bumped on every change to the matching field. generate_layout only
+        # rebuilds panels whose inputs moved since the last frame.
+        self.versions = {"messages": 0, "debug_log": 0, "peer_data": 0, "my_info": 0, "input_buffer": 0, "links": 0}
+        self._rendered = {}
         
         # Initial Setup
         self.layout.split(
@@ -38,31 +54,73 @@ class Dashboard:
             Layout(name="debug_log", ratio=1)
         )
 
+    def mark_dirty(self):
+        self.dirty = True
+        if self.on_dirty:
+            self.on_dirty()
+
+    def _changed(self, field):
+        self.versions[field] += 1
+        self.mark_dirty()
+
+    def invalidate(self):
+        """Drop all cached panels so the next frame rebuilds everything."""
+        self._rendered.clear()
+        self.mark_dirty()
+
     def update_peer(self, status, ip="N/A", ping="N/A", name="N/A", count=0):
         self.peer_data = {"status": status, "ip": ip, "ping": ping, "name": name, "count": count}
+        self._changed("peer_data")
 
     def update_info(self, iface, ip):
         self.my_info = {"iface": iface, "ip": ip}
+        self._changed("my_info")
+
+    def update_link(self, ip, stats):
+        if stats is None:
+            self.links.pop(ip, None)
+        else:
+            self.links[ip] = stats
+        self._changed("links")
 
     def add_log(self, sender, message):
         timestamp = datetime.now().strftime("%H:%M:%S")
         self.messages.append(f"[{timestamp}] [bold]{sender}[/bold]: {message}")
+        self._changed("messages")
 
     def add_debug(self, message):
+        if self.log_ring is not None:
+            # Lands in the file and, through the ring, in the panel
+            telemetry.debug(message)
+            return
         timestamp = datetime.now().strftime("%H:%M:%S")
         self.debug_log.append(f"[{timestamp}] {message}")
+        self._changed("debug_log")
 
     def update_input(self, text):
-        self.input_buffer = text
+        if text != self.input_buffer:
+            self.input_buffer = text
+            self._changed("input_buffer")
 
     def clear_logs(self):
         self.messages.clear()
+        self.versions["messages"] += 1
         self.add_debug("UI: Chat logs cleared.")
 
     def clear_debug(self):
         self.debug_log.clear()
+        if self.log_ring is not None:
+            self.log_ring.clear()
+        self._changed("debug_log")
 
-    def generate_layout(self):
+    def _stale(self, panel, key):
+        """True if panel was built from a different version key than key."""
+        if self._rendered.get(panel) == key:
+            return False
+        self._rendered[panel] = key
+        return True
+
+    def _build_header(self):
         # Header - Ultra Cyber Style
         header_text = Text.assemble(
             (" HAMPTER ", "bold white on magenta"),
@@ -71,11 +129,9 @@ class Dashboard:
             ("⬢ ", "bold cyan"),
             ("SECURE P2P MESH", "bold cyan")
         )
-        self.layout["header"].update(
-            Panel(header_text, style="magenta", border_style="magenta", padding=(0,1))
-        )
-        
-        # Status Panel
+        return Panel(header_text, style="magenta", border_style="magenta", padding=(0,1))
+
+    def _build_status(self):
         status_table = Table.grid(padding=1)
         status_table.add_column(style="bold cyan")
         status_table.add_column()
@@ -87,34 +143,89 @@ class Dashboard:
         status_table.add_row("NODES", Text(str(self.peer_data["count"]), style="bold cyan"))
         status_table.add_row("LAST IP", self.peer_data["ip"])
         status_table.add_row("LAST ID", self.peer_data["name"])
-        status_table.add_row("PING", str(self.peer_data["ping"]))
+        status_table.add_row("PING", self._format_ping())
         status_table.add_row(" ", " ")
         status_table.add_row("MY IFACE", self.my_info["iface"])
         status_table.add_row("MY IP", self.my_info["ip"])
+
+        if self.links:
+            status_table.add_row(" ", " ")
+            ranked = sorted(self.links.items(), key=lambda kv: kv[1].get("srtt") or float("inf"))
+            for ip, stats in ranked[:6]:
+                status_table.add_row(ip, self._format_link(stats))
         
-        self.layout["status"].update(
-            Panel(status_table, title="SYSTEM STATUS", border_style="cyan")
-        )
+        return Panel(status_table, title="SYSTEM STATUS", border_style="cyan")
+
+    @staticmethod
+    def _format_link(stats):
+        srtt = stats.get("srtt")
+        if srtt is None:
+            text = "..."
+        else:
+            text = f"{srtt * 1000:.1f}ms ±{stats.get('jitter', 0) * 1000:.1f}"
+            if stats.get("quic_srtt") is not None:
+                text += f" (q {stats['quic_srtt'] * 1000:.1f})"
+            if stats.get("lost"):
+                text += f" lost {stats['lost']}"
+        # Radio metrics, once the sampler has matched this peer to a station
+        if stats.get("signal_dbm") is not None:
+            text += f" {stats['signal_dbm']}dBm"
+        if stats.get("tx_bitrate_mbps") is not None:
+            text += f" {stats['tx_bitrate_mbps']:.0f}M"
+        if stats.get("retry_rate"):
+            text += f" r{stats['retry_rate'] * 100:.0f}%"
+        return text
+
+    def _format_ping(self):
+        # Explicit value wins, otherwise the RTT of the last peer that linked
+        if self.peer_data["ping"] != "N/A":
+            return str(self.peer_data["ping"])
+        stats = self.links.get(self.peer_data["ip"])
+        if stats and stats.get("srtt") is not None:
+            return f"{stats['srtt'] * 1000:.1f} ms"
+        return "N/A"
+
+    def _build_data_log(self):
+        log_text = "\n".join(self.messages)
+        return Panel(log_text, title="DATA LINK LOG", border_style="green", padding=(0, 1))
+
+    def _build_debug_log(self):
+        if self.log_ring is not None:
+            # Telemetry plus warnings and errors, the DEBUG/INFO chatter stays in the file
+            lines = self.log_ring.lines(self.debug_log.maxlen, logging.WARNING, (TELEMETRY,))
+        else:
+            lines = self.debug_log
+        debug_text = "\n".join(lines)
+        return Panel(debug_text, title="DEBUG TELEMETRY", border_style="yellow", style="dim")
+
+    def _build_footer(self):
+        cursor = "█" 
+        return Panel(Text(f"> {self.input_buffer}{cursor}", style="bold white"), title="COMMAND INPUT", border_style="dim")
+
+    def generate_layout(self):
+        v = self.versions
+        if self._stale("header", 0):
+            self.layout["header"].update(self._build_header())
+        
+        # Status Panel
+        if self._stale("status", (v["peer_data"], v["my_info"], v["links"])):
+            self.layout["status"].update(self._build_status())
         
         # Data Log Panel
-        log_text = "\n".join(self.messages)
-        self.layout["data_log"].update(
-            Panel(log_text, title="DATA LINK LOG", border_style="green", padding=(0, 1))
-        )
+        if self._stale("data_log", v["messages"]):
+            self.layout["data_log"].update(self._build_data_log())
 
         # Debug Log Panel
-        debug_text = "\n".join(self.debug_log)
-        self.layout["debug_log"].update(
-            Panel(debug_text, title="DEBUG TELEMETRY", border_style="yellow", style="dim")
-        )
+        ring_version = self.log_ring.version if self.log_ring is not None else 0
+        if self._stale("debug_log", (v["debug_log"], ring_version)):
+            self.layout["debug_log"].update(self._build_debug_log())
         
         # Footer (Input)
-        cursor = "█" 
-        self.layout["footer"].update(
-             Panel(Text(f"> {self.input_buffer}{cursor}", style="bold white"), title="COMMAND INPUT", border_style="dim")
-        )
+        if self._stale("footer", v["input_buffer"]):
+            self.layout["footer"].update(self._build_footer())
         
         return self.layout
 
     def get_live(self):
-        return Live(self.generate_layout(), refresh_per_second=10, screen=True)
+        # No auto refresh thread: the TUI loop redraws only when something changed
+        return Live(self.generate_layout(), auto_refresh=False, screen=True)
@@ -0,0 +1,49 @@
+"""
+Headless Dashboard for Hampter Link.
+Stand-in for Dashboard in daemon mode: same methods, no rich, no terminal.
+Log lines go to the logger and to any listeners (the control socket).
+"""
+import logging
+from collections import deque
+
+logger = logging.getLogger("Daemon")
+
+
+class HeadlessDashboard:
+    def __init__(self):
+        self.messages = deque(maxlen=20)
+        self.links = {}
+        self.peer_data = {"status": "SEARCHING", "ip": "N/A", "count": 0}
+        self.my_info = {"iface": "Unknown", "ip": "Unknown"}
+        # Called with (sender, message) for every add_log
+        self.listeners = []
+
+    def add_log(self, sender, message):
+        self.messages.append(f"{sender}: {message}")
+        logger.info(f"{sender}: {message}")
+        for listener in self.listeners:
+            listener(sender, message)
+
+    def add_debug(self, message):
+        logger.debug(message)
+
+    def update_peer(self, status, ip="N/A", ping="N/A", name="N/A", count=0):
+        self.peer_data = {"status": status, "ip": ip, "count": count}
+
+    def update_info(self, iface, ip):
+        self.my_info = {"iface": iface, "ip": ip}
+
+    def update_link(self, ip, stats):
+        if stats is None:
+            self.links.pop(ip, None)
+        else:
+            self.links[ip] = stats
+
+    def clear_logs(self):
+        self.messages.clear()
+
+    def update_input(self, text):
+        pass
+
+    def mark_dirty(self):
+        pass
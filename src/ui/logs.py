@@ -0,0 +1,261 @@
+"""
+Logs Module.
+Logging that never writes files from the event loop.
+
+Every logger ends in one QueueHandler, so a log call on the loop only
+builds the record and puts it on a queue. A LogWriter thread does the
+rest: the size-rotated LOG_FILE (LOG_MAX_BYTES, LOG_BACKUPS old copies),
+stderr in daemon mode, and a RingBuffer of the last LOG_RING_SIZE records
+that the dashboard's debug panel reads from.
+
+The writer takes whatever has piled up in the queue and flushes the file
+once per batch. The stock handlers stat, seek and flush on every record,
+and on a Pi that thread holding the GIL is what the loop would feel. It
+also waits WRITE_DELAY after waking before it drains, so a burst of log
+calls is one wakeup instead of a GIL handoff per record, and it gives the
+GIL up between chunks of WRITE_BATCH records.
+
+The caller builds the LogRecord, so setup_logging turns off what none of
+the formats use: the caller's file and line (a frame walk per call) and
+the thread/process names.
+
+What that buys on the caller (benchmarks/bench_logging.py): 4-8 us mean
+and 8-11 us p99 per record, against 12-14 us and 18-24 us for a plain
+file handler. The worst single call is no better, 2-3 ms: a call that
+lands while the writer holds the GIL waits for it.
+
+Levels are per logger name: LOG_LEVEL for everything, LOG_LEVELS for
+overrides ({'Flood': 'INFO', 'quic': 'WARNING'}). A logger below its level
+costs one integer compare, nothing is queued.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import deque
+from config import cfg
+
+FILE_FORMAT = '%(asctime)s %(name)s %(levelname)s: %(message)s'
+CONSOLE_FORMAT = '%(name)s %(levelname)s: %(message)s'
+# Dashboard.add_debug lines, shown in the panel without the logger name
+TELEMETRY = "Telemetry"
+WRITE_BATCH = 64  # Records handled before the writer lets the loop have the GIL back
+WRITE_DELAY = 0.02  # Seconds the writer lets records pile up after waking
+
+_writer = None
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Caller side. Merges msg and args (they may change after the call) and
+    turns a traceback into text. The stock prepare() also copies the record
+    and runs a formatter, neither is needed with nothing else on the root.
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    # The queue is thread safe, skip the handler lock
+    def handle(self, record):
+        if self.filter(record):
+            self.emit(record)
+        return record
+
+
+class RotatingWriter(logging.handlers.RotatingFileHandler):
+    """Rotates on a byte count kept in memory and leaves flushing to the writer."""
+
+    def __init__(self, path, max_bytes, backups):
+        super().__init__(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        self.size = self.stream.tell()
+
+    def emit(self, record):
+        try:
+            line = self.format(record) + self.terminator
+            # Characters, not bytes, close enough for a size cap on mostly ASCII
+            if self.maxBytes and self.size and self.size + len(line) > self.maxBytes:
+                self.doRollover()
+                self.size = 0
+            self.stream.write(line)
+            self.size += len(line)
+        except Exception:
+            self.handleError(record)
+
+
+class LogWriter:
+    """Background thread that drains the record queue into the handlers."""
+
+    def __init__(self, records, handlers):
+        self.records = records
+        self.handlers = handlers
+        self.batches = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            first = self.records.get()
+            if first is not None:
+                time.sleep(WRITE_DELAY)
+            batch = [first]
+            done = False
+            while not done:
+                for record in batch:
+                    if record is None:
+                        done = True
+                        break
+                    for handler in self.handlers:
+                        if record.levelno >= handler.level:
+                            handler.handle(record)
+                if done:
+                    break
+                batch = []
+                while len(batch) < WRITE_BATCH:
+                    try:
+                        batch.append(self.records.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    break
+                # Let the loop thread in between chunks
+                time.sleep(0)
+            for handler in self.handlers:
+                handler.flush()
+            self.batches += 1
+            if done:
+                return
+
+    def stop(self):
+        """Write out everything queued so far, then end the thread."""
+        self.records.put(None)
+        self._thread.join()
+
+
+class RingBuffer(logging.Handler):
+    """
+    Last N records in memory. Runs on the writer thread; readers on the
+    loop take a snapshot with lines(). notify() is called once per batch of
+    new records, until the next lines() call.
+    """
+
+    def __init__(self, size=None, level=logging.NOTSET):
+        super().__init__(level)
+        self.records = deque(maxlen=size or cfg.LOG_RING_SIZE)
+        self.version = 0
+        self.notify = None
+        self._pending = False
+
+    def emit(self, record):
+        self.records.append(record)
+        self.version += 1
+        if self.notify and not self._pending:
+            self._pending = True
+            try:
+                self.notify()
+            except RuntimeError:
+                # Loop already closed, nobody is watching
+                self.notify = None
+
+    # Don't take the handler lock, deque appends are atomic
+    def handle(self, record):
+        if self.filter(record):
+            self.emit(record)
+        return record
+
+    def lines(self, count, level=logging.NOTSET, names=()):
+        """
+        Newest `count` records at `level` or above, oldest first, as panel
+        lines. Records from loggers in `names` are kept whatever their level.
+        """
+        self._pending = False
+        out = []
+        for record in reversed(list(self.records)):
+            if record.levelno < level and record.name not in names:
+                continue
+            stamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+            if record.name == TELEMETRY:
+                out.append(f"[{stamp}] {record.getMessage()}")
+            else:
+                out.append(f"[{stamp}] {record.levelname[0]} {record.name}: {record.getMessage()}")
+            if len(out) == count:
+                break
+        out.reverse()
+        return out
+
+    def clear(self):
+        self.records.clear()
+        self.version += 1
+
+
+def apply_levels(default=None, overrides=None):
+    """Set the root level and the per-logger overrides."""
+    logging.getLogger().setLevel((default or cfg.LOG_LEVEL).upper())
+    for name, level in (cfg.LOG_LEVELS if overrides is None else overrides).items():
+        logging.getLogger(name).setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def setup_logging(path=None, console=False):
+    """
+    Route all logging through a queue to a background writer. Returns the
+    RingBuffer for the dashboard. Safe to call once per process.
+    """
+    global _writer
+    if _writer is not None:
+        return next(h for h in _writer.handlers if isinstance(h, RingBuffer))
+
+    handlers = []
+    path = path or cfg.LOG_FILE
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    logfile = RotatingWriter(path, cfg.LOG_MAX_BYTES, cfg.LOG_BACKUPS)
+    logfile.setFormatter(logging.Formatter(FILE_FORMAT))
+    handlers.append(logfile)
+    if console:
+        # systemd picks this up for the journal
+        stream = logging.StreamHandler()
+        stream.setLevel(logging.INFO)
+        stream.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(stream)
+    ring = RingBuffer()
+    handlers.append(ring)
+
+    # Nothing we format uses these, and they're paid on the loop for every record
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(LogQueueHandler(records))
+    apply_levels()
+
+    _writer = LogWriter(records, handlers)
+    _writer.start()
+    atexit.register(shutdown)
+    return ring
+
+
+def shutdown():
+    """Write out whatever is still queued and stop the writer thread."""
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        for handler in _writer.handlers:
+            handler.close()
+        _writer = None
@@ -0,0 +1,285 @@
+"""
+Metrics Module.
+Counters, gauges and fixed-bucket histograms for what a node is doing.
+
+All updates happen on the event loop thread, so a counter is a dict entry
+and an increment is a dict get and set, no locks. Label values are passed
+positionally and make up the key, e.g. FRAMES.inc("10.0.0.2", "chat", "rx").
+Histograms keep one count per bucket plus sum and count, the same shape
+Prometheus expects, so export is a straight walk over the dicts.
+
+REGISTRY is the process-wide registry. counter()/histogram() return the
+existing metric when the name is already registered, so modules declare
+what they use at import time. The app reads it with /stats; a
+MetricsExporter writes the Prometheus text format to METRICS_FILE (for
+node_exporter's textfile collector) and/or serves it on METRICS_SOCKET
+(`curl --unix-socket hampter-metrics.sock http://localhost/metrics`).
+"""
+import asyncio
+import bisect
+import logging
+import os
+import time
+from config import cfg
+
+logger = logging.getLogger("Metrics")
+
+# Seconds. Handshakes on the mesh take tens of ms, callbacks tens of us
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CALLBACK_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, *labels, by=1):
+        self.values[labels] = self.values.get(labels, 0) + by
+
+    def total(self):
+        return sum(self.values.values())
+
+    def expose(self):
+        for key, value in self.values.items():
+            yield f"{self.name}{_label_text(self.labels, key)} {value}"
+
+    def summary(self):
+        for key, value in sorted(self.values.items(), key=lambda kv: -kv[1]):
+            yield key, f"{value:,}"
+
+
+class Gauge:
+    """Value read from a callback at export time, e.g. the number of linked peers."""
+    kind = "gauge"
+
+    def __init__(self, name, help, read):
+        self.name = name
+        self.help = help
+        self.labels = ()
+        self.read = read
+
+    def expose(self):
+        try:
+            yield f"{self.name} {self.read()}"
+        except Exception as e:
+            logger.error(f"Gauge {self.name} failed: {e}")
+
+    def summary(self):
+        try:
+            yield (), f"{self.read()}"
+        except Exception:
+            pass
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labels = tuple(labels)
+        # labels -> [count per bucket..., count over the last bound, sum]
+        self.series = {}
+
+    def observe(self, value, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels):
+        series = self.series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def quantile(self, q, *labels):
+        """Upper bound of the bucket holding the q-quantile (inf if past the last bound)."""
+        series = self.series.get(labels)
+        if not series:
+            return None
+        total = sum(series[:-1])
+        running = 0
+        for bound, n in zip(self.buckets + (float("inf"),), series[:-1]):
+            running += n
+            if running >= q * total:
+                return bound
+        return float("inf")
+
+    def expose(self):
+        for key, series in self.series.items():
+            running = 0
+            for bound, n in zip(self.buckets + ("+Inf",), series[:-1]):
+                running += n
+                le = _label_text(self.labels, key, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{le} {running}"
+            yield f"{self.name}_sum{_label_text(self.labels, key)} {series[-1]}"
+            yield f"{self.name}_count{_label_text(self.labels, key)} {running}"
+
+    def summary(self):
+        for key, series in self.series.items():
+            count = sum(series[:-1])
+            if not count:
+                continue
+            mean = series[-1] / count
+            p95 = self.quantile(0.95, *key)
+            p95_text = f"<={p95 * 1000:g}ms" if p95 != float("inf") else f">{self.buckets[-1] * 1000:g}ms"
+            yield key, f"n={count:,} mean {mean * 1000:.2f}ms p95 {p95_text}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _get(self, name, cls, *args):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, *args)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(name, Counter, help, labels)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, labels=()):
+        return self._get(name, Histogram, help, buckets, labels)
+
+    def gauge(self, name, help, read):
+        """Register (or re-point) a callback gauge."""
+        metric = self._get(name, Gauge, help, read)
+        metric.read = read
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+    def summary(self, match=""):
+        """Human readable lines for /stats, optionally only metrics whose name contains match."""
+        lines = []
+        for metric in self.metrics.values():
+            if match not in metric.name:
+                continue
+            short = metric.name.replace("hampter_", "", 1)
+            for key, text in metric.summary():
+                label = " ".join(str(v) for v in key)
+                lines.append(f"{short}{' ' + label if label else ''}: {text}")
+        return lines
+
+
+REGISTRY = Registry()
+
+# Link metrics, shared by the QUIC server and client protocols
+STREAM_NAMES = {0: "control", 4: "chat", 8: "bulk"}  # By QUIC stream id
+FRAMES = REGISTRY.counter("hampter_frames_total", "Frames sent/received per peer and stream",
+                          ("peer", "stream", "direction"))
+BYTES = REGISTRY.counter("hampter_bytes_total", "Stream/datagram payload bytes per peer and stream",
+                         ("peer", "stream", "direction"))
+CONNECTIONS = REGISTRY.counter("hampter_connections_total", "QUIC connections that came up or went down",
+                               ("role", "event"))
+HANDSHAKES = REGISTRY.histogram("hampter_handshake_seconds", "QUIC handshake duration",
+                                LATENCY_BUCKETS, ("role", "kind"))
+CALLBACKS = REGISTRY.histogram("hampter_callback_seconds", "Time spent in app callbacks on the loop",
+                               CALLBACK_BUCKETS, ("callback",))
+
+
+def call_timed(name, fn, *args):
+    """fn(*args), with the time it took recorded in CALLBACKS."""
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        CALLBACKS.observe(time.perf_counter() - start, name)
+
+
+class MetricsExporter:
+    """Writes REGISTRY to a file every interval and/or serves it on a Unix socket."""
+
+    def __init__(self, registry=None, path=None, socket_path=None, interval=None):
+        self.registry = registry or REGISTRY
+        self.path = path
+        self.socket_path = socket_path
+        self.interval = interval or cfg.METRICS_INTERVAL
+        self.server = None
+        self._task = None
+        self.stats = {"writes": 0, "scrapes": 0}
+
+    async def start(self):
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.server = await asyncio.start_unix_server(self._scrape, path=self.socket_path)
+            logger.info(f"Metrics on {self.socket_path}")
+        if self.path:
+            self._task = asyncio.ensure_future(self._write_loop())
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Render on the loop (it owns the data), write from a worker
+            text = self.registry.render()
+            try:
+                await loop.run_in_executor(None, self._write, text)
+                self.stats["writes"] += 1
+            except OSError as e:
+                logger.error(f"Metrics write to {self.path} failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def _write(self, text):
+        # Atomic replace, the collector never sees half a file
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, self.path)
+
+    async def _scrape(self, reader, writer):
+        try:
+            # Answer plain HTTP (curl, a proxy) or just a bare connect
+            request = await asyncio.wait_for(reader.read(4096), 1.0)
+        except (asyncio.TimeoutError, ConnectionError):
+            request = b""
+        body = self.registry.render().encode("utf-8")
+        if request.startswith(b"GET"):
+            writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n")
+        writer.write(body)
+        self.stats["scrapes"] += 1
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self.server:
+            self.server.close()
+            self.server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,203 @@
+"""
+Profiling Module.
+Finds out what is holding up the event loop.
+
+LoopMonitor does three things while the app runs:
+- A lag sampler: a task that sleeps LOOP_LAG_INTERVAL and records how late
+  it woke up. Every other callback waits that long as well, so it goes
+  into hampter_loop_lag_seconds (see metrics.py).
+- A slow-callback detector: Handle._run is wrapped so every callback the
+  loop runs is timed, and any that take LOOP_SLOW_CALLBACK or longer are
+  kept with a name (the function, or the task and where its coroutine
+  went on to wait). The same trick as asyncio's debug mode, without the
+  rest of debug mode's overhead.
+- A watchdog thread: when one callback has been running for
+  LOOP_SLOW_CALLBACK, it grabs the loop thread's stack, which shows the line
+  that is blocking rather than just the callback it's in.
+
+Profiler is /profile <seconds>: cProfile on the loop thread for that long,
+written to PROFILE_DIR for `python -m pstats` or snakeviz.
+"""
+import asyncio
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from config import cfg
+from src.ui.metrics import REGISTRY
+
+logger = logging.getLogger("Profiling")
+
+LOOP_LAG = REGISTRY.histogram("hampter_loop_lag_seconds", "How late the loop ran a timer",
+                              (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+SLOW_CALLBACKS = REGISTRY.counter("hampter_slow_callbacks_total", "Loop callbacks over LOOP_SLOW_CALLBACK")
+STALLS = REGISTRY.counter("hampter_loop_stalls_total", "Times the watchdog caught the loop blocked")
+
+RECENT = 20  # Slow callbacks and stalls kept for /loop
+STACK_DEPTH = 8  # Frames kept per stall
+
+
+def describe(handle):
+    """Readable name for what a Handle runs."""
+    callback = getattr(handle, "_callback", None)
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Future) and hasattr(owner, "get_coro"):
+        coro = owner.get_coro()
+        name = getattr(coro, "__qualname__", type(coro).__name__)
+        frame = getattr(coro, "cr_frame", None)
+        # Where the step ended up, i.e. the next await after the slow part
+        where = f" -> {os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno}" if frame else ""
+        return f"task {owner.get_name()} {name}{where}"
+    if callback is None:
+        return repr(handle)
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+class LoopMonitor:
+    def __init__(self, interval=None, threshold=None, dashboard=None):
+        self.interval = interval or cfg.LOOP_LAG_INTERVAL
+        self.threshold = threshold or cfg.LOOP_SLOW_CALLBACK
+        self.dashboard = dashboard
+        self.slow = deque(maxlen=RECENT)  # (time, seconds, what)
+        self.stalls = deque(maxlen=RECENT)  # (time, seconds blocked so far, stack lines)
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        # perf_counter() when the running callback started, 0 while the loop is idle
+        self._current = [0.0]
+        self._loop_thread = None
+        self._task = None
+        self._watchdog = None
+        self._running = False
+        self._original_run = None
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._running = True
+        self._install_hook()
+        self._task = asyncio.ensure_future(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._original_run is not None:
+            asyncio.events.Handle._run = self._original_run
+            self._original_run = None
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+
+    def _install_hook(self):
+        if self._original_run is not None:
+            return
+        original = self._original_run = asyncio.events.Handle._run
+        threshold = self.threshold
+        clock = time.perf_counter
+        on_slow = self._on_slow
+        current = self._current
+
+        def _run(handle):
+            start = current[0] = clock()
+            original(handle)
+            current[0] = 0.0
+            took = clock() - start
+            if took >= threshold:
+                on_slow(handle, took)
+
+        asyncio.events.Handle._run = _run
+
+    def _on_slow(self, handle, took):
+        what = describe(handle)
+        SLOW_CALLBACKS.inc()
+        self.slow.append((time.time(), took, what))
+        logger.warning(f"Slow callback {took * 1000:.0f}ms: {what}")
+
+    def _watch(self):
+        # Only looks, never touches loop state
+        reported = 0.0
+        while self._running:
+            time.sleep(self.threshold / 2)
+            started = self._current[0]
+            if not started or started == reported:
+                continue
+            blocked = time.perf_counter() - started
+            if blocked < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            reported = started
+            stack = [line.rstrip() for line in traceback.format_stack(frame, STACK_DEPTH)]
+            STALLS.inc()
+            self.stalls.append((time.time(), blocked, stack))
+            logger.warning(f"Loop blocked for {blocked * 1000:.0f}ms+ at:\n" + "\n".join(stack))
+
+    def status(self):
+        """Text lines for /loop."""
+        p95 = LOOP_LAG.quantile(0.95)
+        lines = [f"lag now {self.last_lag * 1000:.1f}ms, max {self.max_lag * 1000:.0f}ms"
+                 + (f", p95 <={p95 * 1000:g}ms" if p95 not in (None, float("inf")) else "")]
+        for stamp, took, what in list(self.slow)[-5:]:
+            lines.append(f"{time.strftime('%H:%M:%S', time.localtime(stamp))} slow {took * 1000:.0f}ms {what}")
+        for stamp, blocked, stack in list(self.stalls)[-3:]:
+            # Innermost frame is the line that was running
+            where = stack[-1].strip().splitlines()[0] if stack else "?"
+            lines.append(f"{time.strftime('%H:%M:%S', time.localtime(stamp))} stall {blocked * 1000:.0f}ms+ {where}")
+        return lines
+
+
+class Profiler:
+    """cProfile of the loop thread for a fixed time, one run at a time."""
+
+    def __init__(self, directory=None, dashboard=None):
+        self.directory = directory or cfg.PROFILE_DIR
+        self.dashboard = dashboard
+        self.running = False
+
+    async def run(self, seconds, top=5):
+        """Profile for `seconds`. Returns (path, summary lines)."""
+        if self.running:
+            raise RuntimeError("a profile is already running")
+        self.running = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profile.disable()
+        finally:
+            self.running = False
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, time.strftime("hampter-%Y%m%d-%H%M%S.prof"))
+        # Writing a few hundred KB is quick, but still not on the loop
+        await asyncio.get_running_loop().run_in_executor(None, profile.dump_stats, path)
+        return path, self.summary(profile, top)
+
+    @staticmethod
+    def summary(profile, top=5):
+        stats = pstats.Stats(profile)
+        # Time in select() is the loop waiting for work, not doing any
+        idle = sum(s[2] for (_, _, func), s in stats.stats.items() if "'select." in func)
+        lines = [f"{stats.total_tt * 1000:.0f}ms on the loop thread, {idle * 1000:.0f}ms of it idle in select"]
+        busy = [kv for kv in stats.stats.items() if "'select." not in kv[0][2]]
+        entries = sorted(busy, key=lambda kv: -kv[1][2])[:top]
+        for (filename, lineno, func), (_, calls, tottime, cumtime, _) in entries:
+            lines.append(f"{tottime * 1000:.1f}ms self, {cumtime * 1000:.1f}ms total, {calls} calls: "
+                         f"{func} ({os.path.basename(filename)}:{lineno})")
+        return lines